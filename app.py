@@ -1,6 +1,14 @@
 # This is the main driver that will call the other two drivers of each sub-system
+import signal
+import sys
+from hardware.controller_input import ABSOLUTE, SWITCH
 from hardware.hardware import Hardware
+from software.ai import ExpectimaxPlayer
+from software.commands import COMMANDS, CheckButton, CommandBus, PlayAudio, Vibrate
 from software.game import Game
+from software.profiler import PROFILER
+from software.replay import ReplayWriter
+from software.tracing import TRACER
 
 class HardwareCommandListener:
     def on_command(self, command, **params):
@@ -8,30 +16,66 @@ class HardwareCommandListener:
         pass
 
 class Bridge(HardwareCommandListener):
-    def __init__(self):
-        self.hardware = Hardware()
-        self.software = Game(self)
-    
+    def __init__(self, replay=None, ai_players=None, potentio_mode=ABSOLUTE):
+        self.hardware = Hardware(potentio_mode=potentio_mode)
+        self.commands = CommandBus()
+        self.commands.register(PlayAudio, lambda command: self.hardware.play_audio(command.file_path))
+        self.commands.register(Vibrate, lambda command: self.hardware.vibrate(command.player_id, command.pattern))
+        self.commands.register(CheckButton,
+                               lambda command: self.hardware.check_button(command.player_id, command.menu_size))
+        self.software = Game(self, replay=replay, ai_players=ai_players)
+
     # This is where we request the hardware for input and output
     def run(self):
         self.software.run()
 
+    async def send(self, command):
+        """Handle a typed command from the game, awaitable so hardware calls overlap with other tasks"""
+        self._trace_dispatch(command)
+        with PROFILER.frame(f"Bridge.send[{command.name}]"):
+            return await self.commands.send(command)
+
+    @staticmethod
+    def _trace_dispatch(command):
+        if not isinstance(command, CheckButton):
+            # Vibrate is traced against its player, audio against the latest input
+            TRACER.mark(getattr(command, "player_id", None), "command_dispatch")
+
     # Is called by the game
     def on_command(self, command, **params):
         """Handle commands from the game (implements HardwareCommandListener)"""
-        if command == "play_audio":
-            self.hardware.play_audio(params["file_path"])
-            return True
-        
-        elif command == "vibrate":
-            self.hardware.vibrate(params["player_id"], params["pattern"])
-            return True
-        
-        elif command == "check_button":
-            return self.hardware.check_button(params["player_id"])
-
-        return False
+        command_type = COMMANDS.get(command)
+        if command_type is None:
+            return False
+        command = command_type(**params)
+        self._trace_dispatch(command)
+        with PROFILER.frame(f"Bridge.on_command[{command.name}]"):
+            result = self.commands.dispatch(command)
+        if command_type is CheckButton:
+            return result
+        return True
 
 if __name__ == "__main__":
-    bridge = Bridge()
-    bridge.run()
\ No newline at end of file
+    if "--trace" in sys.argv:
+        # Input latency histograms, printed at exit and on kill -USR1
+        TRACER.enable(dump_signal=signal.SIGUSR1, dump_at_exit=True)
+    if "--profile" in sys.argv:
+        # Time per game phase, move and command, printed at exit and on kill -USR2
+        PROFILER.enable(dump_signal=signal.SIGUSR2, dump_at_exit=True)
+    replay = record_file = None
+    if "--record" in sys.argv:
+        # Append every game to a binary replay log, see software/replay.py
+        record_file = open(sys.argv[sys.argv.index("--record") + 1], "ab")
+        replay = ReplayWriter(record_file)
+    ai_players = None
+    if "--ai" in sys.argv:
+        # The computer plays player 2, thinking for up to 200 ms per move
+        ai_players = {2: ExpectimaxPlayer(time_budget=0.2)}
+    # The knobs point at menu options, --switch-knobs makes them UP/DOWN switches instead
+    potentio_mode = SWITCH if "--switch-knobs" in sys.argv else ABSOLUTE
+    try:
+        bridge = Bridge(replay, ai_players, potentio_mode)
+        bridge.run()
+    finally:
+        if record_file is not None:
+            record_file.close()
@@ -0,0 +1,292 @@
+# Non-interactive benchmarks for the battle engine and the hardware input path.
+#
+#   python benchmark.py --save          run and write the results as this machine's baseline
+#   python benchmark.py                 run and compare with benchmark_baseline.json
+#   python benchmark.py --threshold 0.3 fail on changes worse than 30% (default 20%)
+#
+# Every benchmark uses a fixed seed and is warmed up before it is timed. Each
+# repeat of a timing is divided by a calibration loop timed just before it, so
+# a machine that is busy or throttled for a while slows both down alike, and
+# results are compared on the median of those ratios. A result only counts as
+# a regression if it is worse by more than the threshold plus the spread of
+# its repeats in either run. The exit status is 1 if any result regressed.
+#
+# The baseline file is local (it is in .gitignore): generate it with --save on
+# the machine that runs the comparison. --quick runs are kept apart from full
+# runs in the same file, as they play different game mixes.
+import argparse
+import contextlib
+import gc
+import io
+import itertools
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+from software.batch_engine import BatchBattleEngine
+from software.character import Character, CharacterClass
+from software.rng import GameRNG
+from software.test_suite import GameSimulationTest
+
+SEED = 2024
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+class Result:
+    """One measurement. `normalized` is what baselines are compared on (the value
+    in calibration units for timings) and `noise` the relative spread of its repeats."""
+    __slots__ = ("name", "value", "unit", "higher_is_better", "normalized", "noise")
+
+    def __init__(self, name, value, unit, higher_is_better=False, normalized=None, noise=0.0):
+        self.name = name
+        self.value = value
+        self.unit = unit
+        self.higher_is_better = higher_is_better
+        self.normalized = value if normalized is None else normalized
+        self.noise = noise
+
+    @classmethod
+    def timing(cls, name, timing, scale, unit):
+        """Seconds per call from time_per_call(), shown as seconds * scale"""
+        seconds, normalized, noise = timing
+        return cls(name, seconds * scale, unit, normalized=normalized, noise=noise)
+
+    @classmethod
+    def rate(cls, name, timing, per_call, unit):
+        """A rate (per_call things per call) from time_per_call()"""
+        seconds, normalized, noise = timing
+        return cls(name, per_call / seconds, unit, higher_is_better=True, normalized=per_call / normalized,
+                   noise=noise)
+
+    def to_json(self):
+        return {"value": self.value, "unit": self.unit, "higher_is_better": self.higher_is_better,
+                "normalized": self.normalized, "noise": self.noise}
+
+    def regression(self, baseline):
+        """Relative change for the worse against a baseline entry (0 if it didn't get worse)"""
+        old = baseline["normalized"]
+        if old <= 0 or self.normalized <= 0:
+            return 0.0
+        ratio = old / self.normalized if self.higher_is_better else self.normalized / old
+        return max(0.0, ratio - 1)
+
+def _calibration():
+    # A fixed mix of interpreter work: arithmetic, a loop and dict stores
+    total = 0
+    table = {}
+    for i in range(200):
+        table[i & 15] = total
+        total += i * 3 % 7
+    return total
+
+CALIBRATION_CALLS = 100
+
+def time_per_call(function, number, repeat=7, warmup=None):
+    """Time `repeat` runs of `number` calls after warming up, each run right after a
+    run of the calibration loop. Returns (median seconds per call, median ratio to
+    the calibration loop, interquartile range of the ratios relative to their median).
+    Like timeit, the garbage collector is off while timing."""
+    for _ in range(number if warmup is None else warmup):
+        function()
+    seconds, ratios = [], []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(CALIBRATION_CALLS):
+                _calibration()
+            calibration = (time.perf_counter() - start) / CALIBRATION_CALLS
+            start = time.perf_counter()
+            for _ in range(number):
+                function()
+            seconds.append((time.perf_counter() - start) / number)
+            ratios.append(seconds[-1] / calibration)
+            gc.collect()
+    finally:
+        if gc_enabled:
+            gc.enable()
+    median = statistics.median(ratios)
+    quartiles = statistics.quantiles(ratios, n=4) if repeat > 1 else (median, median, median)
+    return statistics.median(seconds), median, (quartiles[2] - quartiles[0]) / median
+
+def make_character(character_class, name="Benchmark"):
+    character = Character(name)
+    character.character_class = character_class
+    character.initialize_character()
+    return character
+
+# Micro-benchmarks, short enough that one slow moment swings a repeat
+MICRO_REPEAT = 15
+
+def bench_calculate_damage(number):
+    rng = GameRNG(SEED)
+    attacker, defender = make_character(CharacterClass.KNIGHT), make_character(CharacterClass.WIZARD)
+    move = attacker.moves[0]
+    timing = time_per_call(lambda: move.calculate_damage(attacker, defender, rng=rng), number, MICRO_REPEAT)
+    yield Result.timing("Move.calculate_damage", timing, 1e6, "us")
+
+def bench_move_use(number):
+    """Every move on a fresh target, timed with the snapshot restore that resets both characters"""
+    rng = GameRNG(SEED)
+    for character_class in CharacterClass:
+        user, target = make_character(character_class), make_character(CharacterClass.KNIGHT)
+        user_state, target_state = user.snapshot(), target.snapshot()
+        for move in user.moves:
+            def use():
+                user.restore(user_state)
+                target.restore(target_state)
+                move.use(user, target, rng)
+            yield Result.timing(f"Move.use[{move.name}]", time_per_call(use, number, MICRO_REPEAT), 1e6, "us")
+
+def bench_take_damage(number):
+    target = make_character(CharacterClass.KNIGHT)
+    target.health = 10 ** 12
+    timing = time_per_call(lambda: target.take_damage(1), number, MICRO_REPEAT)
+    yield Result.timing("Character.take_damage", timing, 1e6, "us")
+
+def bench_get_available_moves(number):
+    character = make_character(CharacterClass.ARCHER)
+    character.uses[0] = 0
+    timing = time_per_call(character.get_available_moves, number, MICRO_REPEAT)
+    yield Result.timing("Character.get_available_moves", timing, 1e6, "us")
+
+# Macro-benchmarks
+
+def bench_simulate_game(games):
+    """simulate_game for every ordered class pairing"""
+    for attacker_class, defender_class in itertools.product(CharacterClass, repeat=2):
+        simulator = GameSimulationTest(GameRNG(SEED))
+        def play():
+            simulator.simulate_game(make_character(attacker_class, "Player 1"),
+                                    make_character(defender_class, "Player 2"))
+        timing = time_per_call(play, games, repeat=5, warmup=games // 10)
+        yield Result.timing(f"simulate_game[{attacker_class.name} vs {defender_class.name}]", timing, 1e3, "ms")
+
+def bench_games_per_second(games):
+    simulator = GameSimulationTest(GameRNG(SEED))
+    timing = time_per_call(simulator._play_random_game, games, repeat=5, warmup=games // 10)
+    yield Result.rate("simulate_game games/s", timing, 1, "games/s")
+
+def bench_batch_engine(games):
+    BatchBattleEngine.random_matchups(games // 10, seed=SEED).run()
+    timing = time_per_call(lambda: BatchBattleEngine.random_matchups(games, seed=SEED).run(), 1, repeat=5, warmup=0)
+    yield Result.rate("BatchBattleEngine games/s", timing, games, "games/s")
+
+# Hardware
+
+def bench_check_button(presses):
+    """Button press to check_button() return on a FakeBoard, through PinCache and ControllerInput"""
+    from hardware.fake_board import INPUT, FakeBoard
+    from hardware.hardware import Hardware
+    with contextlib.redirect_stdout(io.StringIO()):
+        hardware = Hardware(FakeBoard(seed=SEED))
+    pin = hardware.button_1_pin
+    debounce = hardware.controller_input.debounce_time
+    latencies = []
+    try:
+        for i in range(presses + presses // 10):
+            time.sleep(debounce * 1.2)
+            start = time.perf_counter()
+            hardware.arduino.set_input(INPUT, pin, 1)
+            with contextlib.redirect_stdout(io.StringIO()):
+                button = hardware.check_button(1)
+            latency = time.perf_counter() - start
+            hardware.arduino.set_input(INPUT, pin, 0)
+            if button != "SELECT":
+                raise RuntimeError(f"check_button returned {button!r} for a press")
+            if i >= presses // 10:  # The first presses are warmup
+                latencies.append(latency)
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            hardware.shutdown()
+    yield Result("check_button latency median", statistics.median(latencies) * 1e3, "ms")
+    yield Result("check_button latency p90", statistics.quantiles(latencies, n=10)[-1] * 1e3, "ms")
+
+def peak_rss():
+    # ru_maxrss is in kilobytes on Linux
+    return Result("peak RSS", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, "MB")
+
+def run(quick=False, hardware=True):
+    """Run every benchmark, returns the Results in order"""
+    scale = 10 if quick else 1
+    benchmarks = [
+        (bench_calculate_damage, 100000 // scale),
+        (bench_move_use, 10000 // scale),
+        (bench_take_damage, 100000 // scale),
+        (bench_get_available_moves, 100000 // scale),
+        (bench_simulate_game, 500 // scale),
+        (bench_games_per_second, 5000 // scale),
+        (bench_batch_engine, 100000 // scale),
+    ]
+    if hardware:
+        benchmarks.append((bench_check_button, 50 // scale))
+    results = []
+    for benchmark, size in benchmarks:
+        for result in benchmark(size):
+            print_result(result)
+            results.append(result)
+    results.append(peak_rss())
+    print_result(results[-1])
+    return results
+
+def print_result(result):
+    noise = f" ±{result.noise / 2:.0%}" if result.noise else ""
+    print(f"{result.name:<50} {result.value:12.3f} {result.unit}{noise}", flush=True)
+
+def compare(results, baseline, threshold):
+    """Print regressions against the baseline, returns True if none exceed the threshold
+    plus the noise of the result and of its baseline entry"""
+    passed = True
+    for result in results:
+        entry = baseline.get(result.name)
+        if entry is None:
+            print(f"NEW {result.name}: not in the baseline")
+            continue
+        regression = result.regression(entry)
+        allowed = threshold + result.noise + entry["noise"]
+        if regression > allowed:
+            passed = False
+            print(f"REGRESSION {result.name}: {entry['value']:.3f} -> {result.value:.3f} {result.unit} "
+                  f"({regression:.0%} worse in calibration units, {allowed:.0%} allowed)")
+    for name in baseline.keys() - {result.name for result in results}:
+        print(f"SKIPPED {name}: in the baseline but not run")
+    return passed
+
+def load_baselines(path):
+    """{mode: {name: entry}} from a baseline file, empty if there is none"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Battle engine and hardware benchmarks")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--quick", action="store_true", help="10x fewer iterations")
+    parser.add_argument("--no-hardware", action="store_true", help="skip the FakeBoard benchmarks")
+    args = parser.parse_args(argv)
+
+    mode = "quick" if args.quick else "full"
+    results = run(args.quick, not args.no_hardware)
+    baselines = load_baselines(args.baseline)
+    if args.save:
+        baselines[mode] = {result.name: result.to_json() for result in results}
+        with open(args.baseline, "w") as file:
+            json.dump(baselines, file, indent=2)
+        print(f"\n{mode.capitalize()} baseline written to {args.baseline}")
+        return 0
+    if mode not in baselines:
+        print(f"\nNo {mode} baseline in {args.baseline}, run with --save{' --quick' if args.quick else ''} "
+              f"to create one")
+        return 0
+    if compare(results, baselines[mode], args.threshold):
+        print(f"\nNo regressions beyond {args.threshold:.0%}")
+        return 0
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
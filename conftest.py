@@ -0,0 +1,2 @@
+# software/test_suite.py is the interactive simulation menu, not a pytest module
+collect_ignore = ["software/test_suite.py"]
@@ -0,0 +1,323 @@
+import heapq
+import itertools
+import os
+import shutil
+import subprocess
+import threading
+import wave
+from collections import OrderedDict
+
+# Output libraries are optional, the NullOutput device works without either
+try:
+    import simpleaudio
+except ImportError:
+    simpleaudio = None
+try:
+    from playsound import playsound
+except ImportError:
+    playsound = None
+# Compressed clips (MP3) are decoded with miniaudio, or with the ffmpeg command if it isn't installed
+try:
+    import miniaudio
+except ImportError:
+    miniaudio = None
+
+# Format compressed clips are decoded to: 16-bit stereo at 44.1 kHz
+DECODE_CHANNELS = 2
+DECODE_SAMPLE_WIDTH = 2
+DECODE_SAMPLE_RATE = 44100
+
+# Clips used by the game, decoded when the audio system starts
+GAME_CLIPS = ("victory.mp3",)
+
+def _decode(path):
+    """PCM of a compressed clip in the DECODE_* format, None if no decoder is available"""
+    if miniaudio is not None:
+        try:
+            decoded = miniaudio.decode_file(path, miniaudio.SampleFormat.SIGNED16, DECODE_CHANNELS,
+                                            DECODE_SAMPLE_RATE)
+        except miniaudio.DecodeError as e:
+            raise OSError(f"Can't decode {path}: {e}") from e
+        return decoded.samples.tobytes()
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is not None:
+        result = subprocess.run([ffmpeg, "-v", "error", "-i", path, "-f", "s16le", "-ac", str(DECODE_CHANNELS),
+                                 "-ar", str(DECODE_SAMPLE_RATE), "-"], capture_output=True)
+        if result.returncode != 0:
+            raise OSError(f"Can't decode {path}: {result.stderr.decode(errors='replace').strip()}")
+        return result.stdout
+    return None
+
+class AudioClip:
+    """A clip held in memory.
+
+    WAV files are read to raw PCM with the wave module, other formats (the
+    game's MP3s) are decoded with miniaudio or ffmpeg. Without a decoder only
+    the path of a compressed clip is kept, and devices that can play files
+    (playsound) open it when played.
+    """
+    __slots__ = ("path", "pcm", "channels", "sample_width", "sample_rate")
+
+    def __init__(self, path, pcm=None, channels=0, sample_width=0, sample_rate=0):
+        self.path = path
+        self.pcm = pcm
+        self.channels = channels
+        self.sample_width = sample_width
+        self.sample_rate = sample_rate
+
+    @staticmethod
+    def load(path):
+        if os.path.splitext(path)[1].lower() != ".wav":
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            pcm = _decode(path)
+            if pcm is None:
+                return AudioClip(path)
+            return AudioClip(path, pcm, DECODE_CHANNELS, DECODE_SAMPLE_WIDTH, DECODE_SAMPLE_RATE)
+        with wave.open(path, "rb") as wav:
+            return AudioClip(path, wav.readframes(wav.getnframes()), wav.getnchannels(),
+                             wav.getsampwidth(), wav.getframerate())
+
+    @property
+    def nbytes(self):
+        return len(self.pcm) if self.pcm is not None else 0
+
+    @property
+    def duration(self):
+        """Length in seconds, 0 when the clip is not decoded"""
+        if self.pcm is None:
+            return 0
+        return len(self.pcm) / (self.channels * self.sample_width * self.sample_rate)
+
+class ClipCache:
+    """Decoded clips by path, least recently used clips are dropped past max_bytes"""
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clips = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """Return the clip for a path, loading it on a miss"""
+        with self._lock:
+            clip = self._clips.get(path)
+            if clip is not None:
+                self.hits += 1
+                self._clips.move_to_end(path)
+                return clip
+        clip = AudioClip.load(path)
+        with self._lock:
+            self.misses += 1
+            if path not in self._clips:
+                self._clips[path] = clip
+                self.nbytes += clip.nbytes
+            while self.nbytes > self.max_bytes and len(self._clips) > 1:
+                _, evicted = self._clips.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+        return clip
+
+    def preload(self, paths):
+        """Load clips up front, returns the paths that could not be loaded"""
+        failed = []
+        for path in paths:
+            try:
+                clip = self.get(path)
+            except (OSError, wave.Error) as e:
+                print(f"Error loading audio {path}: {e}")
+                failed.append(path)
+                continue
+            if clip.pcm is None:
+                print(f"No decoder for {path} (install miniaudio or ffmpeg), it will play from the file "
+                      f"and can't be interrupted")
+        return failed
+
+    def __len__(self):
+        return len(self._clips)
+
+class _TimedPlayback:
+    """Playback handle that finishes after a fixed time or when stopped"""
+    def __init__(self, duration):
+        self._stopped = threading.Event()
+        self._timer = threading.Timer(duration, self._stopped.set)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def wait(self, timeout=None):
+        return self._stopped.wait(timeout)
+
+    def stop(self):
+        self._timer.cancel()
+        self._stopped.set()
+
+class NullOutput:
+    """Output device that plays nothing, for headless runs and testing.
+
+    A playback lasts as long as the clip would, and every clip played is
+    recorded in `played`.
+    """
+    can_interrupt = True
+    plays_files = False
+
+    def __init__(self):
+        self.played = []
+
+    def play(self, clip):
+        self.played.append(clip.path)
+        return _TimedPlayback(clip.duration)
+
+class _SimpleAudioPlayback:
+    def __init__(self, play_object):
+        self._play_object = play_object
+
+    def wait(self, timeout=None):
+        # simpleaudio has no timed wait, the player thread only calls this without a timeout
+        self._play_object.wait_done()
+        return True
+
+    def stop(self):
+        self._play_object.stop()
+
+class SimpleAudioOutput:
+    """Plays decoded PCM from memory with simpleaudio, falls back to playsound for other formats"""
+    can_interrupt = True
+    plays_files = False
+
+    def play(self, clip):
+        if clip.pcm is None:
+            return PlaysoundOutput().play(clip)
+        return _SimpleAudioPlayback(simpleaudio.play_buffer(clip.pcm, clip.channels, clip.sample_width,
+                                                            clip.sample_rate))
+
+class _FinishedPlayback:
+    def wait(self, timeout=None):
+        return True
+
+    def stop(self):
+        pass
+
+class PlaysoundOutput:
+    """Fallback device for machines without simpleaudio.
+
+    playsound opens the file itself and blocks until the clip ends, so clips
+    are never decoded or cached for it and an interrupt=True clip waits for
+    the current one instead of preempting it.
+    """
+    can_interrupt = False
+    plays_files = True
+
+    def play(self, clip):
+        playsound(clip.path)
+        return _FinishedPlayback()
+
+def default_output():
+    """The best output device available on this machine"""
+    if simpleaudio is not None:
+        return SimpleAudioOutput()
+    if playsound is not None:
+        return PlaysoundOutput()
+    return NullOutput()
+
+class _NowPlaying:
+    """The clip AudioPlayer is playing, a stop() before its playback started is applied once it has"""
+    __slots__ = ("priority", "playback", "stopped")
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.playback = None
+        self.stopped = False
+
+    def started(self, playback):
+        self.playback = playback
+        if self.stopped:
+            playback.stop()
+
+    def stop(self):
+        self.stopped = True
+        if self.playback is not None:
+            self.playback.stop()
+
+class AudioPlayer:
+    """Plays cached clips on a background thread.
+
+    play() only queues the clip and returns. Queued clips play one at a time,
+    highest priority first and in order within a priority. A clip queued with
+    interrupt=True stops the current clip if it has a lower or equal priority
+    (when the device supports stopping).
+    """
+    def __init__(self, device=None, cache=None, clips=GAME_CLIPS):
+        self.device = device if device is not None else default_output()
+        self.cache = cache if cache is not None else ClipCache()
+        if not self.device.plays_files:
+            self.cache.preload(clips)
+        self._queue = []
+        self._order = itertools.count()
+        self._current = None            # _NowPlaying of the clip playing now
+        self._condition = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="audio", daemon=True)
+        self._thread.start()
+
+    def play(self, path, priority=0, interrupt=False):
+        """Queue a clip, returns False if it could not be loaded"""
+        try:
+            clip = self._clip(path)
+        except (OSError, wave.Error) as e:
+            print(f"Error playing audio: {e}")
+            return False
+        with self._condition:
+            heapq.heappush(self._queue, (-priority, next(self._order), clip))
+            if interrupt and self._current is not None and self._current.priority <= priority:
+                if self.device.can_interrupt:
+                    self._current.stop()
+            self._condition.notify()
+        return True
+
+    def _clip(self, path):
+        if self.device.plays_files:
+            # The device reads the file, decoding it would only waste memory
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            return AudioClip(path)
+        return self.cache.get(path)
+
+    def stop(self):
+        """Drop every queued clip and stop the one playing"""
+        with self._condition:
+            self._queue.clear()
+            if self._current is not None and self.device.can_interrupt:
+                self._current.stop()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and not self._queue:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                negative_priority, _, clip = heapq.heappop(self._queue)
+                # Current from here on, so an interrupt while the device starts still stops it
+                current = self._current = _NowPlaying(-negative_priority)
+            try:
+                playback = self.device.play(clip)
+            except Exception as e:
+                print(f"Error playing audio: {e}")
+                with self._condition:
+                    self._current = None
+                continue
+            with self._condition:
+                current.started(playback)
+            playback.wait()
+            with self._condition:
+                self._current = None
+
+    def shutdown(self):
+        """Stop playback and the player thread"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self.stop()
+        self._thread.join(timeout=1)
@@ -0,0 +1,234 @@
+import queue
+import threading
+import time
+from software.tracing import TRACER
+
+UP = "UP"
+DOWN = "DOWN"
+SELECT = "SELECT"
+SLOT = "SLOT"
+
+# Potentiometer modes
+SWITCH = "switch"       # UP/DOWN zones at the ends of its travel
+ABSOLUTE = "absolute"   # Its position picks the menu option
+
+class InputEvent:
+    """A debounced controller input"""
+    __slots__ = ("player_id", "action", "timestamp", "trace", "index")
+
+    def __init__(self, player_id, action, timestamp, trace=None, index=None):
+        self.player_id = player_id
+        self.action = action        # UP, DOWN, SELECT or SLOT
+        self.timestamp = timestamp  # time.time() of the pin report that caused it
+        self.trace = trace          # tracing.Trace of the input, None when tracing is off
+        self.index = index          # Menu option the potentiometer points at, for SLOT
+
+    def __repr__(self):
+        action = self.action if self.index is None else f"{self.action} {self.index}"
+        return f"InputEvent({self.player_id}, {action}, {self.timestamp:.3f})"
+
+class ControllerInput:
+    """Turns pymata4 pin-change callbacks into per-player queues of InputEvents.
+
+    pymata4 calls the callbacks from its reporter thread whenever Firmata reports
+    a pin change, so nothing polls the board. Inputs fire on edges:
+
+    - SELECT on the button's 0 -> 1 edge, ignoring bounces within debounce_time
+    - UP/DOWN when the potentiometer enters the zone beyond threshold +/- margin.
+      It re-arms once the reading comes back `hysteresis` past the zone edge, so
+      noise around the edge can't fire it again.
+    - While UP/DOWN is held, wait() repeats it after repeat_delay and then every
+      repeat_interval (repeat_delay=None turns auto-repeat off)
+
+    In ABSOLUTE mode the potentiometer points at a menu option instead. Its
+    reading is smoothed with an exponential moving average (smoothing is the
+    weight of each new reading) and split into one slot per option, top option
+    at the high end. A SLOT event fires only when the slot changes, and leaving
+    a slot takes slot_hysteresis counts past its edge. When a menu opens
+    (set_menu) the current slot is sent right away so the menu starts where the
+    knob is.
+    """
+    def __init__(self, arduino, players, potentio_threshold=512, potentio_margin=450, hysteresis=40,
+                 debounce_time=0.05, repeat_delay=0.5, repeat_interval=0.2, potentio_mode=SWITCH,
+                 smoothing=0.3, slot_hysteresis=16):
+        # players maps player_id to its (button_pin, potentio_pin)
+        self.arduino = arduino
+        self.potentio_threshold = potentio_threshold
+        self.potentio_margin = potentio_margin
+        self.hysteresis = hysteresis
+        self.debounce_time = debounce_time
+        self.repeat_delay = repeat_delay
+        self.repeat_interval = repeat_interval
+        self.potentio_mode = potentio_mode
+        self.smoothing = smoothing
+        self.slot_hysteresis = slot_hysteresis
+        self.queues = {player_id: queue.Queue() for player_id in players}
+        self._lock = threading.Lock()
+        self._button_players = {}
+        self._potentio_players = {}
+        self._button_states = {}
+        self._button_times = {}
+        self._potentio_zones = {}
+        self._next_repeats = {}     # time.time() the held direction repeats next, None if nothing is held
+        self._filtered = {}         # Smoothed potentiometer reading, None before the first report
+        self._menu_sizes = {}       # Options in the open menu, None when no menu is open
+        self._slots = {}
+
+        for player_id, (button_pin, potentio_pin) in players.items():
+            self._button_players[button_pin] = player_id
+            self._potentio_players[potentio_pin] = player_id
+            self._button_states[player_id] = 0
+            self._button_times[player_id] = 0
+            self._potentio_zones[player_id] = None
+            self._next_repeats[player_id] = None
+            self._filtered[player_id] = None
+            self._menu_sizes[player_id] = None
+            self._slots[player_id] = None
+            self.arduino.set_pin_mode_digital_input(button_pin, callback=self._on_button)
+            # The moving average needs every sample, not only the ones that changed
+            differential = 0 if potentio_mode == ABSOLUTE else 1
+            self.arduino.set_pin_mode_analog_input(potentio_pin, callback=self._on_potentio,
+                                                   differential=differential)
+
+    def _potentio_zone(self, value, zone):
+        """Zone of a reading given the current zone, leaving a zone takes `hysteresis` more travel"""
+        up_edge = self.potentio_threshold + self.potentio_margin
+        down_edge = self.potentio_threshold - self.potentio_margin
+        if zone == UP and value > up_edge - self.hysteresis:
+            return UP
+        if zone == DOWN and value < down_edge + self.hysteresis:
+            return DOWN
+        if value > up_edge:
+            return UP
+        if value < down_edge:
+            return DOWN
+        return None
+
+    def _slot(self, value, size, slot):
+        """Menu slot of a smoothed reading given the current slot"""
+        width = 1024 / size
+        position = 1023 - value  # The top option is at the high end
+        candidate = min(size - 1, max(0, int(position / width)))
+        if slot is None or candidate == slot:
+            return candidate
+        # Only leave the slot once the reading is slot_hysteresis past its edge
+        if candidate > slot and position < (slot + 1) * width + self.slot_hysteresis:
+            return slot
+        if candidate < slot and position > slot * width - self.slot_hysteresis:
+            return slot
+        return candidate
+
+    def set_menu(self, player_id, size):
+        """Start pointing the player's potentiometer at a menu of `size` options (ABSOLUTE mode)"""
+        with self._lock:
+            if self.potentio_mode != ABSOLUTE or size == self._menu_sizes[player_id]:
+                return
+            self._menu_sizes[player_id] = size
+            self._slots[player_id] = None
+            if self._filtered[player_id] is not None:
+                self._update_slot(player_id, time.time())
+
+    def _update_slot(self, player_id, timestamp):
+        size = self._menu_sizes[player_id]
+        if size is None:
+            return
+        slot = self._slot(self._filtered[player_id], size, self._slots[player_id])
+        if slot != self._slots[player_id]:
+            self._slots[player_id] = slot
+            self._emit(player_id, SLOT, timestamp, slot)
+
+    def _emit(self, player_id, action, timestamp, index=None):
+        trace = TRACER.start(TRACER.perf_counter_at(timestamp))
+        if trace is not None:
+            trace.mark("debounce_accept")
+        if action == SELECT:
+            # Selecting closes the menu, the next set_menu reopens it at the knob's position
+            self._menu_sizes[player_id] = None
+        self.queues[player_id].put(InputEvent(player_id, action, timestamp, trace, index))
+
+    def _on_button(self, data):
+        """pymata4 digital callback, data is [pin_type, pin, value, timestamp]"""
+        _, pin, value, timestamp = data
+        player_id = self._button_players.get(pin)
+        if player_id is None:
+            return
+        with self._lock:
+            pressed = value == 1 and self._button_states[player_id] == 0
+            self._button_states[player_id] = value
+            if pressed and timestamp - self._button_times[player_id] > self.debounce_time:
+                self._button_times[player_id] = timestamp
+                self._emit(player_id, SELECT, timestamp)
+
+    def _on_potentio(self, data):
+        """pymata4 analog callback, data is [pin_type, pin, value, timestamp]"""
+        _, pin, value, timestamp = data
+        player_id = self._potentio_players.get(pin)
+        if player_id is None:
+            return
+        with self._lock:
+            if self.potentio_mode == ABSOLUTE:
+                filtered = self._filtered[player_id]
+                self._filtered[player_id] = value if filtered is None else filtered + self.smoothing * (value - filtered)
+                self._update_slot(player_id, timestamp)
+                return
+            previous = self._potentio_zones[player_id]
+            zone = self._potentio_zone(value, previous)
+            if zone == previous:
+                return
+            self._potentio_zones[player_id] = zone
+            if zone is None or self.repeat_delay is None:
+                self._next_repeats[player_id] = None
+            else:
+                self._next_repeats[player_id] = timestamp + self.repeat_delay
+            if zone is not None:
+                self._emit(player_id, zone, timestamp)
+
+    def _repeat(self, player_id):
+        """The held direction's repeat event if it is due, and when the next one is due"""
+        with self._lock:
+            next_repeat = self._next_repeats[player_id]
+            if next_repeat is None:
+                return None, None
+            now = time.time()
+            if now < next_repeat:
+                return None, next_repeat
+            self._next_repeats[player_id] = now + self.repeat_interval
+            zone = self._potentio_zones[player_id]
+        event = InputEvent(player_id, zone, now, TRACER.start(TRACER.perf_counter_at(now)))
+        return event, self._next_repeats[player_id]
+
+    def wait(self, player_id, timeout=None, max_age=1.0):
+        """Block until the player's next event (or auto-repeat), None on timeout.
+
+        Events older than max_age seconds (inputs made while nobody was waiting,
+        e.g. during narration) are dropped.
+        """
+        events = self.queues[player_id]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            repeat, next_repeat = self._repeat(player_id)
+            if repeat is not None:
+                return repeat
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            if next_repeat is not None:
+                until_repeat = max(0, next_repeat - time.time())
+                remaining = until_repeat if remaining is None else min(remaining, until_repeat)
+            try:
+                event = events.get(timeout=remaining)
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return None
+                continue
+            if max_age is None or time.time() - event.timestamp <= max_age:
+                return event
+
+    def clear(self, player_id=None):
+        """Drop pending events of one player, or of everyone"""
+        player_ids = self.queues if player_id is None else (player_id,)
+        for pid in player_ids:
+            events = self.queues[pid]
+            while True:
+                try:
+                    events.get_nowait()
+                except queue.Empty:
+                    break
@@ -0,0 +1,237 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+
+# Pin types used in pymata4 callback messages (pymata4.private_constants)
+INPUT = 0x00
+OUTPUT = 0x01
+ANALOG = 0x02
+PWM = 0x03
+
+# Firmata output messages: a command byte (+ port or pin) and two 7-bit data bytes
+DIGITAL_MESSAGE = 0x90
+ANALOG_MESSAGE = 0xE0
+
+def press(at, pin, hold=0.1):
+    """Script a button press: down at `at` seconds, up `hold` seconds later"""
+    return [(at, INPUT, pin, 1), (at + hold, INPUT, pin, 0)]
+
+def turn(at, pin, value):
+    """Script a potentiometer moving to `value` (0-1023) at `at` seconds"""
+    return [(at, ANALOG, pin, value)]
+
+class FakeBoard:
+    """Stand-in for pymata4.Pymata4 with no Arduino attached.
+
+    Implements the part of the pymata4 API Hardware uses. Inputs come from a
+    script of (seconds after start, pin type, pin, value) events, see press()
+    and turn(), or from set_input() at any time. Like Firmata, digital pins
+    report when they change and analog pins are sampled every
+    sampling_interval, with optional Gaussian ADC noise. Reports reach the
+    callbacks `latency` seconds later, stamped with time.time() on arrival as
+    pymata4 does. Writes are decoded from the Firmata messages that carry them,
+    so a port message setting several pins logs each pin it changes. Every
+    write is logged in `writes` as (time, pin type, pin, value), and
+    `messages_written` and `bytes_written` count the serial traffic.
+    """
+    def __init__(self, script=(), latency=0.0, noise=0.0, sampling_interval=0.019, write_delay=0.0,
+                 analog_rest=512, seed=None):
+        self.latency = latency
+        self.noise = noise
+        self.sampling_interval = sampling_interval
+        self.write_delay = write_delay      # Time a write blocks the caller
+        self.analog_rest = analog_rest      # Reading of an analog pin nothing has moved
+        self.random = random.Random(seed)
+        self.pin_modes = {}
+        self.writes = []
+        self.messages_written = 0
+        self.bytes_written = 0
+        self.reports = 0
+        self.is_shutdown = False
+
+        self._port_values = {}      # Bit mask of each digital output port
+        self._inputs = {}           # Physical value of each input pin, by (pin type, pin)
+        self._reported = {}         # Last value reported for each input pin, by (pin type, pin)
+        self._report_times = {}
+        self._callbacks = {}
+        self._differentials = {}
+        self._order = itertools.count()
+        self._script = []           # Heap of (time, order, pin type, pin, value)
+        self._deliveries = []       # Heap of (time, order, (pin type, pin), value)
+        self._condition = threading.Condition()
+        self._start_time = time.monotonic()
+        self._next_sample = self._start_time
+        self.schedule(script)
+        self._thread = threading.Thread(target=self._run, name="fake-board", daemon=True)
+        self._thread.start()
+
+    # Scripted input
+
+    def schedule(self, events, start=None):
+        """Add (seconds, pin type, pin, value) events, timed from the board's start (or from `start`)"""
+        start = self._start_time if start is None else start
+        with self._condition:
+            for at, pin_type, pin, value in events:
+                heapq.heappush(self._script, (start + at, next(self._order), pin_type, pin, value))
+            self._condition.notify()
+
+    def schedule_from_now(self, events):
+        self.schedule(events, time.monotonic())
+
+    def set_input(self, pin_type, pin, value):
+        """Set an input pin's physical value right away"""
+        self.schedule_from_now([(0, pin_type, pin, value)])
+
+    def pending_inputs(self):
+        """Number of scripted inputs that haven't happened yet"""
+        with self._condition:
+            return len(self._script)
+
+    # pymata4 API
+
+    def set_pin_mode_digital_input(self, pin_number, callback=None):
+        self._set_input_mode(INPUT, pin_number, callback, 1)
+
+    def set_pin_mode_analog_input(self, pin_number, callback=None, differential=1):
+        self._set_input_mode(ANALOG, pin_number, callback, differential)
+
+    def _set_input_mode(self, pin_type, pin, callback, differential):
+        with self._condition:
+            self.pin_modes[(pin_type, pin)] = pin_type
+            self._inputs.setdefault((pin_type, pin), self.analog_rest if pin_type == ANALOG else 0)
+            self._reported.setdefault((pin_type, pin), None)
+            self._report_times.setdefault((pin_type, pin), 0)
+            self._callbacks[(pin_type, pin)] = callback
+            self._differentials[(pin_type, pin)] = differential
+            if pin_type == INPUT:
+                # Enabling reporting sends the pin's current state
+                self._report(time.monotonic(), (pin_type, pin), self._inputs[(pin_type, pin)])
+            self._condition.notify()
+
+    def set_pin_mode_digital_output(self, pin_number):
+        self.pin_modes[(OUTPUT, pin_number)] = OUTPUT
+
+    def set_pin_mode_pwm_output(self, pin_number):
+        self.pin_modes[(PWM, pin_number)] = PWM
+
+    def set_sampling_interval(self, interval):
+        """Analog sampling interval in milliseconds, as in Firmata"""
+        self.sampling_interval = interval / 1000
+
+    def digital_write(self, pin, value):
+        """Sends the pin's whole port, like pymata4"""
+        port = pin // 8
+        with self._condition:
+            mask = self._port_values.get(port, 0)
+        mask = mask | (1 << pin % 8) if value else mask & ~(1 << pin % 8)
+        self._send_command((DIGITAL_MESSAGE + port, mask & 0x7f, (mask >> 7) & 0x7f), written_pin=pin)
+
+    def pwm_write(self, pin, value):
+        self._send_command((ANALOG_MESSAGE + pin, value & 0x7f, (value >> 7) & 0x7f))
+
+    def _send_command(self, command, written_pin=None):
+        """Receive a raw Firmata message, returns the bytes written as pymata4 does.
+
+        A port message logs the pins whose value it changes, plus `written_pin`
+        (the pin a digital_write was for) even if it already had that value.
+        """
+        if self.write_delay:
+            time.sleep(self.write_delay)
+        now = time.time()
+        with self._condition:
+            self.messages_written += 1
+            self.bytes_written += len(command)
+            kind = command[0] & 0xF0
+            if kind == DIGITAL_MESSAGE:
+                port = command[0] & 0x0F
+                mask = command[1] | command[2] << 7
+                previous = self._port_values.get(port, 0)
+                self._port_values[port] = mask
+                for bit in range(8):
+                    if (mask ^ previous) >> bit & 1 or port * 8 + bit == written_pin:
+                        self.writes.append((now, OUTPUT, port * 8 + bit, mask >> bit & 1))
+            elif kind == ANALOG_MESSAGE:
+                self.writes.append((now, PWM, command[0] & 0x0F, command[1] | command[2] << 7))
+        return len(command)
+
+    def digital_read(self, pin):
+        with self._condition:
+            return [self._reported.get((INPUT, pin)) or 0, self._report_times.get((INPUT, pin), 0)]
+
+    def analog_read(self, pin):
+        with self._condition:
+            value = self._reported.get((ANALOG, pin))
+            return (self.analog_rest if value is None else value), self._report_times.get((ANALOG, pin), 0)
+
+    def shutdown(self):
+        with self._condition:
+            self.is_shutdown = True
+            self._condition.notify()
+        self._thread.join()
+
+    # Board simulation
+
+    def writes_to(self, pin):
+        """Values written to one pin, in order"""
+        with self._condition:
+            return [value for _, _, written_pin, value in self.writes if written_pin == pin]
+
+    def _sample(self, key):
+        value = self._inputs[key]
+        if key[0] == ANALOG and self.noise:
+            value = min(1023, max(0, round(value + self.random.gauss(0, self.noise))))
+        return value
+
+    def _report(self, now, key, value):
+        """Queue a report of an input pin for delivery after the serial latency"""
+        heapq.heappush(self._deliveries, (now + self.latency, next(self._order), key, value))
+
+    def _run(self):
+        with self._condition:
+            while not self.is_shutdown:
+                now = time.monotonic()
+                while self._script and self._script[0][0] <= now:
+                    _, _, pin_type, pin, value = heapq.heappop(self._script)
+                    self._inputs[(pin_type, pin)] = value
+                    if pin_type == INPUT and (pin_type, pin) in self._callbacks:
+                        # Firmata reports digital pins as soon as they change
+                        self._report(now, (pin_type, pin), value)
+                if now >= self._next_sample:
+                    self._next_sample = now + self.sampling_interval
+                    for key in self._callbacks:
+                        if key[0] == ANALOG:
+                            self._report(now, key, self._sample(key))
+
+                while self._deliveries and self._deliveries[0][0] <= now:
+                    _, _, key, value = heapq.heappop(self._deliveries)
+                    self._deliver(key, value)
+
+                wake = self._next_sample
+                if self._script:
+                    wake = min(wake, self._script[0][0])
+                if self._deliveries:
+                    wake = min(wake, self._deliveries[0][0])
+                self._condition.wait(max(0, wake - time.monotonic()))
+
+    def _deliver(self, key, value):
+        """Update the pin like pymata4 does and call its callback when the change is big enough"""
+        previous = self._reported[key]
+        if previous is not None:
+            if key[0] == ANALOG and abs(value - previous) < self._differentials[key]:
+                return
+            if key[0] == INPUT and value == previous:
+                return
+        self._reported[key] = value
+        timestamp = time.time()
+        self._report_times[key] = timestamp
+        self.reports += 1
+        callback = self._callbacks[key]
+        if callback is not None:
+            # Run the callback without the lock so it can read the board
+            self._condition.release()
+            try:
+                callback([key[0], key[1], value, timestamp])
+            finally:
+                self._condition.acquire()
@@ -0,0 +1,104 @@
+import threading
+import time
+
+def _ramp(start, stop, step, duration):
+    return [(intensity, duration) for intensity in range(start, stop, step)]
+
+# Patterns are lists of (intensity, duration in seconds) keyframes, the motor
+# holds each intensity for its duration. A pattern always ends with the motor off.
+PATTERNS = {
+    # Two pulses
+    "turn": [(255, 1.0), (0, 0.2)] * 2,
+    # Increasing then decreasing intensity
+    "victory": _ramp(0, 255, 25, 0.05) + _ramp(255, 0, -25, 0.05),
+    "default": [(200, 0.5)],
+}
+PATTERN_ALIASES = {1: "turn", 2: "victory"}
+
+class HapticsEngine:
+    """Plays vibration patterns on a background thread, one timeline per motor.
+
+    play() returns immediately. A new pattern on a motor replaces whatever that
+    motor was playing (a turn cue interrupts a victory ramp), the other motor
+    keeps going. The motors share the direction pins: forward while any motor
+    runs, off otherwise. Writes go through a PinCache and each scheduler tick
+    is flushed as one frame, so unchanged pins aren't resent and both direction
+    pins share one port message.
+    """
+    def __init__(self, pins, motors, motor_dir_pin1, motor_dir_pin2):
+        # pins is the board's PinCache, motors maps player_id to the motor's PWM enable pin
+        self.pins = pins
+        self.motors = motors
+        self.motor_dir_pin1 = motor_dir_pin1
+        self.motor_dir_pin2 = motor_dir_pin2
+        self._timelines = {player_id: [] for player_id in motors}  # (start time, intensity), in order
+        self._intensities = {player_id: 0 for player_id in motors}
+        self._condition = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="haptics", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def get_pattern(pattern):
+        """Keyframes of a pattern given by name or number, unknown patterns use the default"""
+        pattern = PATTERN_ALIASES.get(pattern, pattern)
+        return PATTERNS.get(pattern, PATTERNS["default"])
+
+    def play(self, player_id, pattern):
+        """Start a pattern on the player's motor, preempting the one it was playing"""
+        now = time.monotonic()
+        timeline = []
+        for intensity, duration in self.get_pattern(pattern):
+            timeline.append((now, intensity))
+            now += duration
+        timeline.append((now, 0))
+        with self._condition:
+            self._timelines[player_id] = timeline
+            self._condition.notify()
+
+    def cancel(self, player_id=None):
+        """Stop the player's motor, or every motor"""
+        player_ids = self.motors if player_id is None else (player_id,)
+        with self._condition:
+            for pid in player_ids:
+                self._timelines[pid] = [(time.monotonic(), 0)]
+            self._condition.notify()
+
+    def is_playing(self, player_id):
+        with self._condition:
+            return bool(self._timelines[player_id]) or self._intensities[player_id] > 0
+
+    def _write(self, player_id, intensity):
+        """Drive one motor, the PinCache drops writes that don't change anything"""
+        self._intensities[player_id] = intensity
+        running = any(self._intensities.values())
+        self.pins.digital_write(self.motor_dir_pin1, 1 if running else 0)
+        self.pins.digital_write(self.motor_dir_pin2, 0)
+        self.pins.pwm_write(self.motors[player_id], intensity)
+
+    def _run(self):
+        with self._condition:
+            while self._running:
+                now = time.monotonic()
+                next_time = None
+                for player_id, timeline in self._timelines.items():
+                    # Apply every keyframe that is due, only the latest one needs writing
+                    due = None
+                    while timeline and timeline[0][0] <= now:
+                        due = timeline.pop(0)[1]
+                    if due is not None:
+                        self._write(player_id, due)
+                    if timeline and (next_time is None or timeline[0][0] < next_time):
+                        next_time = timeline[0][0]
+                self.pins.flush()
+                self._condition.wait(None if next_time is None else next_time - now)
+
+    def shutdown(self):
+        """Stop the scheduler thread with every motor off"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join()
+        for player_id in self.motors:
+            self._write(player_id, 0)
+        self.pins.flush()
@@ -1,15 +1,25 @@
 # Please return in a dictionary format
 
 from pymata4 import pymata4
-from playsound import playsound
-import time
+from .audio import AudioPlayer
+from .controller_input import ABSOLUTE, SLOT, ControllerInput
+from .haptics import HapticsEngine
+from .pin_cache import PinCache
+from software.tracing import TRACER
 
 class Hardware:
-    def __init__(self):
-        """Initialize hardware interfaces"""
+    def __init__(self, arduino=None, potentio_mode=ABSOLUTE):
+        """Initialize hardware interfaces, `arduino` replaces the pymata4 board (e.g. a fake_board.FakeBoard).
+
+        potentio_mode is controller_input.ABSOLUTE (the knob points at the menu
+        option) or SWITCH (UP/DOWN zones at the ends of its travel, with auto-repeat).
+        """
+        # Audio doesn't need the arduino, clips are decoded up front
+        self.audio = AudioPlayer()
+
         try:
             # Setup arduino connection
-            self.arduino = pymata4.Pymata4()
+            self.arduino = arduino if arduino is not None else pymata4.Pymata4()
 
             # Pin definitions
             self.button_1_pin = 6
@@ -21,16 +31,23 @@ class Hardware:
             self.motor_dir_pin1 = 3
             self.motor_dir_pin2 = 4
 
-            # Setup pins
-            self.arduino.set_pin_mode_analog_input(self.potentio_1_pin)
-            self.arduino.set_pin_mode_analog_input(self.potentio_2_pin)
-            self.arduino.set_pin_mode_digital_input(self.button_1_pin)
-            self.arduino.set_pin_mode_digital_input(self.button_2_pin)
+            # Firmata reports the inputs every sampling interval (ms) into the pin cache,
+            # which also coalesces the writes of each frame
+            self.sampling_interval = 19
+            self.pins = PinCache(self.arduino, self.sampling_interval)
+
+            # Setup pins, the input pins report changes to the controller input callbacks
+            self.controller_input = ControllerInput(self.pins, {
+                1: (self.button_1_pin, self.potentio_1_pin),
+                2: (self.button_2_pin, self.potentio_2_pin),
+            }, potentio_mode=potentio_mode)
             
-            self.arduino.set_pin_mode_digital_output(self.motor_dir_pin1)
-            self.arduino.set_pin_mode_digital_output(self.motor_dir_pin2)
-            self.arduino.set_pin_mode_pwm_output(self.motor_1_en)
-            self.arduino.set_pin_mode_pwm_output(self.motor_2_en)
+            self.pins.set_pin_mode_digital_output(self.motor_dir_pin1)
+            self.pins.set_pin_mode_digital_output(self.motor_dir_pin2)
+            self.pins.set_pin_mode_pwm_output(self.motor_1_en)
+            self.pins.set_pin_mode_pwm_output(self.motor_2_en)
+            self.haptics = HapticsEngine(self.pins, {1: self.motor_1_en, 2: self.motor_2_en},
+                                         self.motor_dir_pin1, self.motor_dir_pin2)
             
             self.hardware_enabled = True
             print("Hardware interface initialized successfully")
@@ -40,128 +57,44 @@ class Hardware:
             print("Falling back to keyboard input")
             self.hardware_enabled = False
     
-    def play_audio(self, file_path):
-        """Play audio file"""
+    def play_audio(self, file_path, priority=0, interrupt=False):
+        """Queue an audio file, returns without waiting for it to play"""
         print(f"Playing audio: {file_path}")
-        try:
-            playsound(file_path)
-        except Exception as e:
-            print(f"Error playing audio: {e}")
-
-    def vibration_pattern1(self, player_motor):
-        """Vibrate the motor with pattern 1: two pulses"""
-        for iter in range(2):
-            self.arduino.digital_write(self.motor_dir_pin1, 1)
-            self.arduino.digital_write(self.motor_dir_pin2, 0)
-            self.arduino.pwm_write(player_motor, 255)
-            time.sleep(1)
-            self.arduino.digital_write(self.motor_dir_pin1, 0)
-            self.arduino.digital_write(self.motor_dir_pin2, 0)
-            self.arduino.pwm_write(player_motor, 0)
-            time.sleep(0.2)
-
-    def vibration_alter_intensity(self, player_motor):
-        """Vibrate with increasing then decreasing intensity"""
-        for intensity in range(0, 255, 25):  # Step by 25 to make it faster
-            self.arduino.digital_write(self.motor_dir_pin1, 1)
-            self.arduino.digital_write(self.motor_dir_pin2, 0)
-            self.arduino.pwm_write(player_motor, intensity)
-            time.sleep(0.05)  # Shorter sleep for smoother effect
-
-        for intensity in range(255, 0, -25):
-            self.arduino.digital_write(self.motor_dir_pin1, 1)
-            self.arduino.digital_write(self.motor_dir_pin2, 0)
-            self.arduino.pwm_write(player_motor, intensity)
-            time.sleep(0.05)
-
-        self.arduino.digital_write(self.motor_dir_pin1, 0)
-        self.arduino.digital_write(self.motor_dir_pin2, 0)
-        self.arduino.pwm_write(player_motor, 0)
+        return self.audio.play(file_path, priority, interrupt)
 
     def vibrate(self, player_id, pattern):
-        """Activate vibration motor with specified pattern"""
+        """Start a vibration pattern on the player's motor, returns without waiting for it"""
         print(f"Player {player_id} controller vibrating with pattern: {pattern}")
         
         if not self.hardware_enabled:
             return
             
-        # Select the appropriate motor
-        if player_id == 1:
-            player_motor = self.motor_1_en
-        else:
-            player_motor = self.motor_2_en
+        # "turn" (1), "victory" (2) or the default pulse, see haptics.PATTERNS
+        self.haptics.play(player_id, pattern)
 
-        # Pattern selection
-        if pattern == "turn" or pattern == 1:
-            self.vibration_pattern1(player_motor)
-        elif pattern == "victory" or pattern == 2:
-            self.vibration_alter_intensity(player_motor)
-        else:
-            # Default pattern
-            self.arduino.digital_write(self.motor_dir_pin1, 1)
-            self.arduino.digital_write(self.motor_dir_pin2, 0)
-            self.arduino.pwm_write(player_motor, 200)
-            time.sleep(0.5)
-            self.arduino.digital_write(self.motor_dir_pin1, 0)
-            self.arduino.digital_write(self.motor_dir_pin2, 0)
-            self.arduino.pwm_write(player_motor, 0)
-
-    def check_button(self, player_id):
-        """Check for player input (UP/DOWN/SELECT)"""
+    def check_button(self, player_id, menu_size=None):
+        """Check for player input (UP/DOWN/SELECT), or the index of the option the
+        potentiometer points at when a menu of menu_size options is open"""
         if not self.hardware_enabled:
-            # Fallback to keyboard input if hardware isn't available
+            # Fallback to keyboard input if hardware isn't available. Key presses have
+            # no pin change to measure from, so they aren't traced
             return self._check_button_keyboard(player_id)
             
-        # Hardware-based input
-        if player_id == 1:
-            player_button = self.button_1_pin
-            player_potentio = self.potentio_1_pin
-        else:
-            player_button = self.button_2_pin
-            player_potentio = self.potentio_2_pin
-            
-        # Potentiometer center value (adjust if needed)
-        potentio_threshold = 512
-        
-        # Give user some time to respond, but don't block indefinitely
-        start_time = time.time()
-        last_potentio_reading = self.arduino.analog_read(player_potentio)[0]
-        
-        # Debounce variables
-        last_input = None
-        last_input_time = 0
-        debounce_time = 0.3  # seconds
-        
-        while (time.time() - start_time) < 5:  # 5 second timeout
-            # Check button (SELECT)
-            button_state = self.arduino.digital_read(player_button)[0]
-            potentio_reading = self.arduino.analog_read(player_potentio)[0]
-            
-            current_time = time.time()
-            
-            # Check for SELECT (button press)
-            if button_state == 1 and (current_time - last_input_time > debounce_time):
-                print(f"Player {player_id} pressed SELECT")
-                last_input_time = current_time
-                return "SELECT"
-                
-            # Check for UP (potentiometer above threshold)
-            if potentio_reading > potentio_threshold + 450 and (current_time - last_input_time > debounce_time):
-                print(f"Player {player_id} pressed UP")
-                last_input_time = current_time
-                return "UP"
-                
-            # Check for DOWN (potentiometer below threshold)
-            if potentio_reading < potentio_threshold - 450 and (current_time - last_input_time > debounce_time):
-                print(f"Player {player_id} pressed DOWN")
-                last_input_time = current_time
-                return "DOWN"
-                
-            # Small delay to prevent CPU overuse
-            time.sleep(0.05)
-            
-        # If we reach here, no input was detected
-        return None
+        if menu_size is not None:
+            self.controller_input.set_menu(player_id, menu_size)
+        # Wait for the next debounced event from the controller, but don't block indefinitely
+        event = self.controller_input.wait(player_id, timeout=5)
+        if event is None:
+            # No input was detected
+            return None
+        TRACER.activate(player_id, event.trace)
+        if event.action == SLOT:
+            print(f"Player {player_id} pointed at option {event.index + 1}")
+            TRACER.mark(player_id, "check_button_return")
+            return event.index
+        print(f"Player {player_id} pressed {event.action}")
+        TRACER.mark(player_id, "check_button_return")
+        return event.action
         
     def _check_button_keyboard(self, player_id):
         """Fallback keyboard input method"""
@@ -202,12 +135,11 @@ class Hardware:
         
     def shutdown(self):
         """Safely shutdown the hardware"""
+        self.audio.shutdown()
         if self.hardware_enabled:
             try:
-                self.arduino.digital_write(self.motor_dir_pin1, 0)
-                self.arduino.digital_write(self.motor_dir_pin2, 0)
-                self.arduino.pwm_write(self.motor_1_en, 0)
-                self.arduino.pwm_write(self.motor_2_en, 0)
+                # Stops the haptics thread with both motors off
+                self.haptics.shutdown()
                 self.arduino.shutdown()
                 print("Hardware shutdown complete")
             except Exception as e:
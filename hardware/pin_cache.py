@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import deque
+
+# pymata4 is optional here, PinCache also runs on a fake_board.FakeBoard
+try:
+    from pymata4 import pymata4
+    from pymata4.private_constants import PrivateConstants
+except ImportError:
+    pymata4 = PrivateConstants = None
+
+# Firmata message bytes (pymata4.private_constants)
+DIGITAL_MESSAGE = 0x90  # + port number
+ANALOG_MESSAGE = 0xE0   # + pin number, used for PWM writes
+MESSAGE_BYTES = 3       # Both messages are a command byte and two 7-bit data bytes
+
+class PinCache:
+    """Pin state kept up to date by Firmata reporting, with coalesced writes.
+
+    Inputs are registered with the same calls as on a pymata4 board. Firmata
+    then reports them every sampling interval (or on change for digital pins)
+    and the reports update the cache before reaching the caller's callback, so
+    digital_read() and analog_read() are memory lookups.
+
+    Writes are buffered until flush(). A flush sends only pins whose value
+    differs from what the board already has, and only their latest value.
+    Digital pins on the same 8-pin port go out as one port message, so the two
+    direction pins cost one message instead of two. pymata4 has no call for a
+    whole port, so the message is sent raw and pymata4's own record of the
+    port (which its digital_write builds on) is kept in step, in both
+    directions.
+    """
+    def __init__(self, arduino, sampling_interval=19, rate_window=5.0):
+        self.arduino = arduino
+        self.sampling_interval = sampling_interval  # Milliseconds between analog reports
+        self.arduino.set_sampling_interval(sampling_interval)
+        self.rate_window = rate_window
+
+        self._inputs = {}           # (pin type, pin) -> [value, time.time() of the report]
+        self._outputs = {}          # Pin -> value the board has
+        self._pending = {}          # Pin -> (kind, value) written since the last flush
+        self._port_values = {}      # Port -> bit mask of its digital outputs
+        self._lock = threading.Lock()
+
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.reports_received = 0
+        self.frames = 0
+        self.last_frame_messages = 0
+        self._traffic = deque()     # (time, bytes sent, bytes received) within the rate window
+
+    # Inputs
+
+    def set_pin_mode_digital_input(self, pin_number, callback=None):
+        self._inputs[("digital", pin_number)] = [0, 0]
+        self.arduino.set_pin_mode_digital_input(pin_number, callback=self._reporter("digital", callback))
+
+    def set_pin_mode_analog_input(self, pin_number, callback=None, differential=1):
+        self._inputs[("analog", pin_number)] = [0, 0]
+        self.arduino.set_pin_mode_analog_input(pin_number, callback=self._reporter("analog", callback),
+                                               differential=differential)
+
+    def _reporter(self, kind, callback):
+        """pymata4 callback that caches a report before passing it on"""
+        def report(data):
+            _, pin, value, timestamp = data
+            with self._lock:
+                self._inputs[(kind, pin)] = [value, timestamp]
+                self.reports_received += 1
+                self._count_traffic(0, MESSAGE_BYTES)
+            if callback is not None:
+                callback(data)
+        return report
+
+    def digital_read(self, pin):
+        """[value, time] of the last report, as pymata4 returns it"""
+        with self._lock:
+            return list(self._inputs[("digital", pin)])
+
+    def analog_read(self, pin):
+        """(value, time) of the last report, as pymata4 returns it"""
+        with self._lock:
+            return tuple(self._inputs[("analog", pin)])
+
+    # Outputs
+
+    def set_pin_mode_digital_output(self, pin_number):
+        self.arduino.set_pin_mode_digital_output(pin_number)
+        self._outputs[pin_number] = 0
+
+    def set_pin_mode_pwm_output(self, pin_number):
+        self.arduino.set_pin_mode_pwm_output(pin_number)
+        self._outputs[pin_number] = 0
+
+    def digital_write(self, pin, value):
+        with self._lock:
+            self._pending[pin] = ("digital", value)
+
+    def pwm_write(self, pin, value):
+        with self._lock:
+            self._pending[pin] = ("pwm", value)
+
+    def flush(self):
+        """Send the writes buffered since the last flush as one frame, returns the messages sent"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            ports = {}
+            messages = []
+            for pin, (kind, value) in pending.items():
+                if self._outputs.get(pin) == value:
+                    continue
+                self._outputs[pin] = value
+                if kind == "digital":
+                    port = pin // 8
+                    mask = ports.get(port, self._port_mask(port))
+                    ports[port] = mask | (1 << pin % 8) if value else mask & ~(1 << pin % 8)
+                else:
+                    messages.append((pin, value))
+            board_ports = self._board_ports()
+            for port, mask in ports.items():
+                self._port_values[port] = mask
+                if board_ports is not None:
+                    board_ports[port] = mask
+            if not ports and not messages:
+                return 0
+            self.frames += 1
+            self.last_frame_messages = len(ports) + len(messages)
+            self.messages_sent += self.last_frame_messages
+            self.bytes_sent += self.last_frame_messages * MESSAGE_BYTES
+            self._count_traffic(self.last_frame_messages * MESSAGE_BYTES, 0)
+
+        for port, mask in ports.items():
+            self._write_port(port, mask, pending)
+        for pin, value in messages:
+            self.arduino.pwm_write(pin, value)
+        return len(ports) + len(messages)
+
+    def _board_ports(self):
+        """pymata4's port masks (shared by every Pymata4 board), None for other boards"""
+        if pymata4 is not None and isinstance(self.arduino, pymata4.Pymata4):
+            return PrivateConstants.DIGITAL_OUTPUT_PORT_PINS
+        return None
+
+    def _port_mask(self, port):
+        """Outputs of a port, including pins pymata4 itself wrote since the last flush"""
+        board_ports = self._board_ports()
+        if board_ports is not None:
+            return board_ports[port]
+        return self._port_values.get(port, 0)
+
+    def _write_port(self, port, mask, pending):
+        send_command = getattr(self.arduino, "_send_command", None)
+        if send_command is None:
+            # A board without raw commands gets one digital_write per changed pin
+            for pin, (kind, value) in pending.items():
+                if kind == "digital" and pin // 8 == port:
+                    self.arduino.digital_write(pin, value)
+            return
+        send_command((DIGITAL_MESSAGE + port, mask & 0x7f, (mask >> 7) & 0x7f))
+
+    # Counters
+
+    def _count_traffic(self, sent, received):
+        now = time.monotonic()
+        self._traffic.append((now, sent, received))
+        while self._traffic and self._traffic[0][0] < now - self.rate_window:
+            self._traffic.popleft()
+
+    def stats(self):
+        """Serial traffic over the last rate_window seconds and per flushed frame"""
+        with self._lock:
+            now = time.monotonic()
+            recent = [entry for entry in self._traffic if entry[0] >= now - self.rate_window]
+            return {
+                "bytes_sent_per_second": sum(entry[1] for entry in recent) / self.rate_window,
+                "bytes_received_per_second": sum(entry[2] for entry in recent) / self.rate_window,
+                "messages_sent": self.messages_sent,
+                "reports_received": self.reports_received,
+                "frames": self.frames,
+                "messages_per_frame": self.messages_sent / self.frames if self.frames else 0.0,
+                "last_frame_messages": self.last_frame_messages,
+            }
@@ -0,0 +1,142 @@
+import time
+from .solver import MatchupSolver, HEALTH, USES
+
+class _OutOfTime(Exception):
+    pass
+
+class ExpectimaxPlayer:
+    """Computer player for one seat of a Game, in place of the controller.
+
+    Searches the game tree with depth-limited expectiminimax: the AI picks the
+    move with the best expected value, the opponent is assumed to pick the
+    worst one for the AI, and the d20 chance nodes are the damage
+    distributions of MatchupSolver.move_outcomes(). Each chance node keeps
+    `chance_buckets` equally likely outcomes (ordered by the damage dealt) so
+    deeper searches stay affordable. States are the solver's reduced tuples,
+    so cloning a state is building a tuple and the transposition table merges
+    positions reached in different orders.
+
+    choose_move() deepens one ply at a time until `time_budget` seconds are
+    used, and returns the best move of the deepest finished search. Leaves are
+    scored by the difference in health fraction. The search follows the
+    simulator's rules, where a depleted moveset refills, so it can misjudge
+    positions where the Game would skip the turn instead.
+    """
+    def __init__(self, time_budget=0.2, max_depth=12, chance_buckets=4, max_table_entries=200000):
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.chance_buckets = chance_buckets
+        self.max_table_entries = max_table_entries
+        self.solver = MatchupSolver()
+        self._classes = None
+        self._player = None
+        self._table = {}      # (states, player to move, depth) -> value for the AI
+        self._chances = {}    # (player, states, slot) -> [(probability, next states)]
+        self.last_depth = 0   # Depth of the search behind the last choice
+        self.nodes = 0
+
+    def choose_class(self, rng):
+        """Pick a character class number (1-based, as in Character.select_character_class)"""
+        return rng.choice((1, 2, 3))
+
+    def choose_move(self, me, opponent, seat):
+        """Index into me.moves of the move to use, `seat` is 1 if the AI moves first in each round"""
+        player = seat - 1
+        classes = (me.character_class, opponent.character_class)
+        if player == 1:
+            classes = classes[::-1]
+        if (classes, player) != (self._classes, self._player):
+            self.solver.setup(*classes)
+            self._classes, self._player = classes, player
+            self._table.clear()
+            self._chances.clear()
+        elif len(self._table) > self.max_table_entries:
+            self._table.clear()
+        states = [None, None]
+        states[player] = self.solver.state(player, me)
+        states[1 - player] = self.solver.state(1 - player, opponent)
+        states = tuple(states)
+
+        # A character the Game has left with no uses never gets here, so the
+        # solver's refill of depleted movesets doesn't apply to the root
+        slots = [slot for slot, uses in enumerate(me.uses) if uses > 0]
+        best_slot = slots[0]
+        self.deadline = time.perf_counter() + self.time_budget
+        self.nodes = 0
+        for depth in range(1, self.max_depth + 1):
+            try:
+                values = {slot: self._move_value(states, player, slot, depth) for slot in slots}
+            except _OutOfTime:
+                break
+            best_slot = max(slots, key=values.get)
+            self.last_depth = depth
+            if time.perf_counter() > self.deadline:
+                break
+        return best_slot
+
+    def _chance(self, player, states, slot):
+        """Outcomes of a move, merged into at most chance_buckets equally likely groups"""
+        key = (player, states, slot)
+        outcomes = self._chances.get(key)
+        if outcomes is not None:
+            return outcomes
+        merged = {}
+        for probability, child in self.solver.move_outcomes(player, states, slot):
+            merged[child] = merged.get(child, 0.0) + probability
+        outcomes = sorted(merged.items(), key=lambda item: item[0][1 - player][HEALTH], reverse=True)
+        if len(outcomes) > self.chance_buckets:
+            # The outcome at the middle of each equal slice of probability stands for the slice
+            total = sum(probability for _, probability in outcomes)
+            share = total / self.chance_buckets
+            buckets = []
+            seen = 0.0
+            outcome = iter(outcomes)
+            for bucket in range(self.chance_buckets):
+                middle = (bucket + 0.5) * share
+                while seen < middle:
+                    child, probability = next(outcome)
+                    seen += probability
+                buckets.append((share, child))
+            outcomes = buckets
+        else:
+            outcomes = [(probability, child) for child, probability in outcomes]
+        self._chances[key] = outcomes
+        return outcomes
+
+    def _move_value(self, states, player, slot, depth):
+        value = 0.0
+        for probability, child in self._chance(player, states, slot):
+            value += probability * self._after_move(child, player, depth)
+        return value
+
+    def _after_move(self, states, player, depth):
+        """Value of the position after `player` moved, with depth - 1 plies left to search"""
+        # Same rule as battle_winner(): player 1 wins only if still standing
+        if states[0][HEALTH] == 0:
+            return 1.0 if self._player == 1 else -1.0
+        if states[1][HEALTH] == 0:
+            return 1.0 if self._player == 0 else -1.0
+        return self._value(states, 1 - player, depth - 1)
+
+    def _value(self, states, player, depth):
+        if depth == 0:
+            return self._evaluate(states)
+        key = (states, player, depth)
+        value = self._table.get(key)
+        if value is not None:
+            return value
+        # A node expands a few hundred dice outcomes, so the clock is cheap next to it
+        self.nodes += 1
+        if time.perf_counter() > self.deadline:
+            raise _OutOfTime()
+        slots = [slot for slot, uses in enumerate(states[player][USES]) if uses > 0]
+        values = [self._move_value(states, player, slot, depth) for slot in slots]
+        value = max(values) if player == self._player else min(values)
+        self._table[key] = value
+        return value
+
+    def _evaluate(self, states):
+        """Health fraction lead of the AI, kept inside (-1, 1) so a win always scores higher"""
+        me, opponent = states[self._player], states[1 - self._player]
+        max_health = self.solver.max_health
+        return 0.9 * (me[HEALTH] / max_health[self._player] - opponent[HEALTH] / max_health[1 - self._player])
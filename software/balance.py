@@ -0,0 +1,201 @@
+import itertools
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .batch_engine import (BatchBattleEngine, CLASSES, CLASS_ATTACK, CLASS_DEFENSE, CLASS_HEALTH, MOVE_NAMES,
+                           MOVE_POWER, ATTACKER_WINS, DEFENDER_WINS, DRAW)
+
+# Tunable parameters: (name, table, index, search step). A configuration is a
+# tuple with one value per parameter, in this order.
+PARAMETERS = (
+    [(f"{c.name}.health", "class_health", i, 10) for i, c in enumerate(CLASSES)]
+    + [(f"{c.name}.attack", "class_attack", i, 1) for i, c in enumerate(CLASSES)]
+    + [(f"{c.name}.defense", "class_defense", i, 1) for i, c in enumerate(CLASSES)]
+    + [(f"{name}.power", "move_power", i, 2) for i, name in enumerate(MOVE_NAMES)]
+)
+BASELINE = tuple(int(value) for value in np.concatenate([CLASS_HEALTH, CLASS_ATTACK, CLASS_DEFENSE, MOVE_POWER]))
+
+# Pairings that are scored, each played with both classes as player 1
+PAIRS = list(itertools.combinations(range(len(CLASSES)), 2))
+
+# Part of every cache key, bumped whenever the battle engine's dice change
+CACHE_VERSION = 3
+
+def engine_tables(config):
+    """BatchBattleEngine keyword arguments for a configuration"""
+    tables = {"class_health": CLASS_HEALTH.copy(), "class_attack": CLASS_ATTACK.copy(),
+              "class_defense": CLASS_DEFENSE.copy(), "move_power": MOVE_POWER.copy()}
+    for (_, table, index, _), value in zip(PARAMETERS, config):
+        tables[table][index] = value
+    return tables
+
+class Evaluation:
+    """Pairwise win rates of one configuration.
+
+    win_rates[k] is the rate at which the first class of PAIRS[k] beats the
+    second, counting draws as half a win, over `games` games per pairing.
+    """
+    def __init__(self, config, win_rates, games):
+        self.config = tuple(config)
+        self.win_rates = list(win_rates)
+        self.games = games
+
+    @property
+    def imbalance(self):
+        """Root mean square distance of the pairwise win rates from 50%"""
+        return math.sqrt(sum((rate - 0.5) ** 2 for rate in self.win_rates) / len(self.win_rates))
+
+    def confidence_interval(self, k, z=1.96):
+        """Wilson score interval of win_rates[k]"""
+        n, rate = self.games, self.win_rates[k]
+        center = (rate + z * z / (2 * n)) / (1 + z * z / n)
+        margin = z * math.sqrt(rate * (1 - rate) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return center - margin, center + margin
+
+    def patch(self):
+        """Parameters that differ from the current game, as {name: (current, new)}"""
+        return {name: (old, new) for (name, *_), old, new in zip(PARAMETERS, BASELINE, self.config) if old != new}
+
+    def __str__(self):
+        lines = [f"Imbalance {self.imbalance:.4f}"]
+        changes = self.patch()
+        for name, (old, new) in changes.items():
+            lines.append(f"  {name}: {old} -> {new}")
+        if not changes:
+            lines.append("  (current balance)")
+        for k, (a, b) in enumerate(PAIRS):
+            low, high = self.confidence_interval(k)
+            lines.append(f"  {CLASSES[a].name} vs {CLASSES[b].name}: "
+                         f"{self.win_rates[k]:.1%} [{low:.1%}, {high:.1%}]")
+        return "\n".join(lines)
+
+    def to_json(self):
+        return {"win_rates": self.win_rates, "games": self.games}
+
+def evaluate(config, games, seed):
+    """Play `games` games per pairing (half with each class first) under a configuration.
+
+    Every configuration evaluated with the same seed sees the same matchups,
+    and game i gets the same dice every turn it is played, so differences
+    between candidates aren't drowned out by sampling noise (common random
+    numbers). A pairing the configurations don't touch plays out identically.
+    """
+    half = games // 2
+    attackers, defenders = [], []
+    for a, b in PAIRS:
+        attackers += [a] * half + [b] * half
+        defenders += [b] * half + [a] * half
+    result = BatchBattleEngine(attackers, defenders, seed=seed, **engine_tables(config)).run()
+    win_rates = []
+    for k, (a, b) in enumerate(PAIRS):
+        games_k = slice(2 * half * k, 2 * half * (k + 1))
+        winner = result.winner[games_k]
+        first = result.attacker_classes[games_k] == a
+        wins = np.count_nonzero(np.where(first, winner == ATTACKER_WINS, winner == DEFENDER_WINS))
+        draws = np.count_nonzero(winner == DRAW)
+        win_rates.append((wins + draws / 2) / (2 * half))
+    return Evaluation(config, win_rates, 2 * half)
+
+class BalanceOptimizer:
+    """Coordinate descent over class stats and move power towards 50% pairwise win rates.
+
+    Each round evaluates every one-step change of every parameter (in
+    parallel across worker processes) and keeps the best one. Every search
+    evaluation uses the same seed. Evaluations are memoized in `cache_path`, a
+    JSON file keyed by configuration, game count and seed, so reruns and
+    revisited configurations cost nothing.
+
+    Keeping the best of dozens of candidates measured on one seed favours the
+    ones whose dice happened to fall well, so ranked() re-evaluates the best
+    candidates on `validation_seed` and ranks them (and reports their
+    intervals) from those fresh games.
+    """
+    def __init__(self, games=4000, seed=0, workers=None, cache_path="balance_cache.json", validation_seed=None):
+        self.games = games
+        self.seed = seed
+        self.validation_seed = seed + 1 if validation_seed is None else validation_seed
+        self.workers = workers or os.cpu_count()
+        self.cache_path = cache_path
+        self.evaluations = {}   # (config, seed) -> Evaluation
+        self._cache = {}
+        if cache_path is not None and os.path.exists(cache_path):
+            with open(cache_path) as file:
+                self._cache = json.load(file)
+
+    def _key(self, config, seed):
+        return f"{CACHE_VERSION}|{','.join(map(str, config))}|{self.games}|{seed}"
+
+    def evaluate_all(self, configs, seed=None):
+        """Evaluate configurations on `seed` (the search seed by default), skipping the memoized ones"""
+        seed = self.seed if seed is None else seed
+        configs = list(dict.fromkeys(configs))
+        missing = []
+        for config in configs:
+            if (config, seed) in self.evaluations:
+                continue
+            cached = self._cache.get(self._key(config, seed))
+            if cached is None:
+                missing.append(config)
+            else:
+                self.evaluations[config, seed] = Evaluation(config, cached["win_rates"], cached["games"])
+        if missing:
+            games, seeds = [self.games] * len(missing), [seed] * len(missing)
+            if self.workers == 1 or len(missing) == 1:
+                results = list(map(evaluate, missing, games, seeds))
+            else:
+                with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                    results = list(executor.map(evaluate, missing, games, seeds))
+            for evaluation in results:
+                self.evaluations[evaluation.config, seed] = evaluation
+                self._cache[self._key(evaluation.config, seed)] = evaluation.to_json()
+            self._save()
+        return [self.evaluations[config, seed] for config in configs]
+
+    def _save(self):
+        if self.cache_path is None:
+            return
+        with open(self.cache_path + ".tmp", "w") as file:
+            json.dump(self._cache, file)
+        os.replace(self.cache_path + ".tmp", self.cache_path)
+
+    @staticmethod
+    def neighbours(config):
+        """Every configuration one step away, values stay at least 1"""
+        for i, (_, _, _, step) in enumerate(PARAMETERS):
+            for delta in (-step, step):
+                if config[i] + delta >= 1:
+                    yield config[:i] + (config[i] + delta,) + config[i + 1:]
+
+    def optimize(self, rounds=20, start=BASELINE, verbose=True):
+        """Descend from `start` until no single step improves, returns the best Evaluation"""
+        best = self.evaluate_all([start])[0]
+        for round_number in range(1, rounds + 1):
+            candidate = min(self.evaluate_all(self.neighbours(best.config)), key=lambda e: e.imbalance)
+            if candidate.imbalance >= best.imbalance:
+                break
+            best = candidate
+            if verbose:
+                print(f"Round {round_number}: imbalance {best.imbalance:.4f}", flush=True)
+        return best
+
+    def ranked(self, count=10):
+        """The `count` best configurations of the search, re-evaluated on the validation seed
+        and most balanced first by those games"""
+        searched = sorted((evaluation for (_, seed), evaluation in self.evaluations.items() if seed == self.seed),
+                          key=lambda e: e.imbalance)[:count]
+        validated = self.evaluate_all([evaluation.config for evaluation in searched], self.validation_seed)
+        return sorted(validated, key=lambda e: e.imbalance)
+
+def main(games=4000, rounds=20, seed=0, workers=None):
+    """Search for a more balanced configuration and print the best candidate patches"""
+    optimizer = BalanceOptimizer(games, seed, workers)
+    print(f"Current balance:\n{optimizer.evaluate_all([BASELINE])[0]}")
+    optimizer.optimize(rounds)
+    print(f"\nBest candidate patches, re-evaluated on seed {optimizer.validation_seed}:")
+    for rank, evaluation in enumerate(optimizer.ranked(5), 1):
+        print(f"\n#{rank} {evaluation}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+import numpy as np
+from .character import CharacterClass
+from .moves import Move
+from .rng import numpy_generator
+
+# Element encoding used by the arrays (-1 means no element used yet)
+ELEMENTS = [Move.MoveType.FIRE, Move.MoveType.EARTH, Move.MoveType.WATER]
+ELEMENT_INDEX = {element: i for i, element in enumerate(ELEMENTS)}
+NO_ELEMENT = -1
+
+# BEATS[element] is the element that `element` is super effective against
+BEATS = np.array([
+    ELEMENT_INDEX[Move.MoveType.EARTH],  # Fire > Earth
+    ELEMENT_INDEX[Move.MoveType.WATER],  # Earth > Water
+    ELEMENT_INDEX[Move.MoveType.FIRE]    # Water > Fire
+], dtype=np.int8)
+
+CLASSES = list(CharacterClass)
+
+# Per-move tables, indexed by move id (position in MOVE_NAMES), compiled from each Move's MoveEffect
+MOVES = [move for c in CLASSES for move in c.value["moves"]]
+MOVE_NAMES = [move.name for move in MOVES]
+MOVE_IDS = {name: i for i, name in enumerate(MOVE_NAMES)}
+MOVE_POWER = np.array([move.power for move in MOVES], dtype=np.int32)
+MOVE_ELEMENT = np.array([ELEMENT_INDEX[move.move_type] for move in MOVES], dtype=np.int8)
+MOVE_MIN_HITS = np.array([move.effect.hits for move in MOVES], dtype=np.int32)
+MOVE_MAX_HITS = np.array([move.effect.max_hits or move.effect.hits for move in MOVES], dtype=np.int32)
+MOVE_DAMAGE_DIVISOR = np.array([move.effect.damage_divisor for move in MOVES], dtype=np.int32)
+MOVE_IGNORE_DEFENSE = np.array([move.effect.ignore_defense for move in MOVES], dtype=bool)
+MOVE_HEAL_DIVISOR = np.array([move.effect.heal_divisor or 0 for move in MOVES], dtype=np.int32)
+MOVE_RECOIL_DIVISOR = np.array([move.effect.recoil_divisor or 0 for move in MOVES], dtype=np.int32)
+MOVE_POWER_BONUS = [(i, move.effect.power_bonus) for i, move in enumerate(MOVES) if move.effect.power_bonus]
+MOVE_BEST_OF_TWO = [(i, move.effect.best_of_two_if) for i, move in enumerate(MOVES) if move.effect.best_of_two_if]
+MOVE_BEST_OF_TWO_APPLIES = np.array([move.effect.best_of_two_applies for move in MOVES], dtype=bool)
+MAX_HITS = max(2, int(MOVE_MAX_HITS.max()))  # Best-of-two moves always roll twice
+
+# MOVE_STAT_CHANGE[move, who, stat] is the amount applied to the user (who=0) or target (who=1)
+STATS = ["attack", "defense"]
+MOVE_STAT_CHANGE = np.zeros((len(MOVES), 2, len(STATS)), dtype=np.int32)
+MOVE_STAT_PER_HIT = np.zeros((len(MOVES), 2, len(STATS)), dtype=bool)
+for i, move in enumerate(MOVES):
+    for change in move.effect.stat_changes:
+        who = 0 if change.who == "user" else 1
+        MOVE_STAT_CHANGE[i, who, STATS.index(change.stat)] += change.amount
+        MOVE_STAT_PER_HIT[i, who, STATS.index(change.stat)] = change.per_hit
+
+# Per-class tables, indexed by class index (position in CLASSES)
+CLASS_HEALTH = np.array([c.value["health"] for c in CLASSES], dtype=np.int32)
+CLASS_ATTACK = np.array([c.value["attack"] for c in CLASSES], dtype=np.int32)
+CLASS_DEFENSE = np.array([c.value["defense"] for c in CLASSES], dtype=np.int32)
+CLASS_MOVES = np.array([[MOVE_IDS[move.name] for move in c.value["moves"]] for c in CLASSES], dtype=np.int32)
+CLASS_MAX_USES = np.array([[move.max_uses for move in c.value["moves"]] for c in CLASSES], dtype=np.int16)
+
+# Result codes for BatchResult.winner
+ATTACKER_WINS = 0
+DEFENDER_WINS = 1
+DRAW = -1
+
+# Damage values are tracked as histograms, anything above this lands in the last bin
+MAX_TRACKED_DAMAGE = 512
+
+
+class BatchResult:
+    """Outcome of a batch of games plus the statistics gathered while playing them"""
+    def __init__(self, attacker_classes, defender_classes, winner, turns,
+                 move_usage, damage_histogram, healing_histogram, super_effective):
+        self.attacker_classes = attacker_classes  # (N,) class index of player 1
+        self.defender_classes = defender_classes  # (N,) class index of player 2
+        self.winner = winner                      # (N,) ATTACKER_WINS, DEFENDER_WINS or DRAW
+        self.turns = turns                        # (N,) turn the game ended on
+        self.move_usage = move_usage              # (num_moves,) uses per move id
+        self.damage_histogram = damage_histogram  # (num_classes, MAX_TRACKED_DAMAGE + 1) damage per hit
+        self.healing_histogram = healing_histogram  # (num_classes, MAX_TRACKED_DAMAGE + 1) HP per heal
+        self.super_effective = super_effective    # (num_classes,) super effective moves
+
+    @property
+    def num_games(self):
+        return len(self.winner)
+
+    def class_wins(self):
+        """Return the number of wins for each class index"""
+        winning_class = np.where(self.winner == ATTACKER_WINS, self.attacker_classes, self.defender_classes)
+        return np.bincount(winning_class[self.winner != DRAW], minlength=len(CLASSES))
+
+
+class _Fighters:
+    """Per-game stats of one side, with the same attribute names as Character"""
+    def __init__(self, health, max_health, attack, defense, last_damage_taken):
+        self.health = health
+        self.max_health = max_health
+        self.attack = attack
+        self.defense = defense
+        self.last_damage_taken = last_damage_taken
+
+
+class BatchBattleEngine:
+    """Play N independent games at once, one vectorized step per turn.
+
+    Mirrors GameSimulationTest.simulate_game: player 1 (the attacker) moves first,
+    each player picks a random move that still has uses (refilling all uses once
+    they are depleted), and a game is a draw after max_turns turns. Move effects
+    are compiled from the same MoveEffect specs that Move.use runs, and damage is
+    applied twice as in Character.take_damage. Move uses are tracked per game.
+
+    class_health, class_attack, class_defense and move_power replace the
+    CLASS_*/MOVE_POWER tables, to play a candidate balance without editing
+    CharacterClass (see software/balance.py).
+
+    With `antithetic`, game i + N/2 is the antithetic twin of game i: every
+    uniform it draws (move picks, hit counts, d20s) is 1 - u of its twin's, so
+    a high roll in one is a low roll in the other. The two halves must play
+    the same matchups, and the average of a pair has lower variance than two
+    independent games.
+
+    With `side_seeds` (a seed per side) each side draws its dice from its own
+    stream instead of both sharing `seed`. Swapping the seeds between A vs B
+    and B vs A gives each class the same dice in both, which is how
+    MatchupMatrix compares the two.
+    """
+    def __init__(self, attacker_classes, defender_classes, max_turns=50, seed=None,
+                 class_health=CLASS_HEALTH, class_attack=CLASS_ATTACK, class_defense=CLASS_DEFENSE,
+                 move_power=MOVE_POWER, antithetic=False, side_seeds=None):
+        self.rng = numpy_generator(seed)
+        # Dice stream of each side
+        if side_seeds is None:
+            self.rngs = (self.rng, self.rng)
+        else:
+            self.rngs = tuple(numpy_generator(side_seed) for side_seed in side_seeds)
+        self.antithetic = antithetic
+        self.max_turns = max_turns
+        self.move_power = np.asarray(move_power, dtype=np.int32)
+        self.attacker_classes = np.asarray(attacker_classes, dtype=np.int32)
+        self.defender_classes = np.asarray(defender_classes, dtype=np.int32)
+        num_games = len(self.attacker_classes)
+        if antithetic and num_games % 2:
+            raise ValueError("Antithetic games come in pairs, the number of games must be even")
+
+        # Row 0 is player 1 (the attacker), row 1 is player 2 (the defender)
+        self.classes = np.stack([self.attacker_classes, self.defender_classes])
+        class_health = np.asarray(class_health, dtype=np.int32)
+        self.health = class_health[self.classes]
+        self.max_health = class_health[self.classes]
+        self.attack = np.asarray(class_attack, dtype=np.int32)[self.classes]
+        self.defense = np.asarray(class_defense, dtype=np.int32)[self.classes]
+        self.last_damage_taken = np.zeros((2, num_games), dtype=np.int32)
+        self.last_element = np.full((2, num_games), NO_ELEMENT, dtype=np.int8)
+        self.uses = CLASS_MAX_USES[self.classes].copy()
+
+        self.turn = 1
+        self.active = np.ones(num_games, dtype=bool)
+        self.winner = np.full(num_games, DRAW, dtype=np.int8)
+        self.turns = np.full(num_games, max_turns, dtype=np.int16)
+
+        self.move_usage = np.zeros(len(MOVE_NAMES), dtype=np.int64)
+        self.damage_histogram = np.zeros((len(CLASSES), MAX_TRACKED_DAMAGE + 1), dtype=np.int64)
+        self.healing_histogram = np.zeros((len(CLASSES), MAX_TRACKED_DAMAGE + 1), dtype=np.int64)
+        self.super_effective = np.zeros(len(CLASSES), dtype=np.int64)
+
+    @classmethod
+    def random_matchups(cls, num_games, max_turns=50, seed=None):
+        """Create an engine with randomly chosen classes, like GameSimulationTest.run_simulation"""
+        rng = numpy_generator(seed)
+        attacker_classes = rng.integers(0, len(CLASSES), num_games)
+        defender_classes = rng.integers(0, len(CLASSES), num_games)
+        return cls(attacker_classes, defender_classes, max_turns, seed=rng)
+
+    def _uniforms(self, side, games, columns=None):
+        """Uniforms in [0, 1) from `side`'s stream for each game (one row of `columns` per game if given).
+
+        Every call draws rows for all N games and keeps the rows of `games`, so
+        game i always gets row i whichever games are still being played. A game
+        that ends on a different turn under another configuration doesn't shift
+        the dice of the other games (common random numbers).
+        """
+        shape = () if columns is None else (columns,)
+        if not self.antithetic:
+            return self.rngs[side].random((len(self.winner),) + shape, dtype=np.float32)[games]
+        # Draw for the first half of all games and mirror it
+        base = self.rngs[side].random((len(self.winner) // 2,) + shape, dtype=np.float32)
+        return np.minimum(np.concatenate([base, 1 - base])[games], np.nextafter(np.float32(1), np.float32(0)))
+
+    def _integers(self, side, games, low, high, columns=None):
+        """Random integers in [low, high) per game, low and high may be per-game arrays"""
+        return low + (self._uniforms(side, games, columns) * (high - low)).astype(np.int64)
+
+    def _choose_moves(self, side, games):
+        """Pick a random move slot with uses left for each game, refilling depleted movesets"""
+        uses = self.uses[side, games]
+        depleted = ~(uses > 0).any(axis=1)
+        uses[depleted] = CLASS_MAX_USES[self.classes[side, games[depleted]]]
+
+        available = uses > 0
+        pick = (self._uniforms(side, games) * available.sum(axis=1)).astype(np.int32)
+        slot = (available.cumsum(axis=1) > pick[:, None]).argmax(axis=1)
+
+        uses[np.arange(len(games)), slot] -= 1
+        self.uses[side, games] = uses
+        return CLASS_MOVES[self.classes[side, games], slot]
+
+    def _take_damage(self, side, games, damage):
+        """Vectorized Character.take_damage (damage is applied twice, as in the original)"""
+        self.health[side, games] = np.maximum(0, self.health[side, games] - 2 * damage)
+        self.last_damage_taken[side, games] = damage
+
+    def _fighters(self, side, games):
+        """Attribute view of one side's arrays, so MoveEffect callables can run on them"""
+        return _Fighters(self.health[side, games], self.max_health[side, games], self.attack[side, games],
+                         self.defense[side, games], self.last_damage_taken[side, games])
+
+    def _play_moves(self, side, games):
+        """Resolve one move for `side` in every game listed in `games`"""
+        other = 1 - side
+        move = self._choose_moves(side, games)
+        self.move_usage += np.bincount(move, minlength=len(MOVE_NAMES))
+        user = self._fighters(side, games)
+        target = self._fighters(other, games)
+
+        # Conditional power bonuses, evaluated on the state before the move
+        power = self.move_power[move]
+        for move_id, power_bonus in MOVE_POWER_BONUS:
+            power += np.where(move == move_id, power_bonus(user, target), 0)
+        best_of_two = np.zeros(len(games), dtype=bool)
+        for move_id, best_of_two_if in MOVE_BEST_OF_TWO:
+            best_of_two |= (move == move_id) & best_of_two_if(user, target)
+
+        element = MOVE_ELEMENT[move]
+        super_effective = BEATS[element] == self.last_element[other, games]
+        multiplier = np.where(super_effective, 1.5, 1.0)
+        defense_factor = np.where(MOVE_IGNORE_DEFENSE[move], 1.0, user.attack / np.maximum(1, target.defense))
+        self.last_element[side, games] = element
+
+        # Same float expression as Move.calculate_damage, one column per d20
+        rolls = self._integers(side, games, 1, 21, MAX_HITS)
+        base = (rolls + power[:, None]) / 2
+        damage = np.maximum(1, (base * defense_factor[:, None] * multiplier[:, None]).astype(np.int32))
+
+        hits = MOVE_MIN_HITS[move].copy()
+        random_hits = MOVE_MAX_HITS[move] > hits
+        hits[random_hits] = self._integers(side, games[random_hits], hits[random_hits],
+                                           MOVE_MAX_HITS[move[random_hits]] + 1)
+        hits[best_of_two] = 2
+        hit_mask = np.arange(MAX_HITS) < hits[:, None]
+        dealt = ((damage // MOVE_DAMAGE_DIVISOR[move][:, None]) * hit_mask).sum(axis=1)
+        dealt[best_of_two] = np.maximum(damage[best_of_two, 0], damage[best_of_two, 1])
+        # Best-of-two damage that is only announced never reaches the target
+        hit = ~best_of_two | MOVE_BEST_OF_TWO_APPLIES[move]
+        self._take_damage(other, games[hit], dealt[hit])
+        applied = np.where(hit, dealt, 0)
+
+        # Stat changes
+        for who, stat_side in ((0, side), (1, other)):
+            for stat_index, stat in enumerate(STATS):
+                change = MOVE_STAT_CHANGE[move, who, stat_index]
+                change = np.where(MOVE_STAT_PER_HIT[move, who, stat_index], change * hits, change)
+                values = getattr(self, stat)
+                values[stat_side, games] = np.maximum(0, values[stat_side, games] + change)
+
+        # Lifesteal (the user is always alive on its own turn)
+        healer = MOVE_HEAL_DIVISOR[move] > 0
+        heal_amount = applied[healer] // MOVE_HEAL_DIVISOR[move[healer]]
+        heal_games = games[healer]
+        self.health[side, heal_games] = np.minimum(self.max_health[side, heal_games],
+                                                   self.health[side, heal_games] + heal_amount)
+
+        # Recoil
+        recoil = MOVE_RECOIL_DIVISOR[move] > 0
+        self._take_damage(side, games[recoil], applied[recoil] // MOVE_RECOIL_DIVISOR[move[recoil]])
+
+        # Statistics
+        user_class = self.classes[side, games]
+        np.add.at(self.damage_histogram, (user_class, np.minimum(dealt, MAX_TRACKED_DAMAGE)), 1)
+        np.add.at(self.healing_histogram, (user_class[healer], np.minimum(heal_amount, MAX_TRACKED_DAMAGE)), 1)
+        self.super_effective += np.bincount(user_class[super_effective], minlength=len(CLASSES))
+
+    def _finish(self, games, winner):
+        self.winner[games] = winner
+        self.turns[games] = self.turn
+        self.active[games] = False
+
+    def _finish_knockouts(self, games):
+        """Vectorized battle_winner(): a game ends once either player is down, and
+        player 1 wins only if still standing"""
+        player_1_down = self.health[0, games] == 0
+        self._finish(games[player_1_down], DEFENDER_WINS)
+        self._finish(games[~player_1_down & (self.health[1, games] == 0)], ATTACKER_WINS)
+
+    def step(self):
+        """Advance every unfinished game by one turn (attacker move, then defender move)"""
+        games = np.flatnonzero(self.active)
+        if len(games) == 0:
+            return False
+
+        self._play_moves(0, games)
+        self._finish_knockouts(games)
+
+        games = np.flatnonzero(self.active)
+        self._play_moves(1, games)
+        self._finish_knockouts(games)
+
+        if self.turn >= self.max_turns:
+            self._finish(np.flatnonzero(self.active), DRAW)
+        self.turn += 1
+        return self.active.any()
+
+    def run(self):
+        """Play every game to completion and return a BatchResult"""
+        while self.step():
+            pass
+        return BatchResult(self.attacker_classes, self.defender_classes, self.winner, self.turns,
+                           self.move_usage, self.damage_histogram, self.healing_histogram,
+                           self.super_effective)
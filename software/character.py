@@ -1,48 +1,80 @@
 from enum import Enum
-from .moves import Move
+from .moves import Move, MoveEffect, MoveOutcome, StatChange
+from .rng import DEFAULT_RNG
 
 class CharacterClass(Enum):
     KNIGHT = {
         "health": 100,
         "defense": 15,
         "attack": 7,
-        "moves": [
-            Move("Boulder Smash", "EARTH", 5, 10, "Lowers Enemy Defense by 2"),
-            Move("Inferno Counter", "FIRE", 0, 5, "Deals retaliation damage equal to ⅓ of the last hit taken"),
-            Move("Lava Strike", "FIRE", 2, 10, "Raises Attack by 2"),
-            Move("Earthen Tremor", "EARTH", 3, 8, "Lowers enemy attack by 2"),
-            Move("Magma Punch", "FIRE", 4, 8, "Heals 25% of damage dealt"),
-            Move("Rock Breaker", "EARTH", 6, 6, "Bonus damage vs. high defense opponents")
-        ]
+        "moves": (
+            Move("Boulder Smash", "EARTH", 5, 10, "Lowers Enemy Defense by 2",
+                 MoveEffect(stat_changes=[StatChange("target", "defense", -2)])),
+            Move("Inferno Counter", "FIRE", 0, 5, "Deals retaliation damage equal to ⅓ of the last hit taken",
+                 MoveEffect(power_bonus=lambda user, target: user.last_damage_taken // 3)),
+            Move("Lava Strike", "FIRE", 2, 10, "Raises Attack by 2",
+                 MoveEffect(stat_changes=[StatChange("user", "attack", 2)])),
+            Move("Earthen Tremor", "EARTH", 3, 8, "Lowers enemy attack by 2",
+                 MoveEffect(stat_changes=[StatChange("target", "attack", -2)])),
+            Move("Magma Punch", "FIRE", 4, 8, "Heals 25% of damage dealt",
+                 MoveEffect(heal_divisor=4)),
+            Move("Rock Breaker", "EARTH", 6, 6, "Bonus damage vs. high defense opponents",
+                 MoveEffect(power_bonus=lambda user, target: 5 * (target.defense > 10)))
+        )
     }
     WIZARD = {
         "health": 140,
         "defense": 8,
         "attack": 12,
-        "moves": [
-            Move("Flame Surge", "FIRE", 2, 10, "Raises Attack by 2"),
-            Move("Hydro Blast", "WATER", 5, 5, "Damage scales with HP (if HP > 100, add +5)"),
-            Move("Ember Wave", "FIRE", 0, 12, "Restores HP equal to 25% of damage dealt"),
-            Move("Steam Burst", "WATER", 3, 8, "Lowers enemy attack by 2"),
-            Move("Volcanic Surge", "FIRE", 4, 7, "If HP < 50%, roll twice and take the higher number"),
-            Move("Tidal Crash", "WATER", 6, 6, "Deals bonus damage based on missing HP (missing HP / 10 = extra damage)")
-        ]
+        "moves": (
+            Move("Flame Surge", "FIRE", 2, 10, "Raises Attack by 2",
+                 MoveEffect(stat_changes=[StatChange("user", "attack", 2)])),
+            Move("Hydro Blast", "WATER", 5, 5, "Damage scales with HP (if HP > 100, add +5)",
+                 MoveEffect(power_bonus=lambda user, target: 5 * (user.health > 100))),
+            Move("Ember Wave", "FIRE", 0, 12, "Restores HP equal to 25% of damage dealt",
+                 MoveEffect(heal_divisor=4)),
+            Move("Steam Burst", "WATER", 3, 8, "Lowers enemy attack by 2",
+                 MoveEffect(stat_changes=[StatChange("target", "attack", -2)])),
+            Move("Volcanic Surge", "FIRE", 4, 7, "If HP < 50%, roll twice and take the higher number",
+                 # As originally written, the higher roll is announced but never dealt
+                 MoveEffect(best_of_two_if=lambda user, target: user.health < user.max_health // 2,
+                            best_of_two_applies=False)),
+            Move("Tidal Crash", "WATER", 6, 6, "Deals bonus damage based on missing HP (missing HP / 10 = extra damage)",
+                 MoveEffect(power_bonus=lambda user, target: (user.max_health - user.health) // 10))
+        )
     }
     ARCHER = {
         "health": 60,
         "defense": 10,
         "attack": 15,
-        "moves": [
-            Move("Flame Arrow", "FIRE", 3, 12, "Raises Attack by 1 (Stacks up to +3)"),
-            Move("Piercing Shot", "EARTH", 5, 10, "Ignores enemy defense and lowers it by 2"),
-            Move("Searing Volley", "FIRE", 0, 8, "Hits twice, raises attack by 2"),
-            Move("Rock Barrage", "EARTH", 0, 10, "Hit 2-5 times, lowers enemy Defense by 1 per hit"),
-            Move("Explosive Shot", "FIRE", 10, 5, "Deals recoil (user loses ⅓ of damage dealt)"),
-            Move("Sharpened Quake", "EARTH", 6, 6, "Deals extra damage if the target's HP is below 50%")
-        ]
+        "moves": (
+            Move("Flame Arrow", "FIRE", 3, 12, "Raises Attack by 1 (Stacks up to +3)",
+                 MoveEffect(stat_changes=[StatChange("user", "attack", 1)])),
+            Move("Piercing Shot", "EARTH", 5, 10, "Ignores enemy defense and lowers it by 2",
+                 MoveEffect(ignore_defense=True, stat_changes=[StatChange("target", "defense", -2)])),
+            Move("Searing Volley", "FIRE", 0, 8, "Hits twice, raises attack by 2",
+                 MoveEffect(hits=2, damage_divisor=2, stat_changes=[StatChange("user", "attack", 2)])),
+            Move("Rock Barrage", "EARTH", 0, 10, "Hit 2-5 times, lowers enemy Defense by 1 per hit",
+                 MoveEffect(hits=2, max_hits=5, damage_divisor=2,
+                            stat_changes=[StatChange("target", "defense", -1, per_hit=True)])),
+            Move("Explosive Shot", "FIRE", 10, 5, "Deals recoil (user loses ⅓ of damage dealt)",
+                 MoveEffect(recoil_divisor=3)),
+            Move("Sharpened Quake", "EARTH", 6, 6, "Deals extra damage if the target's HP is below 50%",
+                 MoveEffect(power_bonus=lambda user, target: 5 * (target.health < target.max_health // 2)))
+        )
     }
 
 class Character:
+    """A player's character: the shared class definition plus this character's battle state.
+
+    CharacterClass and its Moves are immutable and shared by every character.
+    Everything that changes during a battle (HP, stats, move uses, last hit and
+    element) lives in the slots below, so snapshot() and restore() only copy a
+    handful of values.
+    """
+    __slots__ = ("name", "character_class", "health", "max_health", "defense", "attack", "is_alive",
+                 "moves", "uses", "last_damage_taken", "last_element_used")
+
     def __init__(self, player_name: str):
         self.name = player_name
         self.character_class = None
@@ -51,7 +83,8 @@ class Character:
         self.defense = 0
         self.attack = 0
         self.is_alive = True
-        self.moves = []
+        self.moves = ()
+        self.uses = []  # uses[i] is the number of uses left of moves[i]
         self.last_damage_taken = 0
         self.last_element_used = None
 
@@ -74,17 +107,35 @@ class Character:
                 print(f"Invalid choice: {class_choice}. Please try again.")
                 return False  # Return False to indicate selection failed
             
-            # Initialize character stats
-            self.health = self.character_class.value["health"]
-            self.max_health = self.character_class.value["health"]
-            self.defense = self.character_class.value["defense"]
-            self.attack = self.character_class.value["attack"]
-            self.moves = self.character_class.value["moves"].copy()
-            self.is_alive = True
-            self.last_damage_taken = 0
-            
+            self.initialize_character()
             return True  # Return True to indicate selection succeeded
             
+    def initialize_character(self):
+        """Set stats and moves from the selected character class"""
+        self.health = self.character_class.value["health"]
+        self.max_health = self.character_class.value["health"]
+        self.defense = self.character_class.value["defense"]
+        self.attack = self.character_class.value["attack"]
+        self.moves = self.character_class.value["moves"]
+        self.reset_uses()
+        self.is_alive = True
+        self.last_damage_taken = 0
+        self.last_element_used = None
+
+    def reset_uses(self):
+        """Refill every move to its maximum uses"""
+        self.uses = [move.max_uses for move in self.moves]
+
+    def snapshot(self):
+        """Capture the battle state as a tuple, for restore()"""
+        return (self.health, self.attack, self.defense, self.is_alive,
+                self.last_damage_taken, self.last_element_used, tuple(self.uses))
+
+    def restore(self, snapshot):
+        """Return to a state captured by snapshot()"""
+        (self.health, self.attack, self.defense, self.is_alive,
+         self.last_damage_taken, self.last_element_used, uses) = snapshot
+        self.uses[:] = uses
         
     def take_damage(self, damage):
         """Reduce character's health by the specified damage amount"""
@@ -103,19 +154,37 @@ class Character:
             if self.health > self.max_health:
                 self.health = self.max_health
 
-    def use_move(self, move_index, target):
-        """Use a move on the target"""
+    def use_move(self, move_index, target, rng=DEFAULT_RNG):
+        """Use a move on the target, rolling dice from rng"""
         if 0 <= move_index < len(self.moves):
-            return self.moves[move_index].use(self, target)
-        return False, "Invalid move!"
+            move = self.moves[move_index]
+            if self.uses[move_index] <= 0:
+                return move.depleted(self)
+            self.uses[move_index] -= 1
+            return move.use(self, target, rng)
+        return MoveOutcome(None, self.name, None, success=False, failure="Invalid move!")
 
     def get_available_moves(self):
         """Return a list of moves that still have uses"""
-        return [move for move in self.moves if move.current_uses > 0]
+        return [move for move, uses in zip(self.moves, self.uses) if uses > 0]
 
     def __str__(self):
         """String representation of the character"""
         moves_str = "\nMoves:"
         for i, move in enumerate(self.moves):
-            moves_str += f"\n{i+1}. {move}"
-        return f"{self.character_class.name} - Health: {self.health}/{self.max_health}, Attack: {self.attack}, Defense: {self.defense}{moves_str}" 
\ No newline at end of file
+            moves_str += f"\n{i+1}. {move.describe(self.uses[i])}"
+        return f"{self.character_class.name} - Health: {self.health}/{self.max_health}, Attack: {self.attack}, Defense: {self.defense}{moves_str}" 
+
+def battle_winner(player1, player2):
+    """Winner once a move has resolved: None while both players stand, else 1 or 2.
+
+    This is the end-of-move rule of every engine (Game, the simulator, the
+    replay engine). The battle ends as soon as either player is down and the
+    player left standing wins. If both go down on the same move (a finishing
+    blow with fatal recoil) player 2 wins, as in the original Game. The
+    original simulator gave that game to the mover and called a player 2
+    knocked out by its own recoil a draw, so its win rates differ slightly.
+    """
+    if player1.is_alive and player2.is_alive:
+        return None
+    return 1 if player1.is_alive else 2
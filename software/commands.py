@@ -0,0 +1,80 @@
+import asyncio
+import inspect
+
+class Command:
+    """A request from the game to the hardware. `name` is the on_command string it replaces."""
+    __slots__ = ()
+    name = None
+
+    def params(self):
+        """Keyword arguments for the synchronous on_command API"""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={value!r}" for field, value in self.params().items())
+        return f"{type(self).__name__}({fields})"
+
+class PlayAudio(Command):
+    __slots__ = ("file_path",)
+    name = "play_audio"
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+class Vibrate(Command):
+    __slots__ = ("player_id", "pattern")
+    name = "vibrate"
+
+    def __init__(self, player_id, pattern):
+        self.player_id = player_id
+        self.pattern = pattern
+
+class CheckButton(Command):
+    """Wait for the player's next UP/DOWN/SELECT, the result is None on timeout.
+
+    With menu_size set, a controller that points at options directly can also
+    answer with the index of an option.
+    """
+    __slots__ = ("player_id", "menu_size")
+    name = "check_button"
+
+    def __init__(self, player_id, menu_size=None):
+        self.player_id = player_id
+        self.menu_size = menu_size
+
+# Command classes by their on_command name
+COMMANDS = {command.name: command for command in (PlayAudio, Vibrate, CheckButton)}
+
+class CommandBus:
+    """Routes typed commands to their handlers.
+
+    Handlers take the command and can be coroutine functions or plain functions.
+    send() runs plain handlers in a worker thread, so a blocking hardware call
+    (like waiting for a button) doesn't hold up other tasks on the event loop.
+    dispatch() is the synchronous path used by on_command.
+    """
+    def __init__(self):
+        self._handlers = {}
+
+    def register(self, command_type, handler):
+        self._handlers[command_type] = handler
+
+    def _handler(self, command):
+        handler = self._handlers.get(type(command))
+        if handler is None:
+            raise KeyError(f"No handler for {type(command).__name__}")
+        return handler
+
+    async def send(self, command):
+        """Run the command's handler and return its result"""
+        handler = self._handler(command)
+        if inspect.iscoroutinefunction(handler):
+            return await handler(command)
+        return await asyncio.to_thread(handler, command)
+
+    def dispatch(self, command):
+        """Run the command's handler on the calling thread"""
+        handler = self._handler(command)
+        if inspect.iscoroutinefunction(handler):
+            return asyncio.run(handler(command))
+        return handler(command)
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+
+class DamageEntry:
+    """Damage for all 20 d20 rolls of one (power, attack, defense, effectiveness) combination"""
+    __slots__ = ("damages", "distribution", "expected")
+
+    def __init__(self, damages):
+        self.damages = damages  # damages[roll - 1] is the damage for that roll
+        # (damage, probability) pairs sorted by damage
+        self.distribution = tuple((damage, damages.count(damage) / 20) for damage in sorted(set(damages)))
+        self.expected = sum(damages) / 20
+
+    def damage(self, roll):
+        return self.damages[roll - 1]
+
+class DamageTable:
+    """Memoized damage lookups for Move.calculate_damage.
+
+    Entries whose power, attack and defense fall inside the expected ranges are
+    kept for the lifetime of the table. Anything outside them (stats that drifted
+    far after many buffs or debuffs) goes into a bounded LRU cache instead, so a
+    long game can't grow the table without limit.
+    """
+    def __init__(self, power_range=(0, 40), attack_range=(0, 40), defense_range=(0, 30), max_overflow_entries=1024):
+        self.power_range = power_range
+        self.attack_range = attack_range
+        self.defense_range = defense_range
+        self.max_overflow_entries = max_overflow_entries
+        self._entries = {}
+        self._overflow = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def compute(power, attack, defense, super_effective, ignore_defense):
+        """Build the entry with the same float expression Move.calculate_damage always used"""
+        effectiveness_multiplier = 1.5 if super_effective else 1.0
+        if ignore_defense:
+            defense_factor = 1
+        else:
+            # Prevent division by zero by ensuring minimum defense of 1
+            defense_factor = attack / max(1, defense)
+        return DamageEntry(tuple(max(1, int((d20 + power) / 2 * defense_factor * effectiveness_multiplier))
+                                 for d20 in range(1, 21)))
+
+    def _in_range(self, power, attack, defense):
+        return (self.power_range[0] <= power <= self.power_range[1]
+                and self.attack_range[0] <= attack <= self.attack_range[1]
+                and self.defense_range[0] <= defense <= self.defense_range[1])
+
+    def lookup(self, power, attack, defense, super_effective=False, ignore_defense=False):
+        """Return the DamageEntry for these inputs, computing it on first use"""
+        if ignore_defense:
+            # Attack and defense don't matter when defense is ignored
+            attack = defense = 0
+        key = (power, attack, defense, super_effective, ignore_defense)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        entry = self._overflow.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._overflow.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        entry = DamageTable.compute(power, attack, defense, super_effective, ignore_defense)
+        if self._in_range(power, attack, defense):
+            self._entries[key] = entry
+        else:
+            self._overflow[key] = entry
+            if len(self._overflow) > self.max_overflow_entries:
+                self._overflow.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def precompute(self):
+        """Fill every entry inside the expected ranges up front"""
+        for power in range(self.power_range[0], self.power_range[1] + 1):
+            for super_effective in (False, True):
+                self.lookup(power, 0, 0, super_effective, ignore_defense=True)
+                for attack in range(self.attack_range[0], self.attack_range[1] + 1):
+                    for defense in range(self.defense_range[0], self.defense_range[1] + 1):
+                        self.lookup(power, attack, defense, super_effective)
+
+    def __len__(self):
+        return len(self._entries) + len(self._overflow)
+
+# Shared by every Move, the simulators and any AI player
+DAMAGE_TABLE = DamageTable()
@@ -1,7 +1,12 @@
+import asyncio
+import sys
 from enum import Enum
-from .character import Character
+from .character import Character, battle_winner
+from .commands import CheckButton, PlayAudio
 from .narrator import Narrator
-import time  # Add this import at the top of the file
+from .profiler import PROFILER
+from .rng import GameRNG
+from .tracing import TRACER
 
 class GameState:
     class Turn(Enum):
@@ -14,27 +19,93 @@ class GameState:
         self.turn = self.Turn.NARRATOR
         self.player1 = None  # Will hold Character object
         self.player2 = None  # Will hold Character object
-        self.narrator = Narrator()   # For future narrator implementation
+        self.narrator = Narrator(sinks=[print])  # Narration goes to the console
+
+class MenuState:
+    """Selection state machine of an up/down menu.
+
+    Every UP/DOWN/SELECT edge moves it one step, so menus are as fast as the
+    player's input (including the controller's auto-repeat) with no delays.
+    An option index (from a controller in absolute mode) jumps straight to it.
+    """
+    def __init__(self, options):
+        self.options = options
+        self.selection = 0
+        self.selected = False
+
+    def handle(self, button):
+        """Apply one input, returns True if the selection moved or was confirmed"""
+        if self.selected:
+            return False
+        if isinstance(button, int):
+            if button == self.selection or not 0 <= button < len(self.options):
+                return False
+            self.selection = button
+        elif button == "UP":
+            # Move selection up (wrapping around to bottom if needed)
+            self.selection = (self.selection - 1) % len(self.options)
+        elif button == "DOWN":
+            # Move selection down (wrapping around to top if needed)
+            self.selection = (self.selection + 1) % len(self.options)
+        elif button == "SELECT":
+            self.selected = True
+        else:
+            return False
+        return True
 
 class Game:
-    def __init__(self, hardware_command_listener):
+    """The battle game, written as coroutines.
+
+    Each game keeps its own GameState, so one event loop can host several games.
+    Hardware is reached through `send`: a listener with an async `send(command)`
+    (the Bridge's command bus) is awaited, otherwise its synchronous on_command
+    runs in a worker thread. run(), setup_players(), battle() and player_turn()
+    are thin synchronous wrappers around the coroutines.
+
+    Dice come from the game's own GameRNG. With a ReplayWriter the battle is
+    streamed to it as it is played, so any game can be re-run by ReplayEngine.
+
+    ai_players maps a player id (1 or 2) to a computer player such as
+    ai.ExpectimaxPlayer, which picks that seat's class and moves instead of
+    its controller. The AI thinks in a worker thread, so the event loop keeps
+    serving the other seat, narration and the hardware meanwhile.
+    """
+    def __init__(self, hardware_command_listener, seed=None, replay=None, ai_players=None):
         print("Welcome to the Battle Game!")
         self.hardware_command_listener = hardware_command_listener
         self.state = GameState()
+        self.rng = GameRNG(seed)
+        self.replay = replay
+        self.ai_players = ai_players or {}
+
+    async def send(self, command):
+        """Send a command to the hardware and await its result"""
+        send = getattr(self.hardware_command_listener, "send", None)
+        if send is not None:
+            return await send(command)
+        return await asyncio.to_thread(self.hardware_command_listener.on_command, command.name, **command.params())
 
     def run(self):
-        self.setup_players()
-        self.battle()
+        asyncio.run(self.run_async())
         exit()
 
-    # Need to check other class to ask for input through hardware
+    async def run_async(self):
+        with PROFILER.frame("Game.setup"):
+            await self.setup_players_async()
+        with PROFILER.frame("Game.battle"):
+            await self.battle_async()
+
     def setup_players(self):
+        asyncio.run(self.setup_players_async())
+
+    # Need to check other class to ask for input through hardware
+    async def setup_players_async(self):
         # Player 1 setup
         print("\nPlayer 1 setup:")
         self.state.player1 = Character("Player 1")
         
         # Use menu navigation for Player 1 character selection
-        class_selected = self._navigate_character_select(1)
+        class_selected = await self._select_character_class(1)
         self.state.player1.select_character_class(class_selected)
         
         # Player 2 setup
@@ -42,10 +113,19 @@ class Game:
         self.state.player2 = Character("Player 2")
         
         # Use menu navigation for Player 2 character selection
-        class_selected = self._navigate_character_select(2)
+        class_selected = await self._select_character_class(2)
         self.state.player2.select_character_class(class_selected)
     
-    def _navigate_character_select(self, player_id):
+    async def _select_character_class(self, player_id):
+        """Class number for a player, from the menu or from the seat's AI"""
+        ai = self.ai_players.get(player_id)
+        if ai is None:
+            return await self._navigate_character_select(player_id)
+        class_selected = ai.choose_class(self.rng)
+        print(f"Player {player_id} (computer) picks class {class_selected}", flush=True)
+        return class_selected
+
+    async def _navigate_character_select(self, player_id):
         """Use up/down navigation to select a character class"""
         class_options = [
             "Knight - Moderate health, high defense, low attack",
@@ -53,37 +133,35 @@ class Game:
             "Archer - Low health, moderate defense, high attack"
         ]
         
-        current_selection = 0
-        selection_made = False
+        selection = await self._navigate_menu(
+            class_options, player_id,
+            lambda menu: self._display_menu_options(class_options, menu.selection, player_id),
+            lambda menu: f"Player {player_id} selected: {class_options[menu.selection]}")
         
-        # Display initial options with highlighting
-        self._display_menu_options(class_options, current_selection, player_id)
-        
-        while not selection_made:
-            # Get navigation input
-            button = self.hardware_command_listener.on_command("check_button", player_id=player_id)
+        # Return the class number (1-based index)
+        return selection + 1
+    
+    async def _navigate_menu(self, options, player_id, render, confirmation):
+        """Run a MenuState on the player's inputs until they select, returns the selected index"""
+        with PROFILER.frame("Game.navigation"):
+            menu = MenuState(options)
             
-            if button == "UP":
-                # Move selection up (wrapping around to bottom if needed)
-                current_selection = (current_selection - 1) % len(class_options)
-                self._display_menu_options(class_options, current_selection, player_id)
-                
-            elif button == "DOWN":
-                # Move selection down (wrapping around to top if needed)
-                current_selection = (current_selection + 1) % len(class_options)
-                self._display_menu_options(class_options, current_selection, player_id)
-                
-            elif button == "SELECT":
-                # Confirm selection
-                selection_made = True
-                print(f"Player {player_id} selected: {class_options[current_selection]}")
+            # Display initial options with highlighting
+            render(menu)
             
-            # Add delay after any input processing
-            if button is not None:
-                time.sleep(1)
+            while not menu.selected:
+                # Get navigation input
+                button = await self.send(CheckButton(player_id, len(options)))
+                if not menu.handle(button):
+                    continue
+                TRACER.mark(player_id, "menu_state_change")
+                if menu.selected:
+                    print(confirmation(menu), flush=True)
+                else:
+                    render(menu)
+                TRACER.mark(player_id, "render_flush")
         
-        # Return the class number (1-based index)
-        return current_selection + 1
+        return menu.selection
     
     def _display_menu_options(self, options, selected_index, player_id):
         """Display menu options with the selected one highlighted"""
@@ -93,18 +171,26 @@ class Game:
                 print(f"→ {i+1}. {option} ←")  # Highlight with arrows
             else:
                 print(f"  {i+1}. {option}")
+        sys.stdout.flush()
     
-    # This is where we request the hardware for input and output
     def battle(self):
+        asyncio.run(self.battle_async())
+
+    # This is where we request the hardware for input and output
+    async def battle_async(self):
         print("\nBattle begins!")
+        if self.replay is not None:
+            self.replay.start(self.rng.seed_sequence, self.state.player1.character_class,
+                              self.state.player2.character_class)
         
-        while self.state.player1.is_alive and self.state.player2.is_alive:
+        winner = None
+        while winner is None:
             if self.state.turn == GameState.Turn.PLAYER_1:
-                self.player_turn(self.state.player1, self.state.player2)
+                await self.player_turn_async(self.state.player1, self.state.player2)
                 self.state.turn = GameState.Turn.PLAYER_2
                 
             elif self.state.turn == GameState.Turn.PLAYER_2:
-                self.player_turn(self.state.player2, self.state.player1)
+                await self.player_turn_async(self.state.player2, self.state.player1)
                 self.state.turn = GameState.Turn.NARRATOR
                 
             elif self.state.turn == GameState.Turn.NARRATOR:
@@ -112,69 +198,61 @@ class Game:
                 self.state.round += 1
                 print(f"Round {self.state.round} completed!")
                 self.state.turn = GameState.Turn.PLAYER_1
+            winner = battle_winner(self.state.player1, self.state.player2)
         
         # Battle ended
-        winner = self.state.player1 if self.state.player1.is_alive else self.state.player2
-        self.play_victory_sound()
+        if self.replay is not None:
+            self.replay.finish(winner, self.state.player1.health, self.state.player2.health)
+        await self.play_victory_sound_async()
 
     def player_turn(self, player, opponent):
-        print(self.state.narrator.announce_turn(player.name))
+        asyncio.run(self.player_turn_async(player, opponent))
+
+    async def player_turn_async(self, player, opponent):
+        self.state.narrator.narrate(self.state.narrator.announce_turn(player.name))
         print(player)
         
         # Show available moves
         available_moves = player.get_available_moves()
         if not available_moves:
-            print(self.state.narrator.announce_no_moves())
+            self.state.narrator.narrate(self.state.narrator.announce_no_moves())
+            if self.replay is not None:
+                self.replay.no_move()
             return
         
         # Determine which player is active
         player_id = 1 if player == self.state.player1 else 2
         
-        # Use menu navigation for move selection
-        move_options = [f"{move.name} - {move.effect_description}" for move in available_moves]
-        selected_index = self._navigate_move_select(move_options, player_id)
-        
-        # Use the selected move
-        move_index = player.moves.index(available_moves[selected_index])
-        success, message = player.use_move(move_index, opponent)
-        print(message)
+        ai = self.ai_players.get(player_id)
+        if ai is not None:
+            # Search in a worker thread so the event loop stays responsive
+            with PROFILER.frame("Game.ai_move"):
+                move_index = await asyncio.to_thread(ai.choose_move, player, opponent, player_id)
+            print(f"Player {player_id} (computer) selected: {player.moves[move_index].name}", flush=True)
+        else:
+            # Use menu navigation for move selection
+            move_options = [f"{move.name} - {move.effect_description}" for move in available_moves]
+            selected_index = await self._navigate_move_select(move_options, player_id)
+            
+            # Use the selected move
+            move_index = player.moves.index(available_moves[selected_index])
+        if self.replay is not None:
+            self.replay.move(move_index)
+        outcome = player.use_move(move_index, opponent, self.rng)
+        self.state.narrator.narrate(outcome.message)
+        TRACER.mark(player_id, "move_resolved")
     
-    def _navigate_move_select(self, options, player_id):
+    async def _navigate_move_select(self, options, player_id):
         """Use up/down navigation to select a move"""
-        current_selection = 0
-        selection_made = False
+        def render(menu):
+            self._display_menu_options(options, menu.selection, player_id)
+            print(self.state.narrator.request_move_choice(), flush=True)
         
-        # Display initial options with highlighting
-        self._display_menu_options(options, current_selection, player_id)
-        print(self.state.narrator.request_move_choice())
-        
-        while not selection_made:
-            # Get navigation input
-            button = self.hardware_command_listener.on_command("check_button", player_id=player_id)
-            
-            if button == "UP":
-                # Move selection up (wrapping around to bottom if needed)
-                current_selection = (current_selection - 1) % len(options)
-                self._display_menu_options(options, current_selection, player_id)
-                print(self.state.narrator.request_move_choice())
-                
-            elif button == "DOWN":
-                # Move selection down (wrapping around to top if needed)
-                current_selection = (current_selection + 1) % len(options)
-                self._display_menu_options(options, current_selection, player_id)
-                print(self.state.narrator.request_move_choice())
-                
-            elif button == "SELECT":
-                # Confirm selection
-                selection_made = True
-                print(f"Selected: {options[current_selection]}")
-            
-            # Add delay after any input processing
-            if button is not None:
-                time.sleep(1)
-        
-        # Return the selected index
-        return current_selection
+        return await self._navigate_menu(options, player_id, render,
+                                         lambda menu: f"Selected: {options[menu.selection]}")
 
     def play_victory_sound(self):
-        self.hardware_command_listener.on_command("play_audio", file_path="victory.mp3")
\ No newline at end of file
+        asyncio.run(self.play_victory_sound_async())
+
+    async def play_victory_sound_async(self):
+        await self.send(PlayAudio("victory.mp3"))
\ No newline at end of file
@@ -0,0 +1,191 @@
+import math
+from statistics import NormalDist
+import numpy as np
+from .batch_engine import BatchBattleEngine, CLASSES, ATTACKER_WINS, DRAW
+from .streaming_stats import RunningStats
+
+class MatchupCell:
+    """Player 1's score against player 2 in one ordered class pairing.
+
+    A game scores 1 for a player 1 win, 0.5 for a draw and 0 for a loss. With
+    antithetic games the observations are the mean scores of twin pairs,
+    which is what makes their variance (and so the interval) smaller.
+    """
+    __slots__ = ("attacker_class", "defender_class", "scores", "games", "done")
+
+    def __init__(self, attacker_class, defender_class):
+        self.attacker_class = attacker_class
+        self.defender_class = defender_class
+        self.scores = RunningStats()
+        self.games = 0
+        self.done = False
+
+    @property
+    def win_rate(self):
+        return self.scores.mean
+
+    def half_width(self, z):
+        """Half width of the normal confidence interval of win_rate"""
+        if self.scores.count < 2:
+            return math.inf
+        return z * math.sqrt(self.scores.variance / self.scores.count)
+
+    def observations_needed(self, z, half_width):
+        """Observations for the interval to reach half_width, at the current variance"""
+        return math.ceil(z * z * self.scores.variance / (half_width * half_width))
+
+class MirroredPair:
+    """The cells A vs B and B vs A (a single cell when A is B), played together.
+
+    Both cells play the same games each round, and each class draws its dice
+    from its own stream in both, so game i of A vs B and game i of B vs A
+    roll the same dice for the same class. `advantage` holds the paired
+    observations of the pair's mean player 1 score minus 50%, whose variance
+    the shared dice make smaller than independent games would.
+    """
+    __slots__ = ("cells", "advantage")
+
+    def __init__(self, cells):
+        self.cells = cells
+        self.advantage = RunningStats()
+
+    @property
+    def done(self):
+        return all(cell.done for cell in self.cells)
+
+    @property
+    def games(self):
+        return self.cells[0].games
+
+    def independent_variance(self):
+        """Variance of the advantage observations if the two cells had played on independent dice"""
+        return sum(cell.scores.variance for cell in self.cells) / len(self.cells) ** 2
+
+class MatchupMatrix:
+    """Player 1 win rate of every ordered class pairing, to a target confidence.
+
+    Games are played in rounds on the BatchBattleEngine. Each round gives every
+    unfinished cell the games its current variance says it still needs
+    (between min_games and max_round_games), and a cell stops once its
+    confidence interval is narrower than `width`. Variance reduction:
+
+    - antithetic games: each game is played with a twin on mirrored dice
+    - common random numbers: A vs B and B vs A are played as a MirroredPair,
+      each class rolling the same dice in both, so the first-mover advantage
+      (their mean score minus 50%) is measured with less noise. Pairs use
+      independent seeds, so their intervals combine as independent estimates.
+    """
+    def __init__(self, width=0.02, confidence=0.95, seed=None, min_games=1000, max_round_games=20000,
+                 max_games=1000000, antithetic=True, max_turns=50):
+        self.width = width
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.confidence = confidence
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.min_games = min_games
+        self.max_round_games = max_round_games
+        self.max_games = max_games  # Per cell
+        self.antithetic = antithetic
+        self.max_turns = max_turns
+        self.cells = [[MatchupCell(a, b) for b in CLASSES] for a in CLASSES]
+        self.pairs = [MirroredPair([self.cells[a][b]] if a == b else [self.cells[a][b], self.cells[b][a]])
+                      for a in range(len(CLASSES)) for b in range(a, len(CLASSES))]
+        self.rounds = 0
+
+    def _play(self, cell, games, side_seeds):
+        """Play a round of one cell, returns the scores of its observations"""
+        a, b = CLASSES.index(cell.attacker_class), CLASSES.index(cell.defender_class)
+        result = BatchBattleEngine([a] * games, [b] * games, self.max_turns, antithetic=self.antithetic,
+                                   side_seeds=side_seeds).run()
+        scores = np.where(result.winner == ATTACKER_WINS, 1.0, np.where(result.winner == DRAW, 0.5, 0.0))
+        if self.antithetic:
+            scores = (scores[:games // 2] + scores[games // 2:]) / 2
+        _add_all(cell.scores, scores)
+        cell.games += games
+        return scores
+
+    def _games_needed(self, cell, per_observation):
+        if cell.done:
+            return 0
+        if cell.scores.count < 2:
+            return self.min_games
+        needed = cell.observations_needed(self.z, self.width / 2) - cell.scores.count
+        return min(self.max_round_games, max(self.min_games, needed * per_observation))
+
+    def step(self):
+        """Play one round, returns False once every cell is done"""
+        active = [pair for pair in self.pairs if not pair.done]
+        if not active:
+            return False
+        per_observation = 2 if self.antithetic else 1
+        for pair in active:
+            games = max(self._games_needed(cell, per_observation) for cell in pair.cells)
+            games = min(games, self.max_games - pair.games)
+            games -= games % per_observation
+            # One dice stream per class, swapped with the seats in the mirrored cell
+            side_seeds = self.seed_sequence.spawn(2)
+            scores = [self._play(cell, games, side_seeds[::1 if index == 0 else -1])
+                      for index, cell in enumerate(pair.cells)]
+            _add_all(pair.advantage, sum(scores) / len(scores) - 0.5)
+            for cell in pair.cells:
+                cell.done = (cell.half_width(self.z) * 2 <= self.width
+                             or cell.games + per_observation > self.max_games)
+        self.rounds += 1
+        return any(not pair.done for pair in active)
+
+    def run(self):
+        while self.step():
+            pass
+        return self
+
+    @property
+    def total_games(self):
+        return sum(cell.games for row in self.cells for cell in row)
+
+    def fixed_allocation_games(self):
+        """Games a fixed allocation needs for the same width: independent games in every
+        cell, enough for the worst case win rate of 50%"""
+        per_cell = math.ceil(self.z * self.z * 0.25 / (self.width / 2) ** 2)
+        return per_cell * len(CLASSES) ** 2
+
+    def _advantage_weights(self):
+        """Share of each pair in the mean over every cell"""
+        return [len(pair.cells) / len(CLASSES) ** 2 for pair in self.pairs]
+
+    def first_mover_advantage(self):
+        """Mean player 1 win rate over every pairing minus 50%, and the half width of its interval"""
+        weights = self._advantage_weights()
+        advantage = sum(weight * pair.advantage.mean for weight, pair in zip(weights, self.pairs))
+        variance = sum(weight * weight * pair.advantage.variance / pair.advantage.count
+                       for weight, pair in zip(weights, self.pairs))
+        return advantage, self.z * math.sqrt(variance)
+
+    def common_dice_variance_ratio(self):
+        """Variance of the first-mover advantage estimate over what independent dice in mirrored cells would give"""
+        weights = self._advantage_weights()
+        paired = sum(weight * weight * pair.advantage.variance / pair.advantage.count
+                     for weight, pair in zip(weights, self.pairs))
+        independent = sum(weight * weight * pair.independent_variance() / pair.advantage.count
+                          for weight, pair in zip(weights, self.pairs))
+        return paired / independent
+
+    def report(self):
+        z = self.z
+        name_width = max(len(c.name) for c in CLASSES) + 2
+        lines = [f"Player 1 win rate (rows) against player 2 (columns), {self.confidence:.0%} intervals:",
+                 " " * name_width + "".join(f"{c.name:>24}" for c in CLASSES)]
+        for attacker_class, row in zip(CLASSES, self.cells):
+            cells = "".join(f"{f'{cell.win_rate:.1%} ±{cell.half_width(z):.1%} n={cell.games}':>24}"
+                            for cell in row)
+            lines.append(f"{attacker_class.name:<{name_width}}{cells}")
+        advantage, half_width = self.first_mover_advantage()
+        lines.append(f"First-mover advantage: {advantage:+.1%} ±{half_width:.1%} "
+                     f"(shared dice: {self.common_dice_variance_ratio():.0%} of the variance of independent games)")
+        fixed = self.fixed_allocation_games()
+        lines.append(f"Games played: {self.total_games} in {self.rounds} rounds, "
+                     f"{self.total_games / fixed:.0%} of the {fixed} a fixed allocation needs for the same width")
+        return "\n".join(lines)
+
+def _add_all(stats, values):
+    """Add an array of observations to a RunningStats, one add() per distinct value"""
+    for value, count in zip(*np.unique(values, return_counts=True)):
+        stats.add(float(value), int(count))
@@ -1,6 +1,95 @@
 from enum import Enum
-import random
-from .narrator import Narrator
+from .narrator import Message, Narrator
+from .damage_table import DAMAGE_TABLE
+from .profiler import PROFILER
+from .rng import DEFAULT_RNG
+
+class StatChange:
+    """A stat change applied after a move's damage.
+
+    `who` is "user" or "target". Stats never drop below 0. With `per_hit`
+    the amount is applied once per hit of the move.
+    """
+    __slots__ = ("who", "stat", "amount", "per_hit")
+
+    def __init__(self, who, stat, amount, per_hit=False):
+        self.who = who
+        self.stat = stat
+        self.amount = amount
+        self.per_hit = per_hit
+
+class MoveEffect:
+    """Declarative description of what a move does, executed by Move.use.
+
+    power_bonus and best_of_two_if take (user, target) and must only use
+    attribute access and arithmetic/comparisons (e.g. `5 * (target.defense > 10)`),
+    so the same spec also runs on the NumPy arrays of the BatchBattleEngine.
+    """
+    __slots__ = ("power_bonus", "best_of_two_if", "best_of_two_applies", "hits", "max_hits", "damage_divisor",
+                 "ignore_defense", "heal_divisor", "recoil_divisor", "stat_changes")
+
+    def __init__(self, power_bonus=None, best_of_two_if=None, best_of_two_applies=True, hits=1, max_hits=None,
+                 damage_divisor=1, ignore_defense=False, heal_divisor=None, recoil_divisor=None, stat_changes=()):
+        self.power_bonus = power_bonus          # Extra power added before rolling
+        self.best_of_two_if = best_of_two_if    # Roll twice and keep the higher damage when true
+        self.best_of_two_applies = best_of_two_applies  # False announces the higher damage without dealing it
+        self.hits = hits                        # Number of hits (minimum if max_hits is set)
+        self.max_hits = max_hits                # Roll the number of hits between hits and max_hits
+        self.damage_divisor = damage_divisor    # Each hit's damage is divided by this
+        self.ignore_defense = ignore_defense    # Use a defense factor of 1
+        self.heal_divisor = heal_divisor        # User heals damage // heal_divisor
+        self.recoil_divisor = recoil_divisor    # User takes damage // recoil_divisor
+        self.stat_changes = tuple(stat_changes)
+
+class MoveOutcome:
+    """Structured result of Move.use.
+
+    Holds the numbers behind a move (rolls, damage, healing, recoil, stat changes
+    and effectiveness) so callers can read them directly. The narration text is
+    only built when `message` is accessed.
+    """
+    __slots__ = ("narrator", "user_name", "move_name", "success", "failure",
+                 "roll", "rolls", "damage", "hit_damages", "took_higher", "variable_hits",
+                 "healing", "recoil", "stat_changes", "super_effective")
+
+    def __init__(self, narrator, user_name, move_name, success=True, failure=None):
+        self.narrator = narrator
+        self.user_name = user_name
+        self.move_name = move_name
+        self.success = success
+        self.failure = failure          # Narration (str or Message) for a move that could not be used
+        self.roll = None                # The d20 roll that is announced
+        self.rolls = ()                 # Every d20 rolled for the move
+        self.damage = 0                 # Total damage of the move
+        self.hit_damages = ()           # Damage of each roll
+        self.took_higher = False        # Rolled twice and kept the higher damage
+        self.variable_hits = False      # Hit a random number of times
+        self.healing = None             # HP the user healed, None if the move does not heal
+        self.recoil = None              # Recoil damage taken by the user, None if no recoil
+        self.stat_changes = ()          # (character name, stat, amount) tuples
+        self.super_effective = False
+
+    def add_hit(self, roll, damage):
+        """Record a roll and the damage it dealt"""
+        if self.roll is None:
+            self.roll = roll
+        self.rolls += (roll,)
+        self.hit_damages += (damage,)
+        self.damage += damage
+
+    def add_stat_change(self, character_name, stat, amount):
+        self.stat_changes += ((character_name, stat, amount),)
+
+    @property
+    def hits(self):
+        return len(self.rolls)
+
+    @property
+    def message(self):
+        """Narration for the move, a Message that is only formatted when read"""
+        if not self.success:
+            return self.failure
+        return self.narrator.announce_outcome(self)
 
 class Move:
     class MoveType(Enum):
@@ -32,215 +121,125 @@ class Move:
         
         return effectiveness.get(attacker_element) == defender_last_element
 
-    def __init__(self, name, move_type, power, max_uses, effect_description):
-        self.name = name
+    # Moves are shared definitions, so they all narrate through one Narrator
+    narrator = Narrator()
+    __slots__ = ("name", "move_type", "power", "max_uses", "effect_description", "effect")
+
+    def __init__(self, name, move_type, power, max_uses, effect_description, effect=None):
         # Accept either string or MoveType enum
-        self.move_type = move_type if isinstance(move_type, Move.MoveType) else Move.get_move_type(move_type)
-        self.power = power
-        self.max_uses = max_uses
-        self.current_uses = max_uses
-        self.effect_description = effect_description
-        self.narrator = Narrator()
-
-    def calculate_damage(self, attacker, defender, ignore_defense=False):
+        move_type = move_type if isinstance(move_type, Move.MoveType) else Move.get_move_type(move_type)
+        for attribute, value in (("name", name), ("move_type", move_type), ("power", power),
+                                 ("max_uses", max_uses), ("effect_description", effect_description),
+                                 ("effect", effect if effect is not None else MoveEffect())):
+            object.__setattr__(self, attribute, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Move definitions are immutable, can't set {name!r}")
+
+    def damage_entry(self, attacker, defender, ignore_defense=False, power=None, super_effective=None):
+        """Look up the DamageEntry (damage for every d20 roll) for this move"""
+        if power is None:
+            power = self.power
+        if super_effective is None:
+            super_effective = Move.is_super_effective(self.move_type, defender.last_element_used)
+        return DAMAGE_TABLE.lookup(power, attacker.attack, defender.defense, super_effective, ignore_defense)
+
+    def calculate_damage(self, attacker, defender, ignore_defense=False, power=None, rng=DEFAULT_RNG):
         """Calculate damage using the formula: D = ((d20 + B)/2) × (A/d)
         with elemental effectiveness multiplier"""
-        d20 = random.randint(1, 20)
-        base = (d20 + self.power) / 2
-        
-        # Check for elemental effectiveness
-        effectiveness_multiplier = 1.5 if Move.is_super_effective(self.move_type, defender.last_element_used) else 1.0
-        effectiveness_text = self.narrator.announce_super_effective() if effectiveness_multiplier > 1 else ""
-        
+        d20 = rng.d20()
+        damage = self.damage_entry(attacker, defender, ignore_defense, power).damages[d20 - 1]
+        return damage, d20  # Return damage and roll
+
+    def damage_formula(self, attacker, defender, d20, ignore_defense=False, power=None):
+        """Describe how the damage of a roll was calculated"""
+        if power is None:
+            power = self.power
+        super_effective = Move.is_super_effective(self.move_type, defender.last_element_used)
+        effectiveness_multiplier = 1.5 if super_effective else 1.0
+        effectiveness = self.narrator.announce_super_effective() if super_effective else ""
         if ignore_defense:
-            defense_factor = 1
-            formula = f"(({d20} + {self.power})/2) × 1 × {effectiveness_multiplier}"  # Ignoring defense
-        else:
-            # Prevent division by zero by ensuring minimum defense of 1
-            defense = max(1, defender.defense)
-            defense_factor = attacker.attack / defense
-            formula = f"(({d20} + {self.power})/2) × ({attacker.attack}/{defense}) × {effectiveness_multiplier}"
-            
-        damage = int(base * defense_factor * effectiveness_multiplier)
-        damage = max(1, damage)  # Ensure minimum damage of 1
-        return damage, d20, formula + effectiveness_text  # Return damage, roll, and formula
+            # Ignoring defense
+            return Message("formula_ignoring_defense", d20, power, effectiveness_multiplier, effectiveness)
+        defense = max(1, defender.defense)
+        return Message("formula", d20, power, attacker.attack, defense, effectiveness_multiplier, effectiveness)
 
-    def use(self, user, target):
-        if self.current_uses <= 0:
-            return False, self.narrator.announce_move_depleted(self.name)
-        
-        self.current_uses -= 1
+    def depleted(self, user):
+        """Outcome of trying to use the move with no uses left"""
+        return MoveOutcome(self.narrator, user.name, self.name, success=False,
+                           failure=self.narrator.announce_move_depleted(self.name))
+
+    def use(self, user, target, rng=DEFAULT_RNG):
+        """Apply the move's effects, move uses are tracked by the user (see Character.use_move)"""
+        profiling = PROFILER.enabled
+        if profiling:
+            move_frame = PROFILER.push(f"Move.use[{self.name}]")
+            phase = PROFILER.push("damage_entry")
+        outcome = MoveOutcome(self.narrator, user.name, self.name)
+        outcome.super_effective = Move.is_super_effective(self.move_type, target.last_element_used)
         
         # Store the element type used for future effectiveness calculations
         user.last_element_used = self.move_type
         
-        # Apply move-specific effects
-        if self.name == "Boulder Smash":
-            damage, roll, formula = self.calculate_damage(user, target)
-            target.take_damage(damage)
-            target.defense = max(0, target.defense - 2)
-            effects = self.narrator.announce_stat_change(target.name, "defense", -2)
-            return True, self.narrator.announce_move(user.name, "Boulder Smash", roll, damage, effects=effects)
-            
-        elif self.name == "Inferno Counter":
-            bonus_power = self.power + (user.last_damage_taken // 3)
-            self.power = bonus_power  # Temporarily modify power for damage calculation
-            damage, roll, formula = self.calculate_damage(user, target)
-            self.power = 0  # Reset power
-            target.take_damage(damage)
-            return True, self.narrator.announce_move(user.name, "Inferno Counter", roll, damage)
-            
-        elif self.name == "Lava Strike":
-            damage, roll, formula = self.calculate_damage(user, target)
-            user.attack += 2
-            target.take_damage(damage)
-            effects = self.narrator.announce_stat_change(user.name, "attack", 2)
-            return True, self.narrator.announce_move(user.name, "Lava Strike", roll, damage, effects=effects)
-            
-        elif self.name == "Earthen Tremor":
-            damage, roll, formula = self.calculate_damage(user, target)
-            target.attack = max(0, target.attack - 2)
-            target.take_damage(damage)
-            effects = self.narrator.announce_stat_change(target.name, "attack", -2)
-            return True, self.narrator.announce_move(user.name, "Earthen Tremor", roll, damage, effects=effects)
-            
-        elif self.name == "Magma Punch":
-            damage, roll, formula = self.calculate_damage(user, target)
-            target.take_damage(damage)
-            heal_amount = damage // 4
-            user.heal(heal_amount)
-            effects = self.narrator.announce_healing(user.name, heal_amount)
-            return True, self.narrator.announce_move(user.name, "Magma Punch", roll, damage, effects=effects)
-            
-        elif self.name == "Rock Breaker":
-            if target.defense > 10:
-                self.power += 5  # Temporarily increase power
-            damage, roll, formula = self.calculate_damage(user, target)
-            if target.defense > 10:
-                self.power -= 5  # Reset power
-            target.take_damage(damage)
-            return True, self.narrator.announce_move(user.name, "Rock Breaker", roll, damage)
-
-        # Wizard moves
-        elif self.name == "Flame Surge":
-            damage, roll, formula = self.calculate_damage(user, target)
-            user.attack += 2
-            target.take_damage(damage)
-            effects = self.narrator.announce_stat_change(user.name, "attack", 2)
-            return True, self.narrator.announce_move(user.name, "Flame Surge", roll, damage, effects=effects)
-            
-        elif self.name == "Hydro Blast":
-            if user.health > 100:
-                self.power += 5  # Temporarily increase power
-            damage, roll, formula = self.calculate_damage(user, target)
-            if user.health > 100:
-                self.power -= 5  # Reset power
-            target.take_damage(damage)
-            return True, self.narrator.announce_move(user.name, "Hydro Blast", roll, damage)
-            
-        elif self.name == "Ember Wave":
-            damage, roll, formula = self.calculate_damage(user, target)
-            target.take_damage(damage)
-            heal_amount = damage // 4
-            user.heal(heal_amount)
-            effects = self.narrator.announce_healing(user.name, heal_amount)
-            return True, self.narrator.announce_move(user.name, "Ember Wave", roll, damage, effects=effects)
-            
-        elif self.name == "Steam Burst":
-            damage, roll, formula = self.calculate_damage(user, target)
-            target.attack = max(0, target.attack - 2)
-            target.take_damage(damage)
-            effects = self.narrator.announce_stat_change(target.name, "attack", -2)
-            return True, self.narrator.announce_move(user.name, "Steam Burst", roll, damage, effects=effects)
-            
-        elif self.name == "Volcanic Surge":
-            if user.health < user.max_health // 2:
-                # Roll twice and take the higher number
-                damage1, roll1, formula1 = self.calculate_damage(user, target)
-                damage2, roll2, formula2 = self.calculate_damage(user, target)
-                if damage1 > damage2:
-                    damage, roll, formula = damage1, roll1, formula1
-                else:
-                    damage, roll, formula = damage2, roll2, formula2
-                effects = f"(Rolled {roll1} and {roll2}, took higher)"
-                return True, self.narrator.announce_move(user.name, "Volcanic Surge", roll, damage, effects=effects)
+        effect = self.effect
+        power = self.power
+        if effect.power_bonus is not None:
+            power += effect.power_bonus(user, target)
+        
+        # Roll for damage, every roll of the move uses the same damage table entry
+        entry = self.damage_entry(user, target, effect.ignore_defense, power, outcome.super_effective)
+        if profiling:
+            PROFILER.pop(phase)
+            phase = PROFILER.push("rolls")
+        if effect.best_of_two_if is not None and effect.best_of_two_if(user, target):
+            roll1 = rng.d20()
+            roll2 = rng.d20()
+            damage1 = entry.damages[roll1 - 1]
+            damage2 = entry.damages[roll2 - 1]
+            outcome.rolls = (roll1, roll2)
+            outcome.hit_damages = (damage1, damage2)
+            outcome.took_higher = True
+            if damage1 > damage2:
+                outcome.roll, outcome.damage = roll1, damage1
             else:
-                damage, roll, formula = self.calculate_damage(user, target)
-                target.take_damage(damage)
-                return True, self.narrator.announce_move(user.name, "Volcanic Surge", roll, damage)
-            
-        elif self.name == "Tidal Crash":
-            missing_hp = user.max_health - user.health
-            self.power += missing_hp // 10  # Add bonus damage based on missing HP
-            damage, roll, formula = self.calculate_damage(user, target)
-            self.power -= missing_hp // 10  # Reset power
-            target.take_damage(damage)
-            return True, self.narrator.announce_move(user.name, "Tidal Crash", roll, damage)
-
-        # Archer moves
-        elif self.name == "Flame Arrow":
-            damage, roll, formula = self.calculate_damage(user, target)
-            target.take_damage(damage)
-            user.attack = min(user.attack + 1, user.attack + 3)  # Stack up to +3
-            effects = self.narrator.announce_stat_change(user.name, "attack", 1)
-            return True, self.narrator.announce_move(user.name, "Flame Arrow", roll, damage, effects=effects)
-            
-        elif self.name == "Piercing Shot":
-            damage, roll, formula = self.calculate_damage(user, target, ignore_defense=True)  # Ignores defense
-            target.take_damage(damage)
-            target.defense = max(0, target.defense - 2)
-            effects = self.narrator.announce_stat_change(target.name, "defense", -2)
-            return True, self.narrator.announce_move(user.name, "Piercing Shot", roll, damage, effects=effects)
-            
-        elif self.name == "Searing Volley":
-            # Hit twice with half damage each time
-            damage1, roll1, formula1 = self.calculate_damage(user, target)
-            damage2, roll2, formula2 = self.calculate_damage(user, target)
-            damage1 = damage1 // 2
-            damage2 = damage2 // 2
-            total_damage = damage1 + damage2
-            target.take_damage(total_damage)
-            user.attack += 2
-            effects = f"(Rolled {roll1} and {roll2}) " + self.narrator.announce_stat_change(user.name, "attack", 2)
-            return True, self.narrator.announce_move(user.name, "Searing Volley", roll1, total_damage, effects=effects)
-            
-        elif self.name == "Rock Barrage":
-            hits = random.randint(2, 5)
-            total_damage = 0
-            rolls = []
-            formulas = []
-            damages = []
+                outcome.roll, outcome.damage = roll2, damage2
+        else:
+            if effect.max_hits is None:
+                hits = effect.hits
+            else:
+                hits = rng.randint(effect.hits, effect.max_hits)
+                outcome.variable_hits = True
             for _ in range(hits):
-                damage, roll, formula = self.calculate_damage(user, target)
-                damage = damage // 2  # Half damage per hit
-                total_damage += damage
-                rolls.append(roll)
-                formulas.append(formula)
-                damages.append(damage)
-            target.take_damage(total_damage)
-            target.defense = max(0, target.defense - hits)  # Lower defense by 1 per hit
-            damage_calcs = [f"Hit {i+1}: {formulas[i]} = {damages[i]}" for i in range(hits)]
-            effects = f"Hit {hits} times! " + self.narrator.announce_stat_change(target.name, "defense", -hits)
-            return True, self.narrator.announce_move(user.name, "Rock Barrage", rolls[0], total_damage, effects=effects)
-            
-        elif self.name == "Explosive Shot":
-            damage, roll, formula = self.calculate_damage(user, target)
-            target.take_damage(damage)
-            recoil = damage // 3
-            user.take_damage(recoil)
-            effects = f"Took {recoil} recoil damage!"
-            return True, self.narrator.announce_move(user.name, "Explosive Shot", roll, damage, effects=effects)
-            
-        elif self.name == "Sharpened Quake":
-            if target.health < target.max_health // 2:
-                self.power += 5  # Add bonus damage against low HP targets
-            damage, roll, formula = self.calculate_damage(user, target)
-            if target.health < target.max_health // 2:
-                self.power -= 5  # Reset power
-            target.take_damage(damage)
-            return True, self.narrator.announce_move(user.name, "Sharpened Quake", roll, damage)
-            
-        return False, self.narrator.announce_special_effect("Move failed!")
+                roll = rng.d20()
+                outcome.add_hit(roll, entry.damages[roll - 1] // effect.damage_divisor)
+        if profiling:
+            PROFILER.pop(phase)
+            phase = PROFILER.push("effects")
+        dealt = outcome.damage
+        if outcome.took_higher and not effect.best_of_two_applies:
+            dealt = 0
+        else:
+            target.take_damage(dealt)
+        
+        # Apply secondary effects
+        for change in effect.stat_changes:
+            character = user if change.who == "user" else target
+            amount = change.amount * outcome.hits if change.per_hit else change.amount
+            setattr(character, change.stat, max(0, getattr(character, change.stat) + amount))
+            outcome.add_stat_change(character.name, change.stat, amount)
+        if effect.heal_divisor is not None:
+            outcome.healing = dealt // effect.heal_divisor
+            user.heal(outcome.healing)
+        if effect.recoil_divisor is not None:
+            outcome.recoil = dealt // effect.recoil_divisor
+            user.take_damage(outcome.recoil)
+        if profiling:
+            PROFILER.pop(phase)
+            PROFILER.pop(move_frame)
+        return outcome
+
+    def describe(self, current_uses):
+        return f"{self.name} ({self.move_type.value}) - Power: d20 + {self.power}, Uses: {current_uses}/{self.max_uses}"
 
     def __str__(self):
-        return f"{self.name} ({self.move_type.value}) - Power: d20 + {self.power}, Uses: {self.current_uses}/{self.max_uses}" 
\ No newline at end of file
+        return self.describe(self.max_uses)
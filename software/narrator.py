@@ -1,49 +1,141 @@
 from typing import Optional
+from .profiler import PROFILER
+
+def _render_move(user_name, move_name, roll, damage, formula, effects):
+    message = f"{user_name} used {move_name}! (Rolled {roll})"
+    if effects:
+        message += f" {effects}"
+    if formula:
+        message += f" Damage calculation: {formula} = {damage}!"
+    else:
+        message += f" Dealt {damage} damage!"
+    return message
+
+def _render_stat_change(target_name, stat, amount):
+    direction = "raised" if amount > 0 else "lowered"
+    return f"{target_name}'s {stat} {direction} by {abs(amount)}!"
+
+# Narration templates, shared by every Message. A template is a format string
+# or, when the wording depends on the arguments, a function returning the text.
+TEMPLATES = {
+    "move": _render_move,
+    "effects": lambda *effects: " ".join(effects),
+    "took_higher": "(Rolled {0} and {1}, took higher)",
+    "hit_count": "Hit {0} times!",
+    "rolls": lambda *rolls: f"(Rolled {' and '.join(map(str, rolls))})",
+    "recoil": "Took {0} recoil damage!",
+    "healing": "{0} healed {1} HP!",
+    "stat_change": _render_stat_change,
+    "no_moves": "No moves available!",
+    "move_depleted": "{0} has no uses left!",
+    "super_effective": "(Super Effective!)",
+    "turn": "\n{0}'s turn!",
+    "formula": "(({0} + {1})/2) × ({2}/{3}) × {4}{5}",
+    "formula_ignoring_defense": "(({0} + {1})/2) × 1 × {2}{3}",
+}
+
+class Message:
+    """Narration that is only turned into text when something reads it.
+
+    Holds a template ID and its arguments. Arguments may be Messages
+    themselves, they are rendered along with the message.
+    """
+    __slots__ = ("template_id", "args")
+
+    def __init__(self, template_id, *args):
+        self.template_id = template_id
+        self.args = args
+
+    def render(self) -> str:
+        args = tuple(str(arg) if isinstance(arg, Message) else arg for arg in self.args)
+        template = TEMPLATES[self.template_id]
+        if callable(template):
+            return template(*args)
+        return template.format(*args)
+
+    def __str__(self):
+        return self.render()
+
+    def __repr__(self):
+        return f"Message({self.template_id!r}, {', '.join(repr(arg) for arg in self.args)})"
 
 class Narrator:
-    def __init__(self):
+    """Builds narration as deferred Messages and hands it to its sinks.
+
+    The announce_* methods only create Message objects, the text is formatted
+    when a sink (the console, TTS, a log) reads it. narrate() with no sinks
+    does nothing, so simulations never format narration.
+    """
+    def __init__(self, sinks=()):
         self.sound_enabled = False  # For future sound implementation
+        self.sinks = list(sinks)    # Callables taking a Message, e.g. print
+    
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+    
+    def narrate(self, message):
+        """Send a message to every sink"""
+        with PROFILER.frame("Narrator.narrate"):
+            for sink in self.sinks:
+                sink(message)
+        return message
     
     def announce_move(self, user_name: str, move_name: str, roll: int,
-                     damage: int, formula: Optional[str] = None, effects: Optional[str] = None) -> str:
+                     damage: int, formula=None, effects=None) -> Message:
         """Narrate a move being used"""
-        message = f"{user_name} used {move_name}! (Rolled {roll})"
-        if effects:
-            message += f" {effects}"
-        if formula:
-            message += f" Damage calculation: {formula} = {damage}!"
-        else:
-            message += f" Dealt {damage} damage!"
-        return message
+        return Message("move", user_name, move_name, roll, damage, formula, effects)
+    
+    def announce_outcome(self, outcome) -> Message:
+        """Narrate a MoveOutcome"""
+        if not outcome.success:
+            return outcome.failure
+        
+        effects = []
+        if outcome.super_effective:
+            effects.append(self.announce_super_effective())
+        if outcome.took_higher:
+            effects.append(Message("took_higher", outcome.rolls[0], outcome.rolls[1]))
+        elif outcome.variable_hits:
+            effects.append(Message("hit_count", outcome.hits))
+        elif outcome.hits > 1:
+            effects.append(Message("rolls", *outcome.rolls))
+        for target_name, stat, amount in outcome.stat_changes:
+            effects.append(self.announce_stat_change(target_name, stat, amount))
+        if outcome.healing is not None:
+            effects.append(self.announce_healing(outcome.user_name, outcome.healing))
+        if outcome.recoil is not None:
+            effects.append(Message("recoil", outcome.recoil))
+        
+        return self.announce_move(outcome.user_name, outcome.move_name, outcome.roll,
+                                  outcome.damage, effects=Message("effects", *effects) if effects else None)
     
-    def announce_healing(self, user_name: str, heal_amount: int) -> str:
+    def announce_healing(self, user_name: str, heal_amount: int) -> Message:
         """Narrate healing"""
-        return f"{user_name} healed {heal_amount} HP!"
+        return Message("healing", user_name, heal_amount)
     
-    def announce_stat_change(self, target_name: str, stat: str, amount: int) -> str:
+    def announce_stat_change(self, target_name: str, stat: str, amount: int) -> Message:
         """Narrate stat changes"""
-        direction = "raised" if amount > 0 else "lowered"
-        return f"{target_name}'s {stat} {direction} by {abs(amount)}!"
+        return Message("stat_change", target_name, stat, amount)
     
     def announce_special_effect(self, effect_description: str) -> str:
         """Narrate special effects"""
         return effect_description
     
-    def announce_no_moves(self) -> str:
+    def announce_no_moves(self) -> Message:
         """Narrate when no moves are available"""
-        return "No moves available!"
+        return Message("no_moves")
     
-    def announce_move_depleted(self, move_name: str) -> str:
+    def announce_move_depleted(self, move_name: str) -> Message:
         """Narrate when a move has no uses left"""
-        return f"{move_name} has no uses left!"
+        return Message("move_depleted", move_name)
     
-    def announce_super_effective(self) -> str:
+    def announce_super_effective(self) -> Message:
         """Narrate when a move is super effective"""
-        return "(Super Effective!)"
+        return Message("super_effective")
     
-    def announce_turn(self, player_name: str) -> str:
+    def announce_turn(self, player_name: str) -> Message:
         """Narrate the start of a turn"""
-        return f"\n{player_name}'s turn!"
+        return Message("turn", player_name)
     
     def show_available_moves(self, moves: list) -> str:
         """Display available moves"""
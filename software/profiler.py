@@ -0,0 +1,168 @@
+import atexit
+import contextvars
+import json
+import signal
+import sys
+import threading
+import time
+
+class _Frame:
+    """Context manager for Profiler.frame(), for code that isn't hot enough to need push/pop"""
+    __slots__ = ("profiler", "name", "entry")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.entry = self.profiler.push(self.name)
+
+    def __exit__(self, *exc_info):
+        self.profiler.pop(self.entry)
+
+class _NoFrame:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+_NO_FRAME = _NoFrame()
+
+class Profiler:
+    """Call counts and cumulative nanoseconds of instrumented hot paths.
+
+    Instrumented code keeps a stack of frames: Game phases, Move.use per move
+    and its phases, narration, stats bookkeeping and hardware commands. Time is
+    accumulated per stack, so report() can show each frame's inclusive and
+    self time and collapsed() exports flame graph input. The stack lives in a
+    context variable, so every asyncio task and asyncio.to_thread call sees the
+    stack of the code that started it.
+
+    Profiling is off until enable() is called. Hot paths check `enabled`
+    before push(), so until then they cost one attribute lookup.
+    """
+    def __init__(self):
+        self.enabled = False
+        self._stack = contextvars.ContextVar("profiler_stack", default=())
+        self._totals = {}  # Stack tuple -> [calls, nanoseconds]
+        self._lock = threading.Lock()
+
+    def enable(self, dump_signal=None, dump_at_exit=False, file=None):
+        """Start profiling, optionally dumping the report on a signal (e.g. SIGUSR2) or at exit"""
+        self.enabled = True
+        if dump_signal is not None:
+            signal.signal(dump_signal, lambda signum, frame: self._dump_in_thread(file))
+        if dump_at_exit:
+            atexit.register(self.dump, file)
+
+    def _dump_in_thread(self, file):
+        # Signal handlers run on the main thread, which may be inside pop()'s
+        # `with self._lock`: taking the lock here would deadlock, a thread just waits
+        threading.Thread(target=self.dump, args=(file,), daemon=True).start()
+
+    def disable(self):
+        self.enabled = False
+
+    def push(self, name):
+        """Enter a frame, returns the entry to pass to pop()"""
+        stack = self._stack.get() + (name,)
+        return self._stack.set(stack), stack, time.perf_counter_ns()
+
+    def pop(self, entry):
+        """Leave the frame entered by push()"""
+        elapsed = time.perf_counter_ns()
+        token, stack, start = entry
+        elapsed -= start
+        self._stack.reset(token)
+        with self._lock:
+            totals = self._totals.get(stack)
+            if totals is None:
+                self._totals[stack] = [1, elapsed]
+            else:
+                totals[0] += 1
+                totals[1] += elapsed
+
+    def frame(self, name):
+        """`with PROFILER.frame(name):`, does nothing while profiling is off"""
+        if not self.enabled:
+            return _NO_FRAME
+        return _Frame(self, name)
+
+    def stacks(self):
+        """{stack tuple: (calls, inclusive nanoseconds)}"""
+        with self._lock:
+            return {stack: tuple(totals) for stack, totals in self._totals.items()}
+
+    def merge(self, stacks):
+        """Add the totals of another process's stacks(), e.g. a simulation worker's"""
+        with self._lock:
+            for stack, (calls, nanoseconds) in stacks.items():
+                totals = self._totals.setdefault(stack, [0, 0])
+                totals[0] += calls
+                totals[1] += nanoseconds
+
+    def self_times(self):
+        """{stack tuple: nanoseconds not spent in a child frame}"""
+        stacks = self.stacks()
+        self_ns = {stack: nanoseconds for stack, (_, nanoseconds) in stacks.items()}
+        for stack, (_, nanoseconds) in stacks.items():
+            if stack[:-1] in self_ns:
+                self_ns[stack[:-1]] -= nanoseconds
+        return self_ns
+
+    def by_frame(self):
+        """{frame name: [calls, inclusive ns, self ns]} summed over every stack it appears on.
+        Recursive frames count their inner calls' time once."""
+        self_ns = self.self_times()
+        frames = {}
+        for stack, (calls, nanoseconds) in self.stacks().items():
+            name = stack[-1]
+            totals = frames.setdefault(name, [0, 0, 0])
+            totals[0] += calls
+            if name not in stack[:-1]:
+                totals[1] += nanoseconds
+            totals[2] += self_ns[stack]
+        return frames
+
+    def report(self):
+        """Table of frames by inclusive time"""
+        frames = sorted(self.by_frame().items(), key=lambda item: item[1][1], reverse=True)
+        lines = [f"{'frame':<40} {'calls':>10} {'total ms':>12} {'self ms':>12} {'per call us':>12}"]
+        for name, (calls, inclusive, self_ns) in frames:
+            lines.append(f"{name:<40} {calls:>10} {inclusive / 1e6:>12.3f} {self_ns / 1e6:>12.3f} "
+                         f"{inclusive / calls / 1e3:>12.3f}")
+        return "\n".join(lines)
+
+    def to_json(self):
+        """Per-frame and per-stack totals as a JSON-compatible dict"""
+        return {
+            "frames": {name: {"calls": calls, "total_ns": inclusive, "self_ns": self_ns}
+                       for name, (calls, inclusive, self_ns) in self.by_frame().items()},
+            "stacks": [{"stack": list(stack), "calls": calls, "total_ns": nanoseconds}
+                       for stack, (calls, nanoseconds) in self.stacks().items()],
+        }
+
+    def collapsed(self):
+        """Collapsed stacks ("a;b;c <self microseconds>" per line), the input of flamegraph.pl"""
+        return "\n".join(f"{';'.join(stack)} {nanoseconds // 1000}"
+                         for stack, nanoseconds in sorted(self.self_times().items()) if nanoseconds >= 1000)
+
+    def dump(self, file=None, format="table"):
+        """Write the report ("table"), JSON ("json") or collapsed stacks ("collapsed")"""
+        if format == "json":
+            text = json.dumps(self.to_json(), indent=2)
+        elif format == "collapsed":
+            text = self.collapsed()
+        else:
+            text = self.report()
+        print(text, file=sys.stderr if file is None else file, flush=True)
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+
+# Shared by the game, the battle engine, the simulators and the bridge
+PROFILER = Profiler()
@@ -0,0 +1,198 @@
+import struct
+import numpy as np
+from .character import Character, CharacterClass, battle_winner
+from .rng import GameRNG
+
+# A replay file is a sequence of games, each one:
+#   header  MAGIC, VERSION, entropy length + little-endian entropy bytes,
+#           spawn key length + one uint32 per key, attacker class, defender class
+#   plies   one byte per player turn, player 1 first: the move slot used,
+#           RESET_USES added if the moveset was refilled first, or NO_MOVE
+#   footer  END, winner (0 draw, 1 or 2), final health of both players (int16)
+# A game cut off before its footer (the cabinet was switched off) still
+# replays up to its last ply.
+MAGIC = b"BR"
+VERSION = 2     # 2: GameRNG draws each block at a fixed counter position
+RESET_USES = 0x80
+NO_MOVE = 0xFF
+END = 0xFE
+FOOTER = struct.Struct("<Bhh")
+# ReplayEngine keeps the state every this many plies, to seek back without replaying from the start
+CHECKPOINT_PLIES = 8
+
+CLASSES = list(CharacterClass)
+
+DRAW = 0
+
+class BattleReplay:
+    """A recorded game: the dice seed, both classes and the move of every ply"""
+    __slots__ = ("entropy", "spawn_key", "classes", "plies", "winner", "final_health")
+
+    def __init__(self, entropy, spawn_key, classes, plies, winner=None, final_health=None):
+        self.entropy = entropy
+        self.spawn_key = tuple(spawn_key)
+        self.classes = tuple(classes)
+        self.plies = bytes(plies)
+        self.winner = winner                # None when the game has no footer
+        self.final_health = final_health
+
+    @property
+    def complete(self):
+        return self.winner is not None
+
+    @property
+    def turns(self):
+        return (len(self.plies) + 1) // 2
+
+    def seed_sequence(self):
+        return np.random.SeedSequence(self.entropy, spawn_key=self.spawn_key)
+
+    def encode(self):
+        return encode_header(self.seed_sequence(), *self.classes) + self.plies + (
+            encode_footer(self.winner, *self.final_health) if self.complete else b"")
+
+def encode_header(seed_sequence, attacker_class, defender_class):
+    entropy = seed_sequence.entropy
+    if not isinstance(entropy, int):
+        raise ValueError("Replays need a seed that is None or a single int")
+    entropy = entropy.to_bytes(max(1, -(-entropy.bit_length() // 8)), "little")
+    spawn_key = seed_sequence.spawn_key
+    return b"".join((
+        MAGIC, bytes((VERSION, len(entropy))), entropy,
+        bytes((len(spawn_key),)), struct.pack(f"<{len(spawn_key)}I", *spawn_key),
+        bytes((CLASSES.index(attacker_class), CLASSES.index(defender_class))),
+    ))
+
+def encode_footer(winner, attacker_health, defender_health):
+    return bytes((END,)) + FOOTER.pack(winner, attacker_health, defender_health)
+
+class ReplayWriter:
+    """Streams games into a binary file object as they are played.
+
+    start() writes the header, every ply is one byte and finish() writes the
+    footer and flushes. A game is around 30 bytes plus 2 per turn.
+    """
+    def __init__(self, file):
+        self.file = file
+        self.games = 0
+
+    def start(self, seed_sequence, attacker_class, defender_class):
+        self.file.write(encode_header(seed_sequence, attacker_class, defender_class))
+
+    def move(self, slot, reset_uses=False):
+        self.file.write(bytes((slot | RESET_USES if reset_uses else slot,)))
+
+    def no_move(self):
+        self.file.write(bytes((NO_MOVE,)))
+
+    def finish(self, winner, attacker_health, defender_health):
+        """End the game, winner is 1, 2 or DRAW"""
+        self.file.write(encode_footer(winner, attacker_health, defender_health))
+        self.file.flush()
+        self.games += 1
+
+def read_replays(file):
+    """Yield every BattleReplay in a binary file object"""
+    data = file.read()
+    position = 0
+    while position < len(data):
+        if data[position:position + 2] != MAGIC or data[position + 2] != VERSION:
+            raise ValueError(f"Not a version {VERSION} replay at byte {position}")
+        position += 3
+        entropy_length = data[position]
+        entropy = int.from_bytes(data[position + 1:position + 1 + entropy_length], "little")
+        position += 1 + entropy_length
+        key_length = data[position]
+        spawn_key = struct.unpack_from(f"<{key_length}I", data, position + 1)
+        position += 1 + 4 * key_length
+        classes = (CLASSES[data[position]], CLASSES[data[position + 1]])
+        position += 2
+        # Plies run until the footer, the next game or the end of the file
+        end = position
+        while end < len(data) and data[end] != END and data[end:end + 2] != MAGIC:
+            end += 1
+        plies = data[position:end]
+        winner = final_health = None
+        if end < len(data) and data[end] == END:
+            if end + 1 + FOOTER.size > len(data):
+                end = len(data)     # Cut off inside the footer
+            else:
+                winner, *final_health = FOOTER.unpack_from(data, end + 1)
+                end += 1 + FOOTER.size
+        position = end
+        yield BattleReplay(entropy, spawn_key, classes, plies, winner, tuple(final_health or ()) or None)
+
+class ReplayEngine:
+    """Re-runs a BattleReplay headlessly with the recorded seed and moves.
+
+    Moves come from the log and dice from the seed, so no input or console
+    output is involved and a game replays at simulator speed. seek() moves to
+    any ply. Every CHECKPOINT_PLIES plies the characters and the RNG position
+    are kept, so going back restores the last checkpoint and replays from there.
+    """
+    def __init__(self, replay):
+        self.replay = replay
+        self._checkpoints = {}  # ply -> (character snapshots, GameRNG.tell())
+        self.reset()
+
+    def reset(self):
+        self.players = []
+        for i, character_class in enumerate(self.replay.classes, 1):
+            player = Character(f"Player {i}")
+            player.character_class = character_class
+            player.initialize_character()
+            self.players.append(player)
+        self.rng = GameRNG(self.replay.seed_sequence())
+        self.ply = 0
+        self.winner = None
+
+    @property
+    def finished(self):
+        return self.ply >= len(self.replay.plies) or self.winner is not None
+
+    def step(self):
+        """Play the next ply, returns its MoveOutcome (None for a skipped turn)"""
+        if self.ply % CHECKPOINT_PLIES == 0 and self.ply not in self._checkpoints:
+            self._checkpoints[self.ply] = (tuple(player.snapshot() for player in self.players), self.rng.tell())
+        code = self.replay.plies[self.ply]
+        player_index = self.ply % 2
+        player, opponent = self.players[player_index], self.players[1 - player_index]
+        self.ply += 1
+        if code == NO_MOVE:
+            return None
+        if code & RESET_USES:
+            player.reset_uses()
+        outcome = player.use_move(code & ~RESET_USES, opponent, self.rng)
+        self.winner = battle_winner(*self.players)
+        return outcome
+
+    def seek(self, ply):
+        """Move to the state after `ply` plies"""
+        if ply < self.ply:
+            self.ply = ply - ply % CHECKPOINT_PLIES
+            snapshots, position = self._checkpoints[self.ply]
+            for player, snapshot in zip(self.players, snapshots):
+                player.restore(snapshot)
+            self.rng.seek(*position)
+            self.winner = None
+        while self.ply < ply and not self.finished:
+            self.step()
+
+    def seek_turn(self, turn):
+        """Move to the start of a turn (1-based), before player 1 moves"""
+        self.seek(2 * (turn - 1))
+
+    def run(self):
+        """Play the rest of the game, returns the winner (1, 2, DRAW, or None if the log is cut off)"""
+        while not self.finished:
+            self.step()
+        if self.winner is None and self.replay.complete:
+            return DRAW
+        return self.winner
+
+    def verify(self):
+        """Replay from the start and check the recorded winner and final health"""
+        self.reset()
+        winner = self.run()
+        return (self.replay.complete and winner == self.replay.winner
+                and tuple(player.health for player in self.players) == self.replay.final_health)
@@ -0,0 +1,120 @@
+import numpy as np
+
+def numpy_generator(seed=None):
+    """A NumPy Generator on the counter-based Philox bit generator.
+
+    `seed` can be None, an int, a SeedSequence or an existing Generator (returned as is).
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.Generator(np.random.Philox(seed))
+
+# Philox counter steps between two blocks of a stream (far more than a block
+# uses) and between two streams (room for 2**32 blocks)
+BLOCK_STRIDE = 2 ** 32
+STREAM_STRIDE = 2 ** 64
+D20, UNIFORM, CHOICE = range(3)
+
+class GameRNG:
+    """Random numbers for the scalar battle engine (Move.use, the simulators).
+
+    Backed by Philox, a counter-based generator: a seed (or a SeedSequence
+    spawned per game or per worker) gives an independent stream, and the same
+    seed gives the same stream on every machine. Dice are drawn from NumPy in
+    blocks and handed out one by one, so a d20 costs a list index.
+
+    d20s, uniforms and choices are separate (non-overlapping) streams of the
+    same key, so the dice a game rolls only depend on the moves it plays, not
+    on how they were chosen. A replay can feed recorded moves and get the
+    same dice.
+
+    Block b of a stream starts b * BLOCK_STRIDE counter steps into it, so any
+    position can be drawn without drawing what comes before: tell() gives the
+    number of draws taken from each stream, seek() and advance() move there.
+    """
+    def __init__(self, seed=None, block_size=1024):
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.bit_generator = np.random.Philox(self.seed_sequence)
+        self.generator = np.random.Generator(self.bit_generator)
+        self.block_size = block_size
+        self._start = self.bit_generator.state
+        # Per stream: the block being handed out, its number (-1 before the first) and the next index in it
+        self._d20s, self._d20_block, self._d20_index = [], -1, 0
+        self._uniforms, self._uniform_block, self._uniform_index = [], -1, 0
+        self._choices, self._choice_block, self._choice_index = [], -1, 0
+
+    def _block_values(self, stream, block):
+        """Draws of one block of a stream, as a list"""
+        self.bit_generator.state = self._start
+        self.bit_generator.advance(stream * STREAM_STRIDE + block * BLOCK_STRIDE)
+        if stream == D20:
+            return self.generator.integers(1, 21, self.block_size, dtype=np.int8).tolist()
+        return self.generator.random(self.block_size).tolist()
+
+    def tell(self):
+        """Draws taken so far as (d20s, uniforms, choices), for seek()"""
+        block_size = self.block_size
+        return (max(0, self._d20_block * block_size + self._d20_index),
+                max(0, self._uniform_block * block_size + self._uniform_index),
+                max(0, self._choice_block * block_size + self._choice_index))
+
+    def seek(self, d20s=0, uniforms=0, choices=0):
+        """Continue each stream after the given number of draws, as if they had been taken"""
+        block_size = self.block_size
+        block, self._d20_index = divmod(d20s, block_size)
+        if block != self._d20_block:
+            self._d20s, self._d20_block = self._block_values(D20, block), block
+        block, self._uniform_index = divmod(uniforms, block_size)
+        if block != self._uniform_block:
+            self._uniforms, self._uniform_block = self._block_values(UNIFORM, block), block
+        block, self._choice_index = divmod(choices, block_size)
+        if block != self._choice_block:
+            self._choices, self._choice_block = self._block_values(CHOICE, block), block
+
+    def advance(self, d20s, uniforms=0, choices=0):
+        """Skip draws, including the rest of the blocks already drawn"""
+        position = self.tell()
+        self.seek(position[0] + d20s, position[1] + uniforms, position[2] + choices)
+
+    def spawn(self, count):
+        """Independent child streams, e.g. one per game or per worker"""
+        return [GameRNG(child, self.block_size) for child in self.seed_sequence.spawn(count)]
+
+    def d20(self):
+        """Roll a d20"""
+        index = self._d20_index
+        if index == len(self._d20s):
+            self._d20_block += 1
+            self._d20s = self._block_values(D20, self._d20_block)
+            index = 0
+        self._d20_index = index + 1
+        return self._d20s[index]
+
+    def random(self):
+        """Uniform float in [0, 1)"""
+        index = self._uniform_index
+        if index == len(self._uniforms):
+            self._uniform_block += 1
+            self._uniforms = self._block_values(UNIFORM, self._uniform_block)
+            index = 0
+        self._uniform_index = index + 1
+        return self._uniforms[index]
+
+    def randint(self, low, high):
+        """Integer in [low, high], like random.randint"""
+        if low == 1 and high == 20:
+            return self.d20()
+        return low + int(self.random() * (high - low + 1))
+
+    def choice(self, sequence):
+        """Random element of a non-empty sequence, from the choice substream"""
+        index = self._choice_index
+        if index == len(self._choices):
+            self._choice_block += 1
+            self._choices = self._block_values(CHOICE, self._choice_block)
+            index = 0
+        self._choice_index = index + 1
+        return sequence[int(self._choices[index] * len(sequence))]
+
+# Used when no RNG is passed in, seeded from the OS
+DEFAULT_RNG = GameRNG()
@@ -0,0 +1,328 @@
+import heapq
+import itertools
+import sys
+import time
+from collections import defaultdict
+from .character import CharacterClass
+from .damage_table import DAMAGE_TABLE
+from .moves import Move
+
+# Game results, used as indices into the outcome totals
+PLAYER_1_WINS, PLAYER_2_WINS, DRAW = range(3)
+
+# Fields of a character's state tuple
+HEALTH, ATTACK, DEFENSE, LAST_DAMAGE, LAST_ELEMENT, USES = range(6)
+
+
+class _Fighter:
+    """Minimal stand-in for Character so MoveEffect callables can read a state tuple"""
+    __slots__ = ("health", "max_health", "attack", "defense", "last_damage_taken")
+
+    def __init__(self, state, max_health):
+        self.health = state[HEALTH]
+        self.max_health = max_health
+        self.attack = state[ATTACK]
+        self.defense = state[DEFENSE]
+        self.last_damage_taken = state[LAST_DAMAGE]
+
+
+class _AttributeRecorder:
+    """Records which attributes a MoveEffect callable reads"""
+    def __init__(self, who, reads):
+        self._who = who
+        self._reads = reads
+
+    def __getattr__(self, name):
+        self._reads.add((self._who, name))
+        return 0
+
+
+def _attributes_read(effect):
+    """Return the (who, attribute) pairs read by a MoveEffect's callables"""
+    reads = set()
+    for function in (effect.power_bonus, effect.best_of_two_if):
+        if function is not None:
+            function(_AttributeRecorder("user", reads), _AttributeRecorder("target", reads))
+    return reads
+
+
+class MatchupResult:
+    """Outcome probabilities of one ordered class pairing.
+
+    `unresolved` is the probability mass of games that were pruned to stay
+    within the state budget (0 for an exact solve, never more than solve()'s
+    max_unresolved). The true win rate lies between attacker_win and
+    attacker_win + unresolved, and likewise for the other outcomes.
+    """
+    def __init__(self, attacker_class, defender_class, attacker_win, defender_win, draw, unresolved,
+                 states, peak_states, table_bytes, seconds):
+        self.attacker_class = attacker_class
+        self.defender_class = defender_class
+        self.attacker_win = attacker_win
+        self.defender_win = defender_win
+        self.draw = draw
+        self.unresolved = unresolved
+        self.states = states            # States expanded over the whole solve
+        self.peak_states = peak_states  # Largest transposition table (one ply of the game)
+        self.table_bytes = table_bytes  # Approximate memory of the largest table
+        self.seconds = seconds          # Solve time
+
+    def __str__(self):
+        text = (f"{self.attacker_class.name} vs {self.defender_class.name}: "
+                f"win {self.attacker_win:.4%}, loss {self.defender_win:.4%}, draw {self.draw:.4%}")
+        if self.unresolved:
+            text += f", unresolved {self.unresolved:.4%}"
+        return text + (f" ({self.states} states, peak {self.peak_states}, "
+                       f"{self.table_bytes / 1e6:.1f} MB, {self.seconds:.2f}s)")
+
+
+class SolverBudgetExceeded(RuntimeError):
+    """solve() had to prune more probability than it was allowed to leave unresolved"""
+
+
+class MatchupSolver:
+    """Exact win/loss/draw probabilities for a class pairing, by memoized DP over the game's Markov chain.
+
+    Follows the rules of GameSimulationTest.simulate_game with the uniform random
+    move policy: player 1 (the attacker) moves first, moves are chosen uniformly
+    among those with uses left (all uses refill once depleted) and the game is a
+    draw after solve()'s max_turns turns. Move uses are tracked per character.
+
+    Chance nodes enumerate damage distributions from the DamageTable instead of
+    individual rolls, and the transposition table is keyed on a reduced state:
+    an element the opponent has no counter to is stored as None, last damage
+    taken is dropped when no move reads it, and depleted movesets are stored as
+    refilled. Player 1 always moving first breaks the player swap symmetry, so
+    mirror matchups are solved in full.
+
+    Even so, full-length games are out of reach: the number of distinct states
+    grows about tenfold per ply (ARCHER vs ARCHER, the shortest pairing, has
+    250,000 states after three plies, and dropping the move uses only brings
+    that to 155,000). So solve() has no defaults for the turn limit and the
+    state budget, exact solves are for short horizons (a turn or two) and
+    balance numbers come from the MatchupMatrix. The AI uses the per-move
+    outcomes (setup(), state() and move_outcomes()).
+    """
+    def __init__(self):
+        self.max_turns = None
+        self._distributions = {}
+
+    def _setup(self, attacker_class, defender_class):
+        self.classes = (attacker_class, defender_class)
+        self.max_health = tuple(c.value["health"] for c in self.classes)
+        self.moves = tuple(tuple(c.value["moves"]) for c in self.classes)
+        self.max_uses = tuple(tuple(move.max_uses for move in moves) for moves in self.moves)
+
+        # Elements each player's moves are super effective against
+        counters = tuple({element for element in Move.MoveType
+                          if any(Move.is_super_effective(move.move_type, element) for move in moves)}
+                         for moves in self.moves)
+        # An element only matters if the opponent can counter it
+        self.relevant_elements = (counters[1], counters[0])
+
+        # Last damage taken only matters if some move reads it
+        reads = [set(), set()]
+        for player in (0, 1):
+            for move in self.moves[player]:
+                for who, attribute in _attributes_read(move.effect):
+                    reads[player if who == "user" else 1 - player].add(attribute)
+        self.tracks_last_damage = tuple("last_damage_taken" in attributes for attributes in reads)
+
+    def _canonical(self, player, state):
+        """Reduce a character state to its equivalence class"""
+        health, attack, defense, last_damage, last_element, uses = state
+        if not self.tracks_last_damage[player]:
+            last_damage = 0
+        if last_element not in self.relevant_elements[player]:
+            last_element = None
+        if not any(uses):
+            uses = self.max_uses[player]
+        return (health, attack, defense, last_damage, last_element, uses)
+
+    def _damage_distribution(self, entry, effect, best_of_two):
+        """Return [(probability, total damage, hits)] for one use of a move"""
+        key = (entry, effect, best_of_two)
+        distribution = self._distributions.get(key)
+        if distribution is not None:
+            return distribution
+
+        if best_of_two:
+            totals = defaultdict(float)
+            for first in entry.damages:
+                for second in entry.damages:
+                    totals[max(first, second)] += 1 / 400
+            distribution = [(probability, damage, 2) for damage, probability in totals.items()]
+        else:
+            per_hit = defaultdict(float)
+            for damage in entry.damages:
+                per_hit[damage // effect.damage_divisor] += 1 / 20
+            max_hits = effect.max_hits or effect.hits
+            hit_probability = 1 / (max_hits - effect.hits + 1)
+            distribution = []
+            totals = {0: 1.0}
+            for hits in range(1, max_hits + 1):
+                next_totals = defaultdict(float)
+                for total, probability in totals.items():
+                    for damage, hit in per_hit.items():
+                        next_totals[total + damage] += probability * hit
+                totals = next_totals
+                if hits >= effect.hits:
+                    distribution.extend((probability * hit_probability, total, hits)
+                                        for total, probability in totals.items())
+        self._distributions[key] = distribution
+        return distribution
+
+    def setup(self, attacker_class, defender_class):
+        """Prepare the per-player tables for a pairing, for state() and move_outcomes()"""
+        self._setup(attacker_class, defender_class)
+
+    def state(self, player, character):
+        """Reduced state tuple of a Character playing as `player` (0 for player 1)"""
+        return self._canonical(player, (character.health, character.attack, character.defense,
+                                        character.last_damage_taken, character.last_element_used,
+                                        tuple(character.uses)))
+
+    def move_outcomes(self, player, states, slot):
+        """Yield (probability, next states) for every outcome of `player` using the move in `slot`"""
+        other = 1 - player
+        user, target = states[player], states[other]
+        uses = user[USES]
+        user_fighter = _Fighter(user, self.max_health[player])
+        target_fighter = _Fighter(target, self.max_health[other])
+        canonical = self._canonical
+
+        move = self.moves[player][slot]
+        effect = move.effect
+        power = move.power
+        if effect.power_bonus is not None:
+            power += effect.power_bonus(user_fighter, target_fighter)
+        best_of_two = bool(effect.best_of_two_if is not None and effect.best_of_two_if(user_fighter, target_fighter))
+        deals_damage = not best_of_two or effect.best_of_two_applies
+        super_effective = Move.is_super_effective(move.move_type, target[LAST_ELEMENT])
+        entry = DAMAGE_TABLE.lookup(power, user[ATTACK], target[DEFENSE], super_effective, effect.ignore_defense)
+        new_uses = uses[:slot] + (uses[slot] - 1,) + uses[slot + 1:]
+
+        for probability, dealt, hits in self._damage_distribution(entry, effect, best_of_two):
+            # Same order of effects as Move.use, damage is applied twice as in Character.take_damage
+            user_health, user_attack, user_defense, user_last_damage = user[HEALTH], user[ATTACK], user[DEFENSE], user[LAST_DAMAGE]
+            if deals_damage:
+                target_health, target_last_damage = max(0, target[HEALTH] - 2 * dealt), dealt
+            else:
+                target_health, target_last_damage, dealt = target[HEALTH], target[LAST_DAMAGE], 0
+            target_attack, target_defense = target[ATTACK], target[DEFENSE]
+            for change in effect.stat_changes:
+                amount = change.amount * hits if change.per_hit else change.amount
+                if change.who == "user":
+                    if change.stat == "attack":
+                        user_attack = max(0, user_attack + amount)
+                    else:
+                        user_defense = max(0, user_defense + amount)
+                elif change.stat == "attack":
+                    target_attack = max(0, target_attack + amount)
+                else:
+                    target_defense = max(0, target_defense + amount)
+            if effect.heal_divisor is not None:
+                user_health = min(self.max_health[player], user_health + dealt // effect.heal_divisor)
+            if effect.recoil_divisor is not None:
+                recoil = dealt // effect.recoil_divisor
+                user_health = max(0, user_health - 2 * recoil)
+                user_last_damage = recoil
+
+            new_user = canonical(player, (user_health, user_attack, user_defense, user_last_damage,
+                                          move.move_type, new_uses))
+            new_target = canonical(other, (target_health, target_attack, target_defense, target_last_damage,
+                                           target[LAST_ELEMENT], target[USES]))
+            yield probability, ((new_user, new_target) if player == 0 else (new_target, new_user))
+
+    def _children(self, player, states):
+        """Yield (probability, next states) for every outcome of `player`'s move"""
+        available = [slot for slot, remaining in enumerate(states[player][USES]) if remaining > 0]
+        move_probability = 1 / len(available)
+        for slot in available:
+            for probability, child in self.move_outcomes(player, states, slot):
+                yield move_probability * probability, child
+
+    def _result(self, player, turn, states):
+        """Apply battle_winner() and simulate_game's turn limit, None if the game goes on"""
+        if states[0][HEALTH] == 0:
+            return PLAYER_2_WINS
+        if states[1][HEALTH] == 0:
+            return PLAYER_1_WINS
+        if player == 1 and turn >= self.max_turns:
+            return DRAW
+        return None
+
+    @staticmethod
+    def _table_bytes(table):
+        """Approximate memory held by a transposition table, from a sample of its entries"""
+        if not table:
+            return sys.getsizeof(table)
+        sample = list(itertools.islice(table.items(), 100))
+        entry_bytes = 0
+        for states, probability in sample:
+            entry_bytes += sys.getsizeof(states) + sys.getsizeof(probability)
+            for state in states:
+                entry_bytes += sys.getsizeof(state) + sys.getsizeof(state[USES])
+        return sys.getsizeof(table) + entry_bytes * len(table) // len(sample)
+
+    def solve(self, attacker_class, defender_class, max_turns, max_states, max_unresolved=0.01):
+        """Solve one ordered pairing, a draw after max_turns turns, and return a MatchupResult.
+
+        Probability mass is pushed forward one move at a time. States reached by
+        different move sequences are merged in a transposition table keyed on the
+        reduced state, so each distinct state of a ply is expanded once. Only the
+        `max_states` most likely states of each ply are kept and the rest is
+        reported as unresolved (max_states=None keeps them all, which only
+        finishes for a turn or two). Raises SolverBudgetExceeded as soon as more
+        than `max_unresolved` of the games have been pruned.
+        """
+        start = time.perf_counter()
+        self.max_turns = max_turns
+        self._setup(attacker_class, defender_class)
+        initial = tuple(self._canonical(player, (c.value["health"], c.value["attack"], c.value["defense"],
+                                                 0, None, self.max_uses[player]))
+                        for player, c in enumerate(self.classes))
+
+        totals = [0.0, 0.0, 0.0]
+        unresolved = 0.0
+        expanded = peak_states = table_bytes = 0
+        table = {initial: 1.0}
+        player, turn = 0, 1
+        while table:
+            if max_states is not None and len(table) > max_states:
+                kept = heapq.nlargest(max_states, table.items(), key=lambda item: item[1])
+                unresolved += sum(table.values()) - sum(probability for _, probability in kept)
+                table = dict(kept)
+                if unresolved > max_unresolved:
+                    raise SolverBudgetExceeded(
+                        f"{attacker_class.name} vs {defender_class.name}: {max_states} states per ply left "
+                        f"{unresolved:.1%} of the games unresolved by turn {turn}, over the {max_unresolved:.1%} "
+                        f"allowed")
+            if len(table) > peak_states:
+                peak_states = len(table)
+                table_bytes = self._table_bytes(table)
+            expanded += len(table)
+
+            next_table = defaultdict(float)
+            for states, probability in table.items():
+                for child_probability, child in self._children(player, states):
+                    result = self._result(player, turn, child)
+                    if result is None:
+                        next_table[child] += probability * child_probability
+                    else:
+                        totals[result] += probability * child_probability
+            table = next_table
+            if player == 1:
+                turn += 1
+            player = 1 - player
+
+        return MatchupResult(attacker_class, defender_class, totals[PLAYER_1_WINS], totals[PLAYER_2_WINS],
+                             totals[DRAW], unresolved, expanded, peak_states, table_bytes,
+                             time.perf_counter() - start)
+
+    def solve_all(self, max_turns, max_states, max_unresolved=0.01):
+        """Solve every ordered CharacterClass pairing"""
+        return {(attacker_class, defender_class): self.solve(attacker_class, defender_class, max_turns,
+                                                             max_states, max_unresolved)
+                for attacker_class in CharacterClass for defender_class in CharacterClass}
+
@@ -0,0 +1,175 @@
+import math
+
+class RunningStats:
+    """Count, mean, variance, min and max of a stream in constant memory.
+
+    add() is Welford's update, merge() combines two streams exactly (Chan et
+    al.), so per-worker accumulators add up to the same result as one pass.
+    """
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0       # Sum of squared differences from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, count=1):
+        """Add `count` copies of a value"""
+        total = self.count + count
+        delta = value - self.mean
+        self.mean += delta * count / total
+        self.m2 += delta * delta * self.count * count / total
+        self.count = total
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        if not other.count:
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """Sample variance"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+class Histogram:
+    """Fixed-width bins over [low, high), with counts below and above the range kept apart"""
+    __slots__ = ("low", "high", "width", "counts", "underflow", "overflow")
+
+    def __init__(self, low, high, bins):
+        self.low = low
+        self.high = high
+        self.width = (high - low) / bins
+        self.counts = [0] * bins
+        self.underflow = 0
+        self.overflow = 0
+
+    def add(self, value, count=1):
+        if value < self.low:
+            self.underflow += count
+        elif value >= self.high:
+            self.overflow += count
+        else:
+            self.counts[int((value - self.low) / self.width)] += count
+
+    def merge(self, other):
+        if (other.low, other.high, len(other.counts)) != (self.low, self.high, len(self.counts)):
+            raise ValueError("Histograms with different bins can't be merged")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+    def bins(self):
+        """(bin low, bin high, count) of every bin"""
+        return [(self.low + i * self.width, self.low + (i + 1) * self.width, count)
+                for i, count in enumerate(self.counts)]
+
+class QuantileSketch:
+    """Mergeable quantile sketch of non-negative values with bounded relative error.
+
+    Values fall in log-spaced buckets (as in DDSketch): every reported quantile
+    is within `relative_accuracy` of a value at that rank. Bucket counts just
+    add up on merge. Values from 1e-9 to 1e9 take at most ~2000 buckets at 1%.
+    """
+    __slots__ = ("relative_accuracy", "gamma_log", "buckets", "zeros", "count")
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma_log = math.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self.buckets = {}   # Bucket index -> count
+        self.zeros = 0      # Values <= 0 (and too small to bucket)
+        self.count = 0
+
+    def add(self, value, count=1):
+        self.count += count
+        if value <= 1e-9:
+            self.zeros += count
+            return
+        bucket = math.ceil(math.log(value) / self.gamma_log)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Sketches with different accuracies can't be merged")
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        """Value at quantile q (0 to 1), None when empty"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if seen > rank:
+            return 0.0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                # Midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms
+                return 2 * math.exp(bucket * self.gamma_log) / (math.exp(self.gamma_log) + 1)
+        return 2 * math.exp(max(self.buckets) * self.gamma_log) / (math.exp(self.gamma_log) + 1)
+
+class Distribution:
+    """Running moments, a fixed-bin histogram and a quantile sketch of one stream.
+
+    Replaces a list of every value: memory stays constant however many values
+    are added, and Distributions from different workers merge exactly (the
+    quantiles stay within the sketch's relative accuracy).
+    """
+    __slots__ = ("stats", "histogram", "sketch")
+
+    def __init__(self, low=0, high=512, bins=64, relative_accuracy=0.01):
+        self.stats = RunningStats()
+        self.histogram = Histogram(low, high, bins)
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, value, count=1):
+        self.stats.add(value, count)
+        self.histogram.add(value, count)
+        self.sketch.add(value, count)
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.histogram.merge(other.histogram)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def __len__(self):
+        return self.stats.count
+
+    @property
+    def mean(self):
+        return self.stats.mean
+
+    @property
+    def std(self):
+        return self.stats.std
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
+
+    def summary(self):
+        """Mean, standard deviation and p50/p95/p99 as text"""
+        p50, p95, p99 = (self.quantile(q) for q in (0.5, 0.95, 0.99))
+        return (f"mean {self.mean:.1f}, sd {self.std:.1f}, min {self.stats.min:g}, max {self.stats.max:g}, "
+                f"p50 {p50:.1f}, p95 {p95:.1f}, p99 {p99:.1f}")
@@ -1,6 +1,18 @@
-from .character import Character, CharacterClass
-import random
-from collections import defaultdict
+from .character import Character, CharacterClass, battle_winner
+from .moves import MoveOutcome
+from .profiler import PROFILER
+from .rng import DEFAULT_RNG, GameRNG
+from .streaming_stats import Distribution
+from .replay import DRAW as REPLAY_DRAW
+from . import balance
+from .matchup_matrix import MatchupMatrix
+from .batch_engine import BatchBattleEngine, CLASSES, MOVE_NAMES, ATTACKER_WINS, DEFENDER_WINS, DRAW
+import os
+import signal
+import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 
 class MoveTestSuite:
     def __init__(self):
@@ -22,8 +34,7 @@ class MoveTestSuite:
         print("-"*50)
         
         # Reset move uses before testing
-        for move in attacker.moves:
-            move.current_uses = move.max_uses
+        attacker.reset_uses()
         
         # Print initial stats
         print("Initial Stats:")
@@ -31,11 +42,11 @@ class MoveTestSuite:
         self._print_character_stats(self.test_target)
         
         # Use the move
-        success, message = attacker.use_move(move_index, self.test_target)
+        outcome = attacker.use_move(move_index, self.test_target)
         
         # Print the move result
         print("\nMove Result:")
-        print(message)
+        print(outcome.message)
         
         # Print final stats
         print("\nFinal Stats:")
@@ -58,7 +69,7 @@ class MoveTestSuite:
             for i, move in enumerate(character.moves):
                 print(f"{i+1}. {move.name}")
                 print(f"   Type: {move.move_type.name}")
-                print(f"   Uses: {move.current_uses}/{move.max_uses}")
+                print(f"   Uses: {character.uses[i]}/{move.max_uses}")
                 print()
 
     def test_specific_move(self):
@@ -149,129 +160,285 @@ class MoveTestSuite:
         self.test_elemental_interactions()
         print("\nAll move tests completed!")
 
-class GameSimulationTest:
+def game_length_distribution():
+    """Distribution of game lengths in turns, one histogram bin per turn"""
+    return Distribution(0, 64, 64)
+
+class PartialStats:
+    """Compact, mergeable statistics for a chunk of simulated games.
+
+    Counts are kept as Counters and values as streaming Distributions instead
+    of lists, so a chunk pickles to a few kilobytes no matter how many games
+    it played. A worker that was profiling adds its Profiler.stacks().
+    """
     def __init__(self):
+        self.wins = Counter()
+        self.class_wins = Counter()
+        self.move_usage = Counter()
+        self.elemental_effectiveness = Counter()
+        self.game_lengths = game_length_distribution()  # Turns of each decided game
+        self.damage_dealt = defaultdict(Distribution)   # class -> damage per hit
+        self.healing_done = defaultdict(Distribution)   # class -> HP per heal
+        self.profile = {}                               # stack -> (calls, nanoseconds)
+
+    @classmethod
+    def from_stats(cls, stats):
+        """Summarize a GameSimulationTest.stats dictionary"""
+        partial = cls()
+        partial.wins.update(stats['wins'])
+        partial.class_wins.update(stats['class_wins'])
+        partial.move_usage.update(stats['move_usage'])
+        partial.elemental_effectiveness.update(stats['elemental_effectiveness'])
+        partial.game_lengths.merge(stats['avg_game_length'])
+        for class_name, damages in stats['damage_dealt'].items():
+            partial.damage_dealt[class_name].merge(damages)
+        for class_name, heals in stats['healing_done'].items():
+            partial.healing_done[class_name].merge(heals)
+        return partial
+
+    @classmethod
+    def from_batch_result(cls, result):
+        """Summarize a BatchResult from the BatchBattleEngine"""
+        partial = cls()
+        for class_index, character_class in enumerate(CLASSES):
+            class_name = character_class.name
+            attacker_wins = int(np.sum((result.winner == ATTACKER_WINS) & (result.attacker_classes == class_index)))
+            defender_wins = int(np.sum((result.winner == DEFENDER_WINS) & (result.defender_classes == class_index)))
+            if attacker_wins:
+                partial.wins[f"Player 1 ({class_name})"] += attacker_wins
+            if defender_wins:
+                partial.wins[f"Player 2 ({class_name})"] += defender_wins
+            if attacker_wins + defender_wins:
+                partial.class_wins[class_name] += attacker_wins + defender_wins
+            
+            for value in np.flatnonzero(result.damage_histogram[class_index]):
+                partial.damage_dealt[class_name].add(int(value), int(result.damage_histogram[class_index, value]))
+            for value in np.flatnonzero(result.healing_histogram[class_index]):
+                partial.healing_done[class_name].add(int(value), int(result.healing_histogram[class_index, value]))
+            if result.super_effective[class_index]:
+                partial.elemental_effectiveness[class_name] += int(result.super_effective[class_index])
+        
+        lengths, counts = np.unique(result.turns[result.winner != DRAW], return_counts=True)
+        for length, count in zip(lengths.tolist(), counts.tolist()):
+            partial.game_lengths.add(length, count)
+        for move_name, uses in zip(MOVE_NAMES, result.move_usage.tolist()):
+            if uses:
+                partial.move_usage[move_name] += uses
+        return partial
+
+    def merge(self, other):
+        """Add another PartialStats into this one"""
+        self.wins.update(other.wins)
+        self.class_wins.update(other.class_wins)
+        self.move_usage.update(other.move_usage)
+        self.elemental_effectiveness.update(other.elemental_effectiveness)
+        self.game_lengths.merge(other.game_lengths)
+        for class_name, damages in other.damage_dealt.items():
+            self.damage_dealt[class_name].merge(damages)
+        for class_name, heals in other.healing_done.items():
+            self.healing_done[class_name].merge(heals)
+        for stack, (calls, nanoseconds) in other.profile.items():
+            totals = self.profile.get(stack, (0, 0))
+            self.profile[stack] = (totals[0] + calls, totals[1] + nanoseconds)
+        return self
+
+    def record_into(self, stats):
+        """Add these statistics to a GameSimulationTest.stats dictionary"""
+        for name, wins in self.wins.items():
+            stats['wins'][name] += wins
+        for class_name, wins in self.class_wins.items():
+            stats['class_wins'][class_name] += wins
+        for move_name, uses in self.move_usage.items():
+            stats['move_usage'][move_name] += uses
+            stats['most_used_moves'][move_name] += uses
+        for class_name, count in self.elemental_effectiveness.items():
+            stats['elemental_effectiveness'][class_name] += count
+        stats['avg_game_length'].merge(self.game_lengths)
+        for class_name, damages in self.damage_dealt.items():
+            stats['damage_dealt'][class_name].merge(damages)
+        for class_name, heals in self.healing_done.items():
+            stats['healing_done'][class_name].merge(heals)
+
+class GameSimulationTest:
+    def __init__(self, rng=None, replay=None):
+        # Every die and move choice of simulate_game comes from this GameRNG
+        self.rng = rng or DEFAULT_RNG
+        self.replay = replay  # ReplayWriter that records every game, if set
         self.stats = {
             'wins': defaultdict(int),
             'class_wins': defaultdict(int),
-            'avg_game_length': [],
+            'avg_game_length': game_length_distribution(),
             'move_usage': defaultdict(int),
-            'damage_dealt': defaultdict(list),
-            'healing_done': defaultdict(list),
+            'damage_dealt': defaultdict(Distribution),
+            'healing_done': defaultdict(Distribution),
             'elemental_effectiveness': defaultdict(int),
             'most_used_moves': defaultdict(int),
             'win_rates': defaultdict(float)
         }
 
-    def _simulate_turn(self, attacker, defender):
+    def _simulate_turn(self, attacker, defender, rng):
         """Simulate a single turn"""
         # Reset move uses if all moves are depleted
-        if not any(move.current_uses > 0 for move in attacker.moves):
-            for move in attacker.moves:
-                move.current_uses = move.max_uses
+        reset_uses = not any(uses > 0 for uses in attacker.uses)
+        if reset_uses:
+            attacker.reset_uses()
         
         # Get available moves
-        available_moves = [i for i, move in enumerate(attacker.moves) if move.current_uses > 0]
+        available_moves = [i for i, uses in enumerate(attacker.uses) if uses > 0]
         
         if not available_moves:
-            return "No moves available!"
+            return MoveOutcome(None, attacker.name, None, success=False, failure="No moves available!")
         
         # Choose a move randomly
-        move_index = random.choice(available_moves)
-        success, message = attacker.use_move(move_index, defender)
+        move_index = rng.choice(available_moves)
+        outcome = attacker.use_move(move_index, defender, rng)
+        if self.replay is not None:
+            self.replay.move(move_index, reset_uses)
         
         # Track statistics
-        if success:
-            move_name = attacker.moves[move_index].name
-            self.stats['move_usage'][move_name] += 1
-            self.stats['most_used_moves'][move_name] += 1
-            
-            # Extract damage from message
-            if "Dealt" in message:
-                damage_str = message.split("Dealt")[-1].split("damage")[0].strip()
-                try:
-                    damage = int(damage_str)
-                    self.stats['damage_dealt'][attacker.character_class.name].append(damage)
-                except ValueError:
-                    pass
-            
-            # Track healing
-            if "healed" in message:
-                heal_amount = int(message.split("healed")[-1].split("HP")[0].strip())
-                self.stats['healing_done'][attacker.character_class.name].append(heal_amount)
-            
-            # Track elemental effectiveness
-            if "super effective" in message:
-                self.stats['elemental_effectiveness'][attacker.character_class.name] += 1
-        
-        return message
+        if outcome.success:
+            profiling = PROFILER.enabled
+            if profiling:
+                stats_frame = PROFILER.push("stats")
+            class_name = attacker.character_class.name
+            self.stats['move_usage'][outcome.move_name] += 1
+            self.stats['most_used_moves'][outcome.move_name] += 1
+            self.stats['damage_dealt'][class_name].add(outcome.damage)
+            if outcome.healing is not None:
+                self.stats['healing_done'][class_name].add(outcome.healing)
+            if outcome.super_effective:
+                self.stats['elemental_effectiveness'][class_name] += 1
+            if profiling:
+                PROFILER.pop(stats_frame)
+        
+        return outcome
 
     def simulate_game(self, attacker, defender, verbose=False):
         """Simulate a single game between two characters"""
         turn = 1
         max_turns = 50  # Prevent infinite games
         
+        rng = self.rng
+        if self.replay is not None:
+            # A recorded game gets its own stream, so its seed alone replays it
+            rng = rng.spawn(1)[0]
+            self.replay.start(rng.seed_sequence, attacker.character_class, defender.character_class)
+        
         if verbose:
             print(f"\nStarting game: {attacker.name} ({attacker.character_class.name}) vs {defender.name} ({defender.character_class.name})")
         
-        while attacker.is_alive and defender.is_alive and turn <= max_turns:
+        while turn <= max_turns:
             if verbose:
                 print(f"\nTurn {turn}")
                 print(f"{attacker.name}: {attacker.health}/{attacker.max_health} HP")
                 print(f"{defender.name}: {defender.health}/{defender.max_health} HP")
             
-            # Attacker's turn
-            message = self._simulate_turn(attacker, defender)
-            if verbose:
-                print(message)
-            if not defender.is_alive:
-                self.stats['wins'][attacker.name] += 1
-                self.stats['class_wins'][attacker.character_class.name] += 1
-                self.stats['avg_game_length'].append(turn)
+            for player, opponent in ((attacker, defender), (defender, attacker)):
+                outcome = self._simulate_turn(player, opponent, rng)
                 if verbose:
-                    print(f"\n{attacker.name} wins in {turn} turns!")
-                return f"{attacker.name} wins!"
-            
-            # Defender's turn
-            message = self._simulate_turn(defender, attacker)
-            if verbose:
-                print(message)
-            if not attacker.is_alive:
-                self.stats['wins'][defender.name] += 1
-                self.stats['class_wins'][defender.character_class.name] += 1
-                self.stats['avg_game_length'].append(turn)
-                if verbose:
-                    print(f"\n{defender.name} wins in {turn} turns!")
-                return f"{defender.name} wins!"
+                    print(outcome.message)
+                winner = battle_winner(attacker, defender)
+                if winner is not None:
+                    self._finish_replay(winner, attacker, defender)
+                    winner = (attacker, defender)[winner - 1]
+                    self.stats['wins'][winner.name] += 1
+                    self.stats['class_wins'][winner.character_class.name] += 1
+                    self.stats['avg_game_length'].add(turn)
+                    if verbose:
+                        print(f"\n{winner.name} wins in {turn} turns!")
+                    return f"{winner.name} wins!"
             
             turn += 1
         
+        self._finish_replay(REPLAY_DRAW, attacker, defender)
         if verbose:
             print("\nGame ended in a draw!")
         return "Draw!"
 
-    def run_simulation(self, num_games=100, verbose=False):
-        """Run multiple game simulations"""
+    def _finish_replay(self, winner, attacker, defender):
+        if self.replay is not None:
+            self.replay.finish(winner, attacker.health, defender.health)
+
+    def _play_random_game(self, verbose=False):
+        """Play one game between randomly selected character classes"""
+        classes = list(CharacterClass)
+        attacker_class = self.rng.choice(classes)
+        defender_class = self.rng.choice(classes)
+        
+        attacker = Character(f"Player 1 ({attacker_class.name})")
+        attacker.character_class = attacker_class
+        attacker.initialize_character()
+        defender = Character(f"Player 2 ({defender_class.name})")
+        defender.character_class = defender_class
+        defender.initialize_character()
+        
+        with PROFILER.frame("simulate_game"):
+            return self.simulate_game(attacker, defender, verbose)
+
+    def run_simulation(self, num_games=100, verbose=False, seed=None):
+        """Run multiple game simulations, reproducible when a seed is given"""
         print(f"\nRunning {num_games} game simulations...")
         
+        if seed is not None:
+            self.rng = GameRNG(seed)
         for i in range(num_games):
-            # Randomly select character classes
-            attacker_class = random.choice(list(CharacterClass))
-            defender_class = random.choice(list(CharacterClass))
-            
-            attacker = Character(f"Player 1 ({attacker_class.name})")
-            attacker.character_class = attacker_class
-            attacker.initialize_character()
-            defender = Character(f"Player 2 ({defender_class.name})")
-            defender.character_class = defender_class
-            defender.initialize_character()
-            
-            result = self.simulate_game(attacker, defender, verbose)
+            result = self._play_random_game(verbose)
             if verbose:
                 print(f"\nGame {i+1} Result: {result}")
         
         self.print_statistics()
 
+    def run_batch_simulation(self, num_games=100000, batch_size=100000, seed=None):
+        """Run game simulations with the vectorized BatchBattleEngine"""
+        print(f"\nRunning {num_games} game simulations in batches of {batch_size}...")
+        
+        num_batches = -(-num_games // batch_size)
+        seeds = np.random.SeedSequence(seed).spawn(num_batches)
+        for i in range(num_batches):
+            games = min(batch_size, num_games - i * batch_size)
+            result = BatchBattleEngine.random_matchups(games, seed=seeds[i]).run()
+            PartialStats.from_batch_result(result).record_into(self.stats)
+        
+        self.print_statistics()
+
+    def run_parallel_simulation(self, num_games=100000, workers=None, seed=None, chunk_size=10000, batch=False):
+        """Run game simulations across a pool of worker processes.
+
+        The games are split into fixed-size chunks, each with its own RNG stream
+        spawned from `seed`, so the results only depend on the seed and chunk size,
+        never on the number of workers. Set `batch` to play each chunk with the
+        BatchBattleEngine instead of simulate_game.
+        """
+        workers = workers or os.cpu_count()
+        print(f"\nRunning {num_games} game simulations on {workers} workers...")
+        
+        num_chunks = -(-num_games // chunk_size)
+        seeds = np.random.SeedSequence(seed).spawn(num_chunks)
+        sizes = [min(chunk_size, num_games - i * chunk_size) for i in range(num_chunks)]
+        batch_flags = [batch] * num_chunks
+        
+        total = PartialStats()
+        if workers == 1:
+            for partial in map(_simulate_chunk, seeds, sizes, batch_flags):
+                total.merge(partial)
+        else:
+            # Workers profile into their own copy of PROFILER and send the totals back
+            profile_flags = [PROFILER.enabled] * num_chunks
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for partial in executor.map(_simulate_chunk, seeds, sizes, batch_flags, profile_flags):
+                    total.merge(partial)
+            PROFILER.merge(total.profile)
+        total.record_into(self.stats)
+        
+        self.print_statistics()
+
+    def run_matchup_matrix(self, width=0.02, confidence=0.95, seed=None):
+        """Play every ordered class pairing until its player 1 win rate is known to within `width`"""
+        print(f"\nRunning matchup matrix to ±{width / 2:.1%} at {confidence:.0%} confidence...")
+        matrix = MatchupMatrix(width, confidence, seed).run()
+        print(matrix.report())
+        return matrix
+
     def print_statistics(self):
         """Print detailed statistics from the simulations"""
         print("\nGame Statistics")
@@ -290,8 +457,9 @@ class GameSimulationTest:
         
         # Average game length
         if self.stats['avg_game_length']:
-            avg_turns = sum(self.stats['avg_game_length']) / len(self.stats['avg_game_length'])
-            print(f"\nAverage Game Length: {avg_turns:.1f} turns")
+            game_lengths = self.stats['avg_game_length']
+            print(f"\nAverage Game Length: {game_lengths.mean:.1f} turns")
+            print(f"  {game_lengths.summary()}")
         else:
             print("\nNo valid game length data recorded")
         
@@ -309,8 +477,7 @@ class GameSimulationTest:
             print("\nAverage Damage per Class:")
             for class_name, damages in self.stats['damage_dealt'].items():
                 if damages:
-                    avg_damage = sum(damages) / len(damages)
-                    print(f"{class_name}: {avg_damage:.1f} damage per hit")
+                    print(f"{class_name}: {damages.mean:.1f} damage per hit ({damages.summary()})")
         else:
             print("\nNo damage data recorded")
         
@@ -319,8 +486,7 @@ class GameSimulationTest:
             print("\nAverage Healing per Class:")
             for class_name, heals in self.stats['healing_done'].items():
                 if heals:
-                    avg_heal = sum(heals) / len(heals)
-                    print(f"{class_name}: {avg_heal:.1f} HP healed per heal")
+                    print(f"{class_name}: {heals.mean:.1f} HP healed per heal ({heals.summary()})")
         else:
             print("\nNo healing data recorded")
         
@@ -332,6 +498,25 @@ class GameSimulationTest:
         else:
             print("\nNo elemental effectiveness data recorded")
 
+def _simulate_chunk(seed_sequence, num_games, batch=False, profile=False):
+    """Worker for GameSimulationTest.run_parallel_simulation: play one chunk of games.
+    With `profile` (in a worker process) the chunk is profiled and its totals returned."""
+    if profile:
+        PROFILER.reset()
+        PROFILER.enable()
+    if batch:
+        result = BatchBattleEngine.random_matchups(num_games, seed=seed_sequence).run()
+        partial = PartialStats.from_batch_result(result)
+    else:
+        simulator = GameSimulationTest(GameRNG(seed_sequence))
+        for _ in range(num_games):
+            simulator._play_random_game()
+        with PROFILER.frame("PartialStats.from_stats"):
+            partial = PartialStats.from_stats(simulator.stats)
+    if profile:
+        partial.profile = PROFILER.stacks()
+    return partial
+
 def run_move_tests():
     """Run the move testing menu"""
     tester = MoveTestSuite()
@@ -364,9 +549,14 @@ def run_game_simulation():
         print("\nGame Simulation Menu:")
         print("1. Run simulation with detailed output")
         print("2. Run simulation with summary only")
-        print("3. Return to main menu")
+        print("3. Run batch simulation (vectorized, summary only)")
+        print("4. Run parallel simulation (all CPU cores, summary only)")
+        print("5. Search for balance patches")
+        print("6. Run matchup matrix (every pairing, with confidence intervals)")
+        print(f"7. Turn profiling {'off' if PROFILER.enabled else 'on'}")
+        print("8. Return to main menu")
         
-        choice = input("\nEnter your choice (1-3): ")
+        choice = input("\nEnter your choice (1-8): ")
         
         if choice == "1":
             num_games = int(input("Enter number of games to simulate: "))
@@ -375,9 +565,34 @@ def run_game_simulation():
             num_games = int(input("Enter number of games to simulate: "))
             simulator.run_simulation(num_games, verbose=False)
         elif choice == "3":
+            num_games = int(input("Enter number of games to simulate: "))
+            simulator.run_batch_simulation(num_games)
+        elif choice == "4":
+            num_games = int(input("Enter number of games to simulate: "))
+            simulator.run_parallel_simulation(num_games)
+        elif choice == "5":
+            games = int(input("Enter number of games per matchup: "))
+            balance.main(games)
+        elif choice == "6":
+            width = float(input("Enter the confidence interval width in % (e.g. 2): ")) / 100
+            simulator.run_matchup_matrix(width)
+        elif choice == "7":
+            if PROFILER.enabled:
+                PROFILER.disable()
+            else:
+                # Reported after every run, and on kill -USR2 during one
+                PROFILER.enable(dump_signal=signal.SIGUSR2)
+            continue
+        elif choice == "8":
             break
         else:
             print("Invalid choice. Please try again.")
+            continue
+        
+        if PROFILER.enabled:
+            print("\nProfile:")
+            PROFILER.dump(sys.stdout)
+            PROFILER.reset()
 
 def main():
     """Main menu for the test suite"""
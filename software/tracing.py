@@ -0,0 +1,176 @@
+import atexit
+import math
+import signal
+import sys
+import threading
+import time
+
+# Stages of an input's path through the game, in order
+STAGES = (
+    "pin_change",           # Firmata reported the pin edge
+    "debounce_accept",      # ControllerInput turned it into an InputEvent
+    "check_button_return",  # Hardware.check_button handed it to the game
+    "menu_state_change",    # The menu selection moved or was confirmed
+    "render_flush",         # The redrawn menu was flushed to the terminal
+    "move_resolved",        # The selected move was used
+    "command_dispatch",     # A vibrate or audio command reached the command bus
+)
+
+class LatencyHistogram:
+    """Log-scale latency histogram.
+
+    Buckets are SUB_BUCKETS per doubling starting at 1 microsecond, so recording
+    is one log2 and a list increment and percentiles are within about 19%.
+    """
+    SUB_BUCKETS = 4
+    MIN_LATENCY = 1e-6
+    NUM_BUCKETS = 30 * SUB_BUCKETS  # Up to about 18 minutes
+
+    def __init__(self):
+        self.counts = [0] * self.NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _bucket(self, seconds):
+        if seconds <= self.MIN_LATENCY:
+            return 0
+        return min(self.NUM_BUCKETS - 1, int(math.log2(seconds / self.MIN_LATENCY) * self.SUB_BUCKETS))
+
+    def _bucket_limit(self, bucket):
+        """Upper latency of a bucket"""
+        return self.MIN_LATENCY * 2 ** ((bucket + 1) / self.SUB_BUCKETS)
+
+    def record(self, seconds):
+        self.counts[self._bucket(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent):
+        """Latency below which `percent` of the records fall (bucket upper bound)"""
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.max, self._bucket_limit(bucket))
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def __str__(self):
+        if not self.count:
+            return "no samples"
+        return (f"n={self.count} mean={self.mean * 1000:.2f}ms p50={self.percentile(50) * 1000:.2f}ms "
+                f"p90={self.percentile(90) * 1000:.2f}ms p99={self.percentile(99) * 1000:.2f}ms "
+                f"max={self.max * 1000:.2f}ms")
+
+class Trace:
+    """Timeline of one input, marks are recorded as the time since its origin"""
+    __slots__ = ("tracer", "origin", "marks")
+
+    def __init__(self, tracer, origin):
+        self.tracer = tracer
+        self.origin = origin  # time.perf_counter() of the first stage
+        self.marks = []
+
+    def mark(self, stage):
+        elapsed = time.perf_counter() - self.origin
+        self.marks.append((stage, elapsed))
+        self.tracer.record(stage, elapsed)
+
+class Tracer:
+    """Collects per-stage latency histograms of player inputs.
+
+    An input's Trace follows it from the pin change to the command it causes.
+    The game refers to the trace of a player's latest input by player id
+    through mark(). Tracing is off until enable() is called, until then start()
+    returns None and mark() does nothing.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self._active = {}
+        self._last_key = None
+        self._lock = threading.Lock()
+
+    def enable(self, dump_signal=None, dump_at_exit=False):
+        """Start tracing, optionally dumping the histograms on a signal (e.g. SIGUSR1) or at exit"""
+        self.enabled = True
+        if dump_signal is not None:
+            signal.signal(dump_signal, lambda signum, frame: self._dump_in_thread())
+        if dump_at_exit:
+            atexit.register(self.dump)
+
+    def _dump_in_thread(self):
+        # Signal handlers run on the main thread, which may be inside `with self._lock`
+        # in mark() or record(): taking the lock here would deadlock, a thread just waits
+        threading.Thread(target=self.dump, daemon=True).start()
+
+    def start(self, origin=None):
+        """Begin a trace at its pin change, `origin` is its time.perf_counter() (now by default)"""
+        if not self.enabled:
+            return None
+        now = time.perf_counter()
+        trace = Trace(self, now if origin is None else origin)
+        self.record("pin_change", now - trace.origin)
+        trace.marks.append(("pin_change", now - trace.origin))
+        return trace
+
+    @staticmethod
+    def perf_counter_at(wall_time):
+        """Convert a time.time() timestamp (as in pymata4 reports) to time.perf_counter()"""
+        return time.perf_counter() - (time.time() - wall_time)
+
+    def activate(self, key, trace):
+        """Make `trace` the one mark(key, ...) adds to"""
+        if trace is None:
+            return
+        with self._lock:
+            self._active[key] = trace
+            self._last_key = key
+
+    def mark(self, key, stage):
+        """Mark a stage on the active trace of `key` (None for the most recent input)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            trace = self._active.get(self._last_key if key is None else key)
+        if trace is not None:
+            trace.mark(stage)
+
+    def record(self, stage, seconds):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def report(self):
+        """Latency since the pin change at each stage"""
+        with self._lock:
+            lines = ["Input latency by stage (time since the pin change):"]
+            for stage, histogram in self.histograms.items():
+                lines.append(f"  {stage:<20} {histogram}")
+        return "\n".join(lines)
+
+    def dump(self, file=None):
+        print(self.report(), file=sys.stderr if file is None else file, flush=True)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+            self._active.clear()
+            self._last_key = None
+
+# Shared by the hardware input path, the game and the command bus
+TRACER = Tracer()
@@ -0,0 +1,31 @@
+import time
+from software.ai import ExpectimaxPlayer
+from software.character import Character
+
+BUDGET = 0.05
+
+def character(name, class_choice):
+    created = Character(name)
+    created.select_character_class(class_choice)
+    return created
+
+def test_choose_move_returns_a_legal_move_within_its_budget():
+    player = ExpectimaxPlayer(time_budget=BUDGET)
+    for seat, (mine, theirs) in ((1, (1, 2)), (2, (3, 3)), (1, (2, 3))):
+        me, opponent = character("AI", mine), character("Human", theirs)
+        me.uses[0] = 0
+        opponent.health = opponent.max_health // 3
+        start = time.perf_counter()
+        slot = player.choose_move(me, opponent, seat)
+        elapsed = time.perf_counter() - start
+        assert 0 <= slot < len(me.moves) and me.uses[slot] > 0
+        assert player.last_depth >= 1
+        # One node may finish after the deadline, and the first call sets up the solver
+        assert elapsed < BUDGET + 0.25
+
+def test_only_move_left_is_chosen():
+    player = ExpectimaxPlayer(time_budget=BUDGET)
+    me, opponent = character("AI", 2), character("Human", 1)
+    me.uses = [0] * len(me.moves)
+    me.uses[3] = 1
+    assert player.choose_move(me, opponent, 2) == 3
@@ -0,0 +1,86 @@
+import time
+import wave
+from hardware.audio import AudioPlayer, ClipCache, NullOutput, PlaysoundOutput
+
+RATE = 8000
+
+def write_wav(path, seconds):
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes(b"\0\0" * int(RATE * seconds))
+    return str(path)
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+def test_queued_clips_play_by_priority(tmp_path):
+    long, low, high = (write_wav(tmp_path / name, seconds)
+                       for name, seconds in (("long.wav", 0.3), ("low.wav", 0.01), ("high.wav", 0.01)))
+    device = NullOutput()
+    player = AudioPlayer(device, ClipCache(), clips=())
+    try:
+        player.play(long)
+        wait_until(lambda: device.played == [long])
+        player.play(low, priority=0)
+        player.play(high, priority=5)
+        wait_until(lambda: len(device.played) == 3)
+        assert device.played == [long, high, low]
+    finally:
+        player.shutdown()
+
+def test_interrupt_stops_a_lower_priority_clip(tmp_path):
+    long, cue = write_wav(tmp_path / "long.wav", 5), write_wav(tmp_path / "cue.wav", 0.01)
+    device = NullOutput()
+    player = AudioPlayer(device, ClipCache(), clips=())
+    try:
+        start = time.monotonic()
+        player.play(long)
+        wait_until(lambda: device.played == [long])
+        player.play(cue, priority=1, interrupt=True)
+        wait_until(lambda: device.played == [long, cue])
+        assert time.monotonic() - start < 1
+    finally:
+        player.shutdown()
+
+def test_clip_cache_evicts_least_recently_used(tmp_path):
+    paths = [write_wav(tmp_path / f"{name}.wav", 0.1) for name in "abc"]
+    clip_bytes = int(RATE * 0.1) * 2
+    cache = ClipCache(max_bytes=2 * clip_bytes)
+    a, b, c = paths
+    cache.get(a)
+    cache.get(b)
+    cache.get(a)
+    cache.get(c)
+    assert (len(cache), cache.nbytes, cache.evictions) == (2, 2 * clip_bytes, 1)
+    assert (cache.hits, cache.misses) == (1, 3)
+    cache.get(a)
+    assert cache.hits == 2
+    cache.get(b)
+    assert (cache.misses, cache.evictions) == (4, 2)
+
+class RecordingPlaysound(PlaysoundOutput):
+    """PlaysoundOutput that records the files it would open instead of playing them"""
+    def __init__(self):
+        self.played = []
+
+    def play(self, clip):
+        self.played.append((clip.path, clip.pcm))
+        return NullOutput().play(clip)
+
+def test_playsound_fallback_plays_from_files_without_caching(tmp_path):
+    clip = write_wav(tmp_path / "turn.wav", 0.1)
+    device, cache = RecordingPlaysound(), ClipCache()
+    player = AudioPlayer(device, cache, clips=(clip,))
+    try:
+        assert len(cache) == 0
+        assert player.play(clip, interrupt=True)
+        assert not player.play(str(tmp_path / "missing.wav"))
+        wait_until(lambda: device.played == [(clip, None)])
+        assert (len(cache), cache.misses) == (0, 0)
+    finally:
+        player.shutdown()
@@ -0,0 +1,30 @@
+import numpy as np
+from software.balance import BASELINE, PAIRS, PARAMETERS, evaluate
+from software.batch_engine import BatchBattleEngine, CLASSES, CLASS_HEALTH
+from software.character import CharacterClass
+
+def knight_health(config, delta):
+    index = [name for name, *_ in PARAMETERS].index("KNIGHT.health")
+    return config[:index] + (config[index] + delta,) + config[index + 1:]
+
+def test_untouched_pairing_is_identical():
+    baseline = evaluate(BASELINE, 2000, seed=3)
+    patched = evaluate(knight_health(BASELINE, 10), 2000, seed=3)
+    untouched = PAIRS.index((CLASSES.index(CharacterClass.WIZARD), CLASSES.index(CharacterClass.ARCHER)))
+    assert baseline.win_rates[untouched] == patched.win_rates[untouched]
+    assert baseline.win_rates != patched.win_rates
+
+def test_games_keep_their_dice_when_others_end_earlier():
+    knight, wizard, archer = (CLASSES.index(c) for c in CharacterClass)
+    # Both halves play the same matchups, as antithetic twins need
+    attackers = ([knight] * 250 + [wizard] * 250) * 2
+    defenders = [archer] * 1000
+    knight_games = np.array(attackers) == knight
+    health = CLASS_HEALTH.copy()
+    health[knight] += 30
+    for antithetic in (False, True):
+        baseline = BatchBattleEngine(attackers, defenders, seed=5, antithetic=antithetic).run()
+        patched = BatchBattleEngine(attackers, defenders, seed=5, class_health=health, antithetic=antithetic).run()
+        assert not np.array_equal(baseline.turns[knight_games], patched.turns[knight_games])
+        assert np.array_equal(baseline.winner[~knight_games], patched.winner[~knight_games])
+        assert np.array_equal(baseline.turns[~knight_games], patched.turns[~knight_games])
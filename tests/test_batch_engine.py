@@ -0,0 +1,37 @@
+import numpy as np
+from software.batch_engine import BatchBattleEngine, CLASSES, ATTACKER_WINS, MOVE_NAMES
+from software.character import Character
+from software.rng import GameRNG
+from software.test_suite import GameSimulationTest
+
+SCALAR_GAMES = 1500
+BATCH_GAMES = 60000
+
+def scalar_games(attacker_class, defender_class, seed):
+    """Player 1 wins and move usage of simulate_game on a fixed seed"""
+    simulator = GameSimulationTest(GameRNG(seed))
+    wins = 0
+    for _ in range(SCALAR_GAMES):
+        attacker, defender = Character("Player 1"), Character("Player 2")
+        for character, character_class in ((attacker, attacker_class), (defender, defender_class)):
+            character.character_class = character_class
+            character.initialize_character()
+        wins += simulator.simulate_game(attacker, defender) == "Player 1 wins!"
+    return wins, simulator.stats["move_usage"]
+
+def test_batch_engine_agrees_with_simulate_game():
+    for seed, (a, b) in enumerate([(0, 1), (1, 2), (2, 0), (2, 2)]):
+        wins, move_usage = scalar_games(CLASSES[a], CLASSES[b], seed)
+        result = BatchBattleEngine([a] * BATCH_GAMES, [b] * BATCH_GAMES, seed=seed).run()
+        batch_rate = (result.winner == ATTACKER_WINS).mean()
+        scalar_rate = wins / SCALAR_GAMES
+        standard_error = (batch_rate * (1 - batch_rate) / SCALAR_GAMES) ** 0.5
+        assert abs(scalar_rate - batch_rate) < 4.5 * standard_error + 1e-9, (CLASSES[a], CLASSES[b])
+
+        # Both pick moves uniformly among those with uses left, so move shares agree too
+        used = [name for name in MOVE_NAMES if move_usage.get(name)]
+        scalar_share = np.array([move_usage[name] for name in used], dtype=float)
+        batch_share = result.move_usage[[MOVE_NAMES.index(name) for name in used]].astype(float)
+        scalar_share /= scalar_share.sum()
+        batch_share /= batch_share.sum()
+        assert np.abs(scalar_share - batch_share).max() < 0.02
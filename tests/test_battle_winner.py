@@ -0,0 +1,31 @@
+import numpy as np
+from software.batch_engine import BatchBattleEngine, CLASSES, DEFENDER_WINS
+from software.character import Character, CharacterClass
+from software.rng import GameRNG
+from software.test_suite import GameSimulationTest
+
+EXPLOSIVE_SHOT = 4
+
+def archer(name, health):
+    character = Character(name)
+    character.select_character_class(3)
+    character.health = health
+    return character
+
+def test_mutual_knockout_goes_to_player_2():
+    # Player 1's Explosive Shot knocks out player 2 and its recoil knocks out player 1
+    attacker, defender = archer("Player 1", 2), archer("Player 2", 1)
+    attacker.uses = [0, 0, 0, 0, 1, 0]
+    simulator = GameSimulationTest(GameRNG(1))
+    assert simulator.simulate_game(attacker, defender) == "Player 2 wins!"
+    assert not attacker.is_alive and not defender.is_alive
+
+    index = CLASSES.index(CharacterClass.ARCHER)
+    engine = BatchBattleEngine([index] * 100, [index] * 100, seed=1)
+    engine.health[0], engine.health[1] = 2, 1
+    engine.uses[0] = 0
+    engine.uses[0, :, EXPLOSIVE_SHOT] = 1
+    result = engine.run()
+    assert (engine.health == 0).all()
+    assert (result.winner == DEFENDER_WINS).all()
+    assert (result.turns == 1).all()
@@ -0,0 +1,35 @@
+import asyncio
+import threading
+import pytest
+from software.commands import COMMANDS, CheckButton, CommandBus, PlayAudio, Vibrate
+
+def test_dispatch_runs_sync_handlers_on_the_calling_thread():
+    bus = CommandBus()
+    threads = []
+    bus.register(CheckButton, lambda command: threads.append(threading.current_thread()) or command.menu_size)
+    assert bus.dispatch(CheckButton(1, menu_size=6)) == 6
+    assert threads == [threading.current_thread()]
+
+def test_dispatch_and_send_run_both_kinds_of_handler():
+    bus = CommandBus()
+    played = []
+
+    async def vibrate(command):
+        return (command.player_id, command.pattern)
+
+    bus.register(PlayAudio, lambda command: played.append(command.file_path))
+    bus.register(Vibrate, vibrate)
+    assert bus.dispatch(Vibrate(2, "turn")) == (2, "turn")
+    bus.dispatch(PlayAudio("victory.mp3"))
+    assert asyncio.run(bus.send(Vibrate(1, "victory"))) == (1, "victory")
+    asyncio.run(bus.send(PlayAudio("turn.wav")))
+    assert played == ["victory.mp3", "turn.wav"]
+
+def test_unregistered_command_raises():
+    with pytest.raises(KeyError):
+        CommandBus().dispatch(Vibrate(1, "turn"))
+
+def test_on_command_names_map_to_command_types():
+    command = COMMANDS["check_button"](player_id=2, menu_size=None)
+    assert isinstance(command, CheckButton)
+    assert command.params() == {"player_id": 2, "menu_size": None}
@@ -0,0 +1,33 @@
+import time
+from hardware.controller_input import SELECT, ControllerInput
+from hardware.fake_board import INPUT, FakeBoard
+
+BUTTON, KNOB = 6, 0
+
+def controller(script=(), **options):
+    board = FakeBoard(script)
+    return board, ControllerInput(board, {1: (BUTTON, KNOB)}, **options)
+
+def test_button_bounces_within_debounce_time_are_one_press():
+    # Contact bounce: down, up and down again 10 ms apart, then a real second press
+    board, inputs = controller([(0.05, INPUT, BUTTON, 1), (0.06, INPUT, BUTTON, 0), (0.07, INPUT, BUTTON, 1),
+                                (0.2, INPUT, BUTTON, 0), (0.3, INPUT, BUTTON, 1)], debounce_time=0.05)
+    try:
+        first = inputs.wait(1, timeout=1)
+        second = inputs.wait(1, timeout=1)
+        assert (first.action, second.action) == (SELECT, SELECT)
+        assert second.timestamp - first.timestamp > 0.15
+        assert inputs.wait(1, timeout=0.2) is None
+    finally:
+        board.shutdown()
+
+def test_events_older_than_max_age_are_dropped():
+    board, inputs = controller([(0.0, INPUT, BUTTON, 1)])
+    try:
+        time.sleep(0.3)
+        assert inputs.wait(1, timeout=0.2, max_age=0.1) is None
+        board.set_input(INPUT, BUTTON, 0)
+        board.schedule_from_now([(0.05, INPUT, BUTTON, 1)])
+        assert inputs.wait(1, timeout=1, max_age=0.1).action == SELECT
+    finally:
+        board.shutdown()
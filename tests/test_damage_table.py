@@ -0,0 +1,30 @@
+from software.damage_table import DamageTable
+
+def test_out_of_range_entries_are_evicted_least_recently_used():
+    table = DamageTable(max_overflow_entries=2)
+    table.lookup(5, 10, 10)                     # In range: kept for good
+    first, second, third = ((5, 50 + i, 10) for i in range(3))
+    table.lookup(*first)
+    table.lookup(*second)
+    table.lookup(*first)                        # Now the most recently used
+    table.lookup(*third)
+    assert (len(table), table.evictions) == (3, 1)
+    assert (table.hits, table.misses) == (1, 4)
+
+    table.lookup(*first)
+    table.lookup(5, 10, 10)
+    assert (table.hits, table.misses) == (3, 4)
+    table.lookup(*second)                       # Was evicted: computed again
+    assert (table.misses, table.evictions) == (5, 2)
+    for _ in range(100):
+        table.lookup(5, 100, 30)
+    assert len(table) == 3
+
+def test_cached_and_evicted_entries_match_the_damage_formula():
+    table = DamageTable(max_overflow_entries=1)
+    for power, attack, defense, super_effective in ((5, 12, 8, False), (3, 60, 0, True), (7, 45, 2, False)):
+        multiplier = 1.5 if super_effective else 1.0
+        expected = tuple(max(1, int((d20 + power) / 2 * (attack / max(1, defense)) * multiplier))
+                         for d20 in range(1, 21))
+        for _ in range(2):
+            assert table.lookup(power, attack, defense, super_effective).damages == expected
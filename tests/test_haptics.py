@@ -0,0 +1,56 @@
+import time
+from hardware.fake_board import FakeBoard
+from hardware.haptics import PATTERNS, HapticsEngine
+from hardware.pin_cache import PinCache
+
+MOTOR_1, MOTOR_2, DIRECTION_1, DIRECTION_2 = 9, 10, 3, 4
+
+def engine():
+    board = FakeBoard()
+    pins = PinCache(board)
+    for pin in (DIRECTION_1, DIRECTION_2):
+        pins.set_pin_mode_digital_output(pin)
+    for pin in (MOTOR_1, MOTOR_2):
+        pins.set_pin_mode_pwm_output(pin)
+    return board, HapticsEngine(pins, {1: MOTOR_1, 2: MOTOR_2}, DIRECTION_1, DIRECTION_2)
+
+def wait_until(condition, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+def test_new_pattern_preempts_only_its_motor():
+    board, haptics = engine()
+    try:
+        haptics.play(1, "victory")
+        haptics.play(2, "turn")
+        wait_until(lambda: board.writes_to(MOTOR_1)[-1:] == [PATTERNS["victory"][1][0]])
+        # The default pulse replaces the victory ramp on motor 1 straight away
+        haptics.play(1, "default")
+        wait_until(lambda: board.writes_to(MOTOR_1)[-1:] == [200])
+        assert board.writes_to(MOTOR_2) == [255]
+        assert haptics.is_playing(2)
+        wait_until(lambda: board.writes_to(MOTOR_1)[-1] == 0)
+        assert board.writes_to(MOTOR_1)[-2:] == [200, 0]
+        assert haptics.is_playing(2)
+    finally:
+        haptics.shutdown()
+        board.shutdown()
+
+def test_cancel_stops_a_motor_and_its_pattern():
+    board, haptics = engine()
+    try:
+        haptics.play(1, "turn")
+        haptics.play(2, "turn")
+        wait_until(lambda: board.writes_to(MOTOR_2) == [255])
+        haptics.cancel(2)
+        wait_until(lambda: not haptics.is_playing(2))
+        assert board.writes_to(MOTOR_2) == [255, 0]
+        assert haptics.is_playing(1)
+        haptics.cancel()
+        wait_until(lambda: not haptics.is_playing(1))
+        assert board.writes_to(DIRECTION_1)[-1] == 0
+    finally:
+        haptics.shutdown()
+        board.shutdown()
@@ -0,0 +1,32 @@
+import time
+from hardware.controller_input import ABSOLUTE, DOWN, SWITCH, UP
+from hardware.fake_board import ANALOG, FakeBoard, turn
+from hardware.hardware import Hardware
+
+def test_switch_mode_steps_and_repeats():
+    hardware = Hardware(FakeBoard(), potentio_mode=SWITCH)
+    try:
+        board = hardware.arduino
+        board.set_input(ANALOG, hardware.potentio_1_pin, 1000)
+        assert hardware.check_button(1, menu_size=6) == UP
+        # Held in the UP zone, the input repeats after repeat_delay
+        start = time.monotonic()
+        assert hardware.check_button(1, menu_size=6) == UP
+        assert time.monotonic() - start >= hardware.controller_input.repeat_delay * 0.8
+        board.schedule_from_now(turn(0, hardware.potentio_1_pin, 512) + turn(0.1, hardware.potentio_1_pin, 10))
+        assert hardware.check_button(1, menu_size=6) == DOWN
+    finally:
+        hardware.shutdown()
+
+def test_absolute_mode_points_at_options():
+    hardware = Hardware(FakeBoard(), potentio_mode=ABSOLUTE)
+    try:
+        # The knob rests at the middle of its travel, the third of six options
+        assert hardware.check_button(1, menu_size=6) == 2
+        hardware.arduino.set_input(ANALOG, hardware.potentio_1_pin, 0)
+        slots = []
+        while not slots or slots[-1] != 5:
+            slots.append(hardware.check_button(1, menu_size=6))
+        assert slots == [3, 4, 5]
+    finally:
+        hardware.shutdown()
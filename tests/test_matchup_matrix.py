@@ -0,0 +1,19 @@
+import numpy as np
+from software.batch_engine import BatchBattleEngine, CLASSES, ATTACKER_WINS
+from software.character import CharacterClass
+from software.matchup_matrix import MatchupMatrix
+
+def test_mirrored_cells_share_each_class_dice():
+    knight, archer = CLASSES.index(CharacterClass.KNIGHT), CLASSES.index(CharacterClass.ARCHER)
+    knight_seed, archer_seed = np.random.SeedSequence(7).spawn(2)
+    first = BatchBattleEngine([knight] * 4000, [archer] * 4000, side_seeds=(knight_seed, archer_seed)).run()
+    second = BatchBattleEngine([archer] * 4000, [knight] * 4000, side_seeds=(archer_seed, knight_seed)).run()
+    # Dice that favour the knight do so in both seats, so player 1 results are anticorrelated
+    assert np.corrcoef(first.winner == ATTACKER_WINS, second.winner == ATTACKER_WINS)[0, 1] < -0.2
+
+def test_first_mover_advantage_interval():
+    matrix = MatchupMatrix(width=0.05, seed=11).run()
+    advantage, half_width = matrix.first_mover_advantage()
+    assert 0 < half_width < 0.025
+    assert advantage - half_width > 0
+    assert matrix.common_dice_variance_ratio() < 1
@@ -0,0 +1,70 @@
+import numpy as np
+from software.batch_engine import BatchBattleEngine, CLASSES
+from software.character import Character, CharacterClass
+from software.rng import GameRNG
+from software.solver import MatchupSolver, HEALTH
+
+VOLCANIC_SURGE = 4
+
+def low_health_wizard():
+    wizard = Character("Wizard")
+    wizard.select_character_class(2)
+    wizard.health = wizard.max_health // 2 - 1
+    return wizard
+
+def knight():
+    character = Character("Knight")
+    character.select_character_class(1)
+    return character
+
+def test_volcanic_surge_below_half_health_deals_no_damage():
+    wizard, target = low_health_wizard(), knight()
+    outcome = wizard.use_move(VOLCANIC_SURGE, target, GameRNG(1))
+    assert outcome.took_higher and outcome.damage > 0
+    assert (target.health, target.last_damage_taken) == (target.max_health, 0)
+
+    solver = MatchupSolver()
+    solver.setup(CharacterClass.WIZARD, CharacterClass.KNIGHT)
+    states = (solver.state(0, low_health_wizard()), solver.state(1, knight()))
+    for _, child in solver.move_outcomes(0, states, VOLCANIC_SURGE):
+        assert child[1] == states[1]
+
+    wizard_index, knight_index = CLASSES.index(CharacterClass.WIZARD), CLASSES.index(CharacterClass.KNIGHT)
+    engine = BatchBattleEngine([wizard_index] * 100, [knight_index] * 100, seed=2)
+    engine.health[0] = wizard.health
+    engine.uses[0] = 0
+    engine.uses[0, :, VOLCANIC_SURGE] = 1
+    engine._play_moves(0, np.arange(100))
+    assert (engine.health[1] == target.max_health).all()
+    assert (engine.last_damage_taken[1] == 0).all()
+
+def archer():
+    character = Character("Archer")
+    character.select_character_class(3)
+    return character
+
+def test_move_outcome_records_the_numbers_behind_a_move():
+    user, target = archer(), knight()
+    barrage = user.use_move(3, target, GameRNG(4))  # Rock Barrage
+    assert barrage.success and barrage.variable_hits and 2 <= barrage.hits <= 5
+    assert (len(barrage.rolls), len(barrage.hit_damages)) == (barrage.hits, barrage.hits)
+    assert barrage.roll == barrage.rolls[0] and barrage.damage == sum(barrage.hit_damages)
+    assert barrage.stat_changes == (("Knight", "defense", -barrage.hits),)
+    assert (barrage.healing, barrage.recoil) == (None, None)
+
+    explosive = user.use_move(4, target, GameRNG(5))  # Explosive Shot
+    assert explosive.recoil == explosive.damage // 3 and explosive.healing is None
+    punch = target.use_move(4, user, GameRNG(6))      # Magma Punch
+    assert punch.healing == punch.damage // 4 and punch.recoil is None
+
+    # The same dice give the same outcome
+    again = archer().use_move(3, knight(), GameRNG(4))
+    assert (again.rolls, again.hit_damages, again.damage) == (barrage.rolls, barrage.hit_damages, barrage.damage)
+
+def test_failed_moves_report_why():
+    user, target = archer(), knight()
+    user.uses[4] = 0
+    outcome = user.use_move(4, target, GameRNG(1))
+    assert not outcome.success and outcome.damage == 0 and outcome.rolls == ()
+    assert str(outcome.message) == "Explosive Shot has no uses left!"
+    assert user.use_move(9, target).message == "Invalid move!"
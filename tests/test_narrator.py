@@ -0,0 +1,31 @@
+from software import narrator
+from software.character import Character
+from software.narrator import Message, Narrator
+from software.rng import GameRNG
+from software.test_suite import GameSimulationTest
+
+def test_messages_render_nested_arguments():
+    announcer = Narrator()
+    message = announcer.announce_move("Archer", "Flame Arrow", 12, 9, effects=Message(
+        "effects", announcer.announce_super_effective(), announcer.announce_stat_change("Archer", "attack", 1)))
+    assert str(message) == ("Archer used Flame Arrow! (Rolled 12) (Super Effective!) "
+                            "Archer's attack raised by 1! Dealt 9 damage!")
+
+def test_simulations_never_render_narration(monkeypatch):
+    rendered = []
+    templates = {template_id: (lambda *args, template_id=template_id: rendered.append(template_id) or "")
+                 for template_id in narrator.TEMPLATES}
+    monkeypatch.setattr(narrator, "TEMPLATES", templates)
+    simulator = GameSimulationTest(GameRNG(1))
+    for _ in range(20):
+        attacker, defender = Character("Player 1"), Character("Player 2")
+        for character, class_choice in ((attacker, 1), (defender, 3)):
+            character.select_character_class(class_choice)
+        simulator.simulate_game(attacker, defender)
+    assert sum(simulator.stats["move_usage"].values()) > 0
+    assert rendered == []
+
+    # A sink that reads the text is what renders it
+    sink = []
+    Narrator([lambda message: sink.append(str(message))]).narrate(Message("turn", "Knight"))
+    assert rendered == ["turn"]
@@ -0,0 +1,41 @@
+import math
+import numpy as np
+from software.rng import GameRNG
+from software.test_suite import GameSimulationTest, PartialStats, _simulate_chunk
+
+def summary(stats):
+    """The counters and game length moments of a stats dictionary"""
+    lengths = stats['avg_game_length']
+    return (dict(stats['wins']), dict(stats['class_wins']), dict(stats['move_usage']),
+            len(lengths), lengths.mean, lengths.std)
+
+def test_parallel_results_do_not_depend_on_worker_count():
+    results = []
+    for workers in (1, 2):
+        simulator = GameSimulationTest()
+        simulator.run_parallel_simulation(num_games=600, workers=workers, seed=7, chunk_size=200)
+        results.append(summary(simulator.stats))
+    assert results[0] == results[1]
+    assert results[0][3] > 0
+
+def test_merged_chunks_match_one_pass():
+    seeds = np.random.SeedSequence(3).spawn(2)
+    merged = PartialStats()
+    for seed in seeds:
+        merged.merge(_simulate_chunk(seed, 200))
+
+    # The same games played into one stats dictionary
+    simulator = GameSimulationTest()
+    for seed in seeds:
+        simulator.rng = GameRNG(seed)
+        for _ in range(200):
+            simulator._play_random_game()
+    single = PartialStats.from_stats(simulator.stats)
+
+    assert (merged.wins, merged.class_wins, merged.move_usage, merged.elemental_effectiveness) == \
+           (single.wins, single.class_wins, single.move_usage, single.elemental_effectiveness)
+    assert merged.game_lengths.histogram.counts == single.game_lengths.histogram.counts
+    assert math.isclose(merged.game_lengths.std, single.game_lengths.std, rel_tol=1e-9)
+    for class_name, damages in single.damage_dealt.items():
+        assert len(merged.damage_dealt[class_name]) == len(damages)
+        assert math.isclose(merged.damage_dealt[class_name].mean, damages.mean, rel_tol=1e-9)
@@ -0,0 +1,55 @@
+from pymata4 import pymata4
+from pymata4.private_constants import PrivateConstants
+from hardware.fake_board import FakeBoard
+from hardware.pin_cache import DIGITAL_MESSAGE, PinCache
+
+DIRECTION_1, DIRECTION_2, MOTOR = 3, 4, 9
+
+def test_flush_coalesces_a_frame_of_writes():
+    board = FakeBoard()
+    try:
+        pins = PinCache(board)
+        for pin in (DIRECTION_1, DIRECTION_2):
+            pins.set_pin_mode_digital_output(pin)
+        pins.set_pin_mode_pwm_output(MOTOR)
+        pins.digital_write(DIRECTION_1, 1)
+        pins.digital_write(DIRECTION_2, 1)
+        pins.digital_write(DIRECTION_1, 0)
+        pins.digital_write(DIRECTION_1, 1)
+        pins.pwm_write(MOTOR, 100)
+        pins.pwm_write(MOTOR, 150)
+        # Both direction pins share port 0: one port message and one PWM message
+        assert pins.flush() == 2
+        assert board.messages_written == 2
+        assert (board.writes_to(DIRECTION_1), board.writes_to(DIRECTION_2), board.writes_to(MOTOR)) == ([1], [1], [150])
+        # Values the board already has are not resent
+        pins.digital_write(DIRECTION_2, 1)
+        pins.pwm_write(MOTOR, 150)
+        assert pins.flush() == 0
+        pins.digital_write(DIRECTION_2, 0)
+        assert pins.flush() == 1
+        assert board.writes_to(DIRECTION_1) == [1] and board.writes_to(DIRECTION_2) == [1, 0]
+    finally:
+        board.shutdown()
+
+def test_port_writes_stay_in_step_with_pymata4(monkeypatch):
+    # A Pymata4 without a serial connection, recording the messages it would send
+    monkeypatch.setattr(PrivateConstants, "DIGITAL_OUTPUT_PORT_PINS", [0] * 16)
+    board = pymata4.Pymata4.__new__(pymata4.Pymata4)
+    sent = []
+    board._send_command = sent.append
+    board.set_sampling_interval = board.set_pin_mode_digital_output = lambda *args: None
+    pins = PinCache(board)
+    for pin in (DIRECTION_1, DIRECTION_2):
+        pins.set_pin_mode_digital_output(pin)
+    pins.digital_write(DIRECTION_1, 1)
+    pins.digital_write(DIRECTION_2, 1)
+    pins.flush()
+    assert sent == [(DIGITAL_MESSAGE, 0b11000, 0)]
+    # pymata4's own write to the same port keeps the coalesced pins
+    pymata4.Pymata4.digital_write(board, 5, 1)
+    assert sent[-1] == (DIGITAL_MESSAGE, 0b111000, 0)
+    # and the next flush keeps the pin pymata4 wrote
+    pins.digital_write(DIRECTION_1, 0)
+    pins.flush()
+    assert sent[-1] == (DIGITAL_MESSAGE, 0b110000, 0)
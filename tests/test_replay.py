@@ -0,0 +1,84 @@
+import asyncio
+import io
+import contextlib
+from software.character import CharacterClass
+from software.game import Game
+from software.replay import CHECKPOINT_PLIES, ReplayEngine, ReplayWriter, read_replays
+from software.rng import GameRNG
+from software.test_suite import GameSimulationTest
+
+class SilentListener:
+    def on_command(self, command, **params):
+        return True
+
+class ScriptedPlayer:
+    """Plays a fixed class and picks moves from its own RNG, preferring `favourite`"""
+    def __init__(self, class_number, seed, favourite=None):
+        self.class_number = class_number
+        self.rng = GameRNG(seed)
+        self.favourite = favourite
+
+    def choose_class(self, rng):
+        return self.class_number
+
+    def choose_move(self, me, opponent, seat):
+        slots = [slot for slot, uses in enumerate(me.uses) if uses > 0]
+        if self.favourite in slots and self.rng.random() < 0.7:
+            return self.favourite
+        return self.rng.choice(slots)
+
+def play_recorded_games(seeds, classes, favourite=None):
+    log = io.BytesIO()
+    writer = ReplayWriter(log)
+    winners = []
+    for seed in seeds:
+        players = {seat: ScriptedPlayer(classes[seat - 1], seed * 2 + seat, favourite) for seat in (1, 2)}
+        with contextlib.redirect_stdout(io.StringIO()):
+            game = Game(SilentListener(), seed=seed, replay=writer, ai_players=players)
+            asyncio.run(game.setup_players_async())
+            asyncio.run(game.battle_async())
+        winners.append((game.state.player1.is_alive, game.state.player2.is_alive))
+    log.seek(0)
+    return list(read_replays(log)), winners
+
+def test_recorded_games_replay():
+    replays, _ = play_recorded_games(range(60), (3, 2))
+    assert len(replays) == 60
+    assert all(ReplayEngine(replay).verify() for replay in replays)
+
+def test_recoil_knockouts_replay():
+    # Archers trading Explosive Shots knock themselves out with recoil, alone or together
+    explosive_shot = [move.name for move in CharacterClass.ARCHER.value["moves"]].index("Explosive Shot")
+    replays, winners = play_recorded_games(range(200), (3, 3), favourite=explosive_shot)
+    assert (False, False) in winners
+    assert all(ReplayEngine(replay).verify() for replay in replays)
+    for replay, (player_1_alive, player_2_alive) in zip(replays, winners):
+        assert replay.winner == (1 if player_1_alive else 2)
+
+def test_simulated_games_replay():
+    log = io.BytesIO()
+    simulator = GameSimulationTest(GameRNG(7), ReplayWriter(log))
+    for _ in range(300):
+        simulator._play_random_game()
+    log.seek(0)
+    replays = list(read_replays(log))
+    assert len(replays) == 300
+    assert all(ReplayEngine(replay).verify() for replay in replays)
+
+def test_seek_back_matches_replay_from_start():
+    log = io.BytesIO()
+    simulator = GameSimulationTest(GameRNG(11), ReplayWriter(log))
+    for _ in range(50):
+        simulator._play_random_game()
+    log.seek(0)
+    replay = max(read_replays(log), key=lambda replay: len(replay.plies))
+    assert len(replay.plies) > 2 * CHECKPOINT_PLIES
+    engine = ReplayEngine(replay)
+    engine.run()
+    for ply in (len(replay.plies) - 1, 2 * CHECKPOINT_PLIES + 3, CHECKPOINT_PLIES, 5, 0):
+        engine.seek(ply)
+        fresh = ReplayEngine(replay)
+        fresh.seek(ply)
+        assert [player.snapshot() for player in engine.players] == [player.snapshot() for player in fresh.players]
+        assert engine.rng.tell() == fresh.rng.tell()
+    assert engine.run() == replay.winner
@@ -0,0 +1,27 @@
+from software.rng import GameRNG
+
+def draw(rng, count):
+    return [(rng.d20(), rng.random(), rng.choice(range(1000))) for _ in range(count)]
+
+def test_seek_continues_every_stream():
+    rng = GameRNG(5, block_size=64)
+    draw(rng, 150)
+    rng.d20()
+    position = rng.tell()
+    assert position == (151, 150, 150)
+    expected = draw(rng, 100)
+    other = GameRNG(5, block_size=64)
+    other.seek(*position)
+    assert draw(other, 100) == expected
+    rng.seek(*position)
+    assert draw(rng, 100) == expected
+
+def test_advance_skips_the_rest_of_a_drawn_block():
+    rng, other = GameRNG(9, block_size=64), GameRNG(9, block_size=64)
+    rng.d20()
+    rng.advance(200, uniforms=3)
+    for _ in range(201):
+        other.d20()
+    for _ in range(3):
+        other.random()
+    assert draw(rng, 100) == draw(other, 100)
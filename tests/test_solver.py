@@ -0,0 +1,21 @@
+import pytest
+from software.batch_engine import BatchBattleEngine, CLASSES, ATTACKER_WINS, DEFENDER_WINS
+from software.character import CharacterClass
+from software.solver import MatchupSolver, SolverBudgetExceeded
+
+def test_bounded_solve_matches_batch_engine():
+    result = MatchupSolver().solve(CharacterClass.ARCHER, CharacterClass.ARCHER, max_turns=1, max_states=1000)
+    assert result.unresolved == 0
+    assert result.attacker_win + result.defender_win + result.draw == pytest.approx(1)
+
+    archer = CLASSES.index(CharacterClass.ARCHER)
+    games = BatchBattleEngine([archer] * 400000, [archer] * 400000, max_turns=1, seed=3).run()
+    # Within five standard errors of the sampled rates
+    for exact, winner in ((result.attacker_win, ATTACKER_WINS), (result.defender_win, DEFENDER_WINS)):
+        sampled = (games.winner == winner).mean()
+        assert abs(sampled - exact) < 5 * (exact * (1 - exact) / len(games.winner)) ** 0.5 + 1e-9
+
+def test_solve_stops_past_its_budget():
+    with pytest.raises(SolverBudgetExceeded):
+        MatchupSolver().solve(CharacterClass.ARCHER, CharacterClass.ARCHER, max_turns=2, max_states=50,
+                              max_unresolved=0.001)
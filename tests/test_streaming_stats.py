@@ -0,0 +1,50 @@
+import math
+import numpy as np
+from software.streaming_stats import Distribution, QuantileSketch, RunningStats
+
+def test_merged_running_stats_match_one_pass():
+    values = np.random.default_rng(1).gamma(2.0, 30.0, 10000)
+    whole = RunningStats()
+    for value in values:
+        whole.add(value)
+    merged = RunningStats()
+    for part in np.array_split(values, 7):
+        chunk = RunningStats()
+        for value in part:
+            chunk.add(value)
+        merged.merge(chunk)
+    merged.merge(RunningStats())
+    for stats in (whole, merged):
+        assert stats.count == len(values)
+        assert math.isclose(stats.mean, values.mean(), rel_tol=1e-12)
+        assert math.isclose(stats.variance, values.var(ddof=1), rel_tol=1e-9)
+        assert (stats.min, stats.max) == (values.min(), values.max())
+
+def test_weighted_adds_match_repeated_adds():
+    repeated, weighted = RunningStats(), RunningStats()
+    for value, count in ((3, 5), (10, 1), (7, 4)):
+        for _ in range(count):
+            repeated.add(value)
+        weighted.add(value, count)
+    assert weighted.count == repeated.count
+    assert math.isclose(weighted.mean, repeated.mean) and math.isclose(weighted.variance, repeated.variance)
+
+def test_sketch_quantiles_are_within_the_relative_accuracy():
+    values = np.sort(np.random.default_rng(2).lognormal(3.0, 1.5, 20000))
+    halves = QuantileSketch(0.01), QuantileSketch(0.01)
+    for index, value in enumerate(values):
+        halves[index % 2].add(value)
+    sketch = halves[0].merge(halves[1])
+    for q in (0.01, 0.25, 0.5, 0.9, 0.99, 1.0):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= 0.01 * exact
+    assert QuantileSketch().quantile(0.5) is None
+
+def test_distribution_keeps_out_of_range_values():
+    distribution = Distribution(0, 10, 5)
+    for value in (-1, 0, 3, 9.5, 10, 40):
+        distribution.add(value)
+    assert distribution.histogram.counts == [1, 1, 0, 0, 1]
+    assert (distribution.histogram.underflow, distribution.histogram.overflow) == (1, 2)
+    assert len(distribution) == 6 and distribution.quantile(0) == 0.0
+    assert math.isclose(distribution.quantile(1.0), 40, rel_tol=0.01)
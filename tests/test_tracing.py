@@ -0,0 +1,53 @@
+import io
+import os
+import signal
+import time
+from hardware.controller_input import ControllerInput
+from hardware.fake_board import FakeBoard, press
+from software.tracing import TRACER, LatencyHistogram, Tracer
+
+def test_histogram_percentiles_are_within_a_bucket():
+    histogram = LatencyHistogram()
+    for millisecond in range(1, 101):
+        histogram.record(millisecond / 1000)
+    for percent in (50, 90, 99):
+        exact = percent / 1000
+        assert exact <= histogram.percentile(percent) <= exact * 2 ** (1 / LatencyHistogram.SUB_BUCKETS)
+    assert histogram.count == 100 and histogram.max == 0.1
+
+def test_button_press_is_traced_from_the_pin_change():
+    board = FakeBoard(press(0.05, 6), latency=0.01)
+    TRACER.enable()
+    try:
+        inputs = ControllerInput(board, {1: (6, 0)})
+        event = inputs.wait(1, timeout=1)
+        TRACER.activate(1, event.trace)
+        TRACER.mark(1, "check_button_return")
+        stages = [stage for stage, _ in event.trace.marks]
+        assert stages == ["pin_change", "debounce_accept", "check_button_return"]
+        elapsed = [seconds for _, seconds in event.trace.marks]
+        assert elapsed == sorted(elapsed) and elapsed[0] >= 0
+        assert TRACER.histograms["check_button_return"].count == 1
+    finally:
+        TRACER.enabled = False
+        TRACER.reset()
+        board.shutdown()
+
+def test_dump_signal_does_not_deadlock_while_recording():
+    tracer = Tracer()
+    previous = signal.getsignal(signal.SIGUSR1)
+    tracer.enable(dump_signal=signal.SIGUSR1)
+    output = io.StringIO()
+    tracer.dump = lambda file=None: Tracer.dump(tracer, output)
+    try:
+        with tracer._lock:
+            # The handler runs here, on the thread holding the lock
+            os.kill(os.getpid(), signal.SIGUSR1)
+            time.sleep(0.05)
+        deadline = time.monotonic() + 1
+        while not output.getvalue():
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert "Input latency by stage" in output.getvalue()
+    finally:
+        signal.signal(signal.SIGUSR1, previous)